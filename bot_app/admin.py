@@ -1,6 +1,29 @@
 from django.contrib import admin
 
-from bot_app.models import SlackUser, Vote
+from bot_app.models import DailyPoints, OutboxMessage, ScheduledMessage, SchedulerLease, SlackUser, Vote, VoteRevision, Watermark
+
+
+class VoteRevisionInline(admin.TabularInline):
+    """ Submissions of the vote, latest first. """
+    model = VoteRevision
+    ordering = ['-id']
+    extra = 0
+    can_delete = False
+    readonly_fields = ['created', 'points_team_up_to_win', 'points_act_to_deliver', 'points_disrupt_to_grow', 'comment']
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
+
+
+class VoteAdmin(admin.ModelAdmin):
+    inlines = [VoteRevisionInline]
+
 
 admin.site.register(SlackUser)
-admin.site.register(Vote)
+admin.site.register(Vote, VoteAdmin)
+admin.site.register(VoteRevision)
+admin.site.register(DailyPoints)
+admin.site.register(OutboxMessage)
+admin.site.register(ScheduledMessage)
+admin.site.register(SchedulerLease)
+admin.site.register(Watermark)
@@ -3,28 +3,28 @@ import sys
 from django.apps import AppConfig
 from django.conf import settings
 
-from bot_app.slack.client import SlackClient
+from bot_app.slack.client import AsyncSlackClient, SlackClient
 
 
 class BotAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bot_app"
     slack_client: SlackClient
+    async_slack_client: AsyncSlackClient
 
     def ready(self) -> None:
-        self.slack_client = SlackClient(token=settings.SLACK_BOT_TOKEN)
+        from bot_app import checks  # noqa: F401 Registers checks.
 
-        if 'runserver' not in str(sys.argv) and 'gunicorn' not in str(sys.argv):
-            # Skip users sync and scheduler if server is not starting.
-            return
+        self.slack_client = SlackClient(token=settings.SLACK_BOT_TOKEN, base_url=settings.SLACK_API_URL)
+        self.async_slack_client = AsyncSlackClient(
+            token=settings.SLACK_BOT_TOKEN, sync_client=self.slack_client, base_url=settings.SLACK_API_URL
+        )
 
-        # Sync users from slack on the startup.
-        from bot_app.scheduler.jobs import create_users_from_slack
-        create_users_from_slack()
+        if not any(server in str(sys.argv) for server in ('runserver', 'gunicorn', 'uvicorn')):
+            # Skip scheduler if server is not starting.
+            return
 
-        # Run scheduler only if settings say so.
+        # Run scheduler only if settings say so. It syncs users, if this process is elected to run jobs.
         if settings.ENABLE_SCHEDULER:
-            from bot_app.scheduler.scheduler import Scheduler, schedule_jobs
-            schedule = Scheduler()
-            schedule_jobs(scheduler=schedule)
-            schedule.run()
+            from bot_app.scheduler.scheduler import start_scheduler
+            start_scheduler()
@@ -0,0 +1,78 @@
+import functools
+import inspect
+import time
+from datetime import datetime
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bot_app.stats import Counter
+
+_MISSING = object()
+
+
+def _get_periods() -> dict[tuple[datetime, datetime], str]:
+    """ Periods which reports are cached for - current month and current half-year. """
+    from bot_app.utils import get_start_end_month, get_start_end_half_year
+
+    periods = {}
+    for start, end in (get_start_end_month(), get_start_end_half_year()):
+        periods[(start, end)] = f'{start:%Y-%m-%d}:{end:%Y-%m-%d}'
+    return periods
+
+
+def _get_version(period: str) -> str:
+    """ Every invalidation sets a new, unique version of period, so old entries are never read again. """
+    key = f'reports:version:{period}'
+    version = cache.get(key)
+    if version is None:
+        version = str(time.time_ns())
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_reports() -> None:
+    """ Drop cached reports of all periods that new votes are counted in. Call it after votes were written. """
+    for period in _get_periods().values():
+        cache.set(f'reports:version:{period}', str(time.time_ns()), timeout=None)
+
+
+def cached_report(report: str) -> Callable:
+    """ Caches result of function computing report, if it's computed for current month or current half-year.
+    Function has to accept 'start' and 'end' params, rest of its params are a part of the cache key.
+    Results are cached for 'REPORTS_CACHE_TIMEOUT' seconds or until 'invalidate_reports' is called.
+    @param report: name of report, used in cache keys and names of hits/misses counters.
+    """
+    hits = Counter(f'reports_cache.{report}.hits')
+    misses = Counter(f'reports_cache.{report}.misses')
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            params = dict(arguments.arguments)
+
+            period = _get_periods().get((params.pop('start'), params.pop('end')))
+            if period is None:
+                return func(*args, **kwargs)
+
+            extra = ':'.join(f'{name}={value}' for name, value in sorted(params.items()))
+            key = f'reports:{report}:{period}:{_get_version(period)}:{extra}'
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                hits.increment()
+                return result
+
+            misses.increment()
+            result = func(*args, **kwargs)
+            cache.set(key, result, timeout=settings.REPORTS_CACHE_TIMEOUT)
+            return result
+
+        return wrapper
+
+    return decorator
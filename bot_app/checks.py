@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends that can't back reports, events deduplication etc., and why.
+_UNSUITABLE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache': "isn't shared between processes",
+    'django.core.cache.backends.dummy.DummyCache': "doesn't keep any entries",
+    'django.core.cache.backends.db.DatabaseCache': "makes several queries for every call, doesn't increment keys "
+                                                   "atomically and culls keys before they expire",
+    'django.core.cache.backends.filebased.FileBasedCache': "isn't shared between nodes, doesn't increment keys "
+                                                           "atomically and culls keys before they expire",
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(**kwargs) -> list[Warning]:
+    """ Cached reports, events deduplication, keywords cooldown and replay protection of signed requests rely on the
+    cache being shared between all app's workers, cheap to call and keeping keys until they expire. """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in _UNSUITABLE_BACKENDS:
+        return []
+    return [Warning(
+        f"Cache backend {backend} {_UNSUITABLE_BACKENDS[backend]}.",
+        hint="Workers may serve stale reports, signed requests and events may be replayed or answered twice, and stats "
+             "may lose increments. Use a shared backend with atomic increments, e.g. the default RedisCache "
+             "or PyMemcacheCache.",
+        id='bot_app.W001',
+    )]
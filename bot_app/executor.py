@@ -0,0 +1,81 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from bot_app.stats import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundExecutor:
+    """ Runs work that doesn't have to be done before responding to Slack (e.g. building reports and sending messages)
+    in a bounded pool of threads, so requests can be acknowledged right away.
+
+    At most 'BACKGROUND_WORKERS' tasks are run at once, and at most 'BACKGROUND_QUEUE_SIZE' more wait for a free worker.
+    Tasks over that limit are rejected, so the caller can tell the user to try again later.
+    With 'BACKGROUND_WORKERS' set to 0 tasks are run right away, in the calling thread. """
+
+    def __init__(self) -> None:
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.submitted = Counter('background.submitted')
+        self.rejected = Counter('background.rejected')
+        self.failed = Counter('background.failed')
+
+    def _start(self) -> None:
+        # Pool is created lazily, so it's not shared between processes forked by gunicorn with '--preload'.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='background'
+                )
+
+    def submit(self, func: Callable, *args, **kwargs) -> bool:
+        """ @return: False if task was rejected because all workers are busy and queue is full, True otherwise. """
+        if not settings.BACKGROUND_WORKERS:
+            self.submitted.increment()
+            self._run(func, *args, **kwargs)
+            return True
+
+        self._start()
+        with self._lock:
+            is_full = self._pending >= settings.BACKGROUND_WORKERS + settings.BACKGROUND_QUEUE_SIZE
+            if not is_full:
+                self._pending += 1
+        if is_full:
+            self.rejected.increment()
+            logger.warning(f'Background queue is full, rejected {func.__name__}.')
+            return False
+
+        self.submitted.increment()
+        self._executor.submit(self._run_in_thread, func, *args, **kwargs)
+        return True
+
+    def _run(self, func: Callable, *args, **kwargs) -> None:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            self.failed.increment()
+            logger.exception(f'Background task {func.__name__} failed.')
+
+    def _run_in_thread(self, func: Callable, *args, **kwargs) -> None:
+        try:
+            self._run(func, *args, **kwargs)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._pending -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        """ Number of tasks submitted, but not finished yet. """
+        return self._pending
+
+
+executor = BackgroundExecutor()
@@ -7,3 +7,7 @@ class UserForm(forms.Form):
 
 class TriggerForm(forms.Form):
     trigger_id = forms.CharField(required=True)
+
+
+class TopForm(UserForm):
+    text = forms.IntegerField(required=False, min_value=1, max_value=100)
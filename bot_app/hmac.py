@@ -1,46 +1,90 @@
+import asyncio
+import functools
 import hashlib
 import hmac
 import time
 from typing import Callable
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from bot_app.stats import Counter
+
+VERSION = b'v0'
+MAX_REQUEST_AGE = 60 * 5  # Seconds.
+
+replayed_counter = Counter('hmac.replayed')
 
 
 def verify_request(func: Callable) -> Callable:
-    """ Wrapper for endpoints methods, to verify if request comes from Slack API. """
-    # TODO Make into middleware?
-    def wrapper(request: HttpRequest, *args, **kwargs) -> None:
-        _verify_request(request=request)
-        return func(request=request, *args, **kwargs)
+    """ Marks endpoint (sync or async) as receiving requests from Slack API, so SlackSignatureMiddleware verifies
+    their signatures. Requests that weren't verified (e.g. middleware isn't installed) are rejected. """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            _check_verified(request)
+            return await func(request, *args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            _check_verified(request)
+            return func(request, *args, **kwargs)
 
+    wrapper.slack_signed = True
     return wrapper
 
 
-def _verify_request(request: HttpRequest, version: str = 'v0') -> None:
-    """ By checking request's signature verifies the request actually comes from Slack API."""
-    timestamp = request.headers.get('X-Slack-Request-Timestamp')
+def _check_verified(request: HttpRequest) -> None:
+    if not getattr(request, 'slack_verified', False):
+        raise PermissionDenied('Request signature not verified.')
 
-    try:
-        timestamp_diff = int(time.time()) - int(timestamp)
-    except (ValueError, TypeError):
-        timestamp_diff = None
 
-    if timestamp_diff is None or timestamp_diff > 60 * 5:
-        raise PermissionDenied('Request timestamp invalid.')
+class SlackSignatureMiddleware(MiddlewareMixin):
+    """ Verifies that requests to endpoints marked with 'verify_request' actually come from Slack API, by checking
+    their signatures. Each signature is accepted only once, so captured requests can't be replayed.
+    It supports both sync and async requests, so it doesn't make async views run in a single thread.
+    https://api.slack.com/authentication/verifying-requests-from-slack """
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args, view_kwargs) -> None:
+        # Slack sends only POST requests, others are left for the view to reject with 405.
+        if request.method == 'POST' and getattr(view_func, 'slack_signed', False):
+            _verify_request(request=request)
+            request.slack_verified = True
 
-    slack_signature = request.headers.get('X-Slack-Signature', '')
-    base_string = f'{version}:{timestamp}:{request.body.decode("utf-8")}'
 
-    hash_string = hash_data(data=base_string)
-    if f'{version}={hash_string}' != slack_signature:
+def _verify_request(request: HttpRequest) -> None:
+    """ By checking request's signature verifies the request actually comes from Slack API."""
+    timestamp = str(request.headers.get('X-Slack-Request-Timestamp', ''))
+    try:
+        is_valid = abs(time.time() - int(timestamp)) <= MAX_REQUEST_AGE
+    except ValueError:
+        is_valid = False
+    if not is_valid:
+        raise PermissionDenied('Request timestamp invalid.')
+
+    signature = request.headers.get('X-Slack-Signature', '')
+    expected = sign(timestamp=timestamp.encode(), body=request.body)
+    if not hmac.compare_digest(expected.encode(), signature.encode()):
         raise PermissionDenied('Request signature invalid.')
 
+    # Signature is valid only as long as its timestamp, so it has to be remembered only for that long.
+    if not cache.add(f'hmac:seen:{signature}', True, timeout=MAX_REQUEST_AGE):
+        replayed_counter.increment()
+        raise PermissionDenied('Request replayed.')
+
+
+@functools.lru_cache(maxsize=1)
+def _get_hmac(secret: str) -> 'hmac.HMAC':
+    """ HMAC with the key already processed, copied for each request. """
+    return hmac.new(key=secret.encode('utf-8'), digestmod=hashlib.sha256)
+
 
-def hash_data(data: str) -> str:
-    """ Hashes given data with HMAC SHA256 using given key."""
-    return hmac.new(
-        key=bytes(settings.SIGNING_SECRET, 'utf-8'),
-        msg=bytes(data, 'utf-8'),
-        digestmod=hashlib.sha256).hexdigest()
+def sign(timestamp: bytes, body: bytes) -> str:
+    """ @return: signature of request, in the format of 'X-Slack-Signature' header. """
+    signer = _get_hmac(settings.SIGNING_SECRET).copy()
+    signer.update(VERSION + b':' + timestamp + b':')
+    signer.update(body)  # Body can be big, so it's not copied into base string.
+    return f'{VERSION.decode()}={signer.hexdigest()}'
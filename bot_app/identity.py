@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bot_app.models import SlackUser
+
+
+class UserIdentity:
+    """ The few fields of SlackUser that are needed to handle most requests. """
+    __slots__ = ('pk', 'slack_id', 'real_name', 'is_hr', 'is_bot', 'expires')
+
+    # In order of model's fields, as expected by 'SlackUser.from_db'.
+    fields = ('id', 'slack_id', 'real_name', 'is_hr', 'is_bot')
+
+    def __init__(self, pk: int, slack_id: str, real_name: str, is_hr: bool, is_bot: bool, expires: float) -> None:
+        self.pk = pk
+        self.slack_id = slack_id
+        self.real_name = real_name
+        self.is_hr = is_hr
+        self.is_bot = is_bot
+        self.expires = expires
+
+    def to_user(self) -> SlackUser:
+        """ @return: SlackUser with identity's fields loaded. Other fields are deferred, and loaded on access. """
+        return SlackUser.from_db(
+            None, self.fields, (self.pk, self.slack_id, self.real_name, self.is_hr, self.is_bot)
+        )
+
+
+class IdentityCache:
+    """ Per-process cache of users' identities, so the same users aren't fetched from the database on every request.
+
+    Entries expire after 'USERS_CACHE_TTL' seconds, and at most 'USERS_CACHE_SIZE' of them are kept, least recently
+    used ones are dropped first. Users saved in this process are invalidated right away, users changed by other
+    processes are seen after the entry expires. Unknown users aren't cached, so they are visible as soon as they're
+    synced from Slack. """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, UserIdentity] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, slack_id: str) -> Optional[UserIdentity]:
+        """ @return: identity of user with given slack id, or None if there is no such user. """
+        identity = self._get_cached(slack_id)
+        if identity is None:
+            identity = self._fetch(slack_id)
+        return identity
+
+    async def aget(self, slack_id: str) -> Optional[UserIdentity]:
+        """ Async version of 'get'. Only users that aren't cached are fetched, in a thread. """
+        identity = self._get_cached(slack_id)
+        if identity is None:
+            identity = await sync_to_async(self._fetch)(slack_id)
+        return identity
+
+    def _get_cached(self, slack_id: str) -> Optional[UserIdentity]:
+        with self._lock:
+            identity = self._entries.get(slack_id)
+            if identity is not None and identity.expires > time.monotonic():
+                self._entries.move_to_end(slack_id)
+                self.hits += 1
+                return identity
+            self.misses += 1
+        return None
+
+    def _fetch(self, slack_id: str) -> Optional[UserIdentity]:
+        values = SlackUser.objects.filter(slack_id=slack_id).values_list(*UserIdentity.fields).first()
+        if values is None:
+            return None
+
+        identity = UserIdentity(*values, expires=time.monotonic() + settings.USERS_CACHE_TTL)
+        with self._lock:
+            self._entries[slack_id] = identity
+            self._entries.move_to_end(slack_id)
+            while len(self._entries) > settings.USERS_CACHE_SIZE:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return identity
+
+    def invalidate(self, slack_ids: list[str] = None) -> None:
+        """ Drop entries of given users, or all entries if no users are given. """
+        with self._lock:
+            if slack_ids is None:
+                self._entries.clear()
+                return
+            for slack_id in slack_ids:
+                self._entries.pop(slack_id, None)
+
+    def clear(self) -> None:
+        """ Drop all entries and reset statistics. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def info(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hit_ratio, 3),
+        }
+
+
+identity_cache = IdentityCache()
+
+
+@receiver(post_save, sender=SlackUser)
+@receiver(post_delete, sender=SlackUser)
+def _invalidate_user(sender, instance: SlackUser, **kwargs) -> None:
+    identity_cache.invalidate([instance.slack_id])
@@ -0,0 +1,88 @@
+import json
+import random
+import string
+import time
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bot_app.slack.keywords import KEYWORDS, contains_keywords, may_contain_keywords
+
+WORDS = (
+    "cześć hej dzięki za pomoc przy wdrożeniu jutro standup o 10 czy ktoś widział build na mastera "
+    "review PR please merge deploy failed again retro w piątek spotkanie przesunięte urlop od poniedziałku "
+    "thanks for the help with release notes can you check the logs? zgłoszenie klienta już poprawione "
+    "gratulacje dla zespołu świetna robota ogłoszenie lunch o 13 łączę się za 5 minut zaraz wracam"
+).split()
+KEYWORD_VARIANTS = ["wyróżnień", "wyroznien", "Wyróżnień", "WYRÓŻNIEŃ", "wyróżnień!", "wyroznien?"]
+
+
+def _legacy_contains_keywords(message: str) -> bool:
+    """ Matcher used before keywords were compiled, for comparison. """
+    msg = message.lower()
+    msg = msg.translate(str.maketrans("", "", string.punctuation))
+    return any(word in msg for word in KEYWORDS)
+
+
+class Command(BaseCommand):
+    help = "Compares speed of matching keywords in message events: parsing every event, and rejecting them before."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--messages", type=int, default=10_000)
+        parser.add_argument("--keywords-ratio", type=float, default=0.01, help="Part of messages with keywords.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        bodies = self._get_corpus(messages=options["messages"], keywords_ratio=options["keywords_ratio"])
+        expected = [_legacy_contains_keywords(json.loads(body)["event"]["text"]) for body in bodies]
+
+        def parse_legacy(body: bytes) -> bool:
+            return _legacy_contains_keywords(json.loads(body.decode("utf-8"))["event"]["text"])
+
+        def parse_compiled(body: bytes) -> bool:
+            return contains_keywords(json.loads(body.decode("utf-8"))["event"]["text"])
+
+        def prefilter(body: bytes) -> bool:
+            return may_contain_keywords(body) and parse_compiled(body)
+
+        for name, func in (("legacy", parse_legacy), ("compiled", parse_compiled), ("prefilter", prefilter)):
+            self._benchmark(name=name, func=func, bodies=bodies, expected=expected, repeat=options["repeat"])
+
+    @staticmethod
+    def _get_corpus(messages: int, keywords_ratio: float) -> list[bytes]:
+        """ Bodies of message events, as sent by Slack. Some are JSON-escaped to ASCII, like some clients do. """
+        rng = random.Random(0)
+        bodies = []
+        for i in range(messages):
+            words = rng.choices(WORDS, k=rng.randint(3, 40))
+            if rng.random() < keywords_ratio:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORD_VARIANTS))
+            event = {
+                "token": "token",
+                "team_id": "T0000000",
+                "event": {
+                    "type": "message",
+                    "text": " ".join(words),
+                    "user": f"U{i % 500:08d}",
+                    "ts": f"{1660000000 + i}.000100",
+                    "channel": f"C{i % 20:08d}",
+                    "channel_type": "channel",
+                },
+                "type": "event_callback",
+                "event_id": f"Ev{i:010d}",
+                "event_time": 1660000000 + i,
+            }
+            bodies.append(json.dumps(event, ensure_ascii=rng.random() < 0.5).encode("utf-8"))
+        return bodies
+
+    def _benchmark(self, name: str, func: Callable, bodies: list[bytes], expected: list[bool], repeat: int) -> None:
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            results = [func(body) for body in bodies]
+            timings.append(time.perf_counter() - start_time)
+
+        if results != expected:
+            raise CommandError(f"{name} matched different messages than legacy matcher.")
+        per_message = min(timings) / len(bodies) * 1_000_000
+        self.stdout.write(f"{name:>10}: {per_message:.2f}µs per message, {sum(results)} matched")
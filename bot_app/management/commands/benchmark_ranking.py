@@ -0,0 +1,103 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from bot_app.models import SlackUser, Vote
+from bot_app.rollup import rebuild_daily_points
+from bot_app.utils import get_ranking, get_start_end_half_year
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares speed of 'database' and 'numpy' ranking backends on generated data. "
+        "Data is created in a transaction that is rolled back afterwards, but don't run it on production database."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--votes", type=int, default=1_000_000)
+        parser.add_argument("--top", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options) -> None:
+        try:
+            with transaction.atomic():
+                self._seed(users=options["users"], votes=options["votes"], batch_size=options["batch_size"])
+                self._benchmark(top=options["top"], repeat=options["repeat"])
+                raise Rollback()
+        except Rollback:
+            self.stdout.write("Generated data rolled back.")
+
+    def _seed(self, users: int, votes: int, batch_size: int) -> None:
+        start_time = time.perf_counter()
+        SlackUser.objects.bulk_create(
+            [SlackUser(slack_id=f"benchmark_{i}", name=f"benchmark.{i}", real_name=f"Benchmark {i}")
+             for i in range(users)],
+            batch_size=batch_size,
+        )
+        ids = list(SlackUser.objects.filter(slack_id__startswith="benchmark_").values_list("id", flat=True))
+        if len(ids) < 2:
+            raise CommandError("At least 2 users are needed.")
+
+        start, end = get_start_end_half_year()
+        days = (end - start).days
+        rng = random.Random(0)
+        points = [(3, 0, 0), (0, 3, 0), (0, 0, 3), (1, 1, 1), (2, 1, 0), (0, 1, 2), (1, 0, 2)]
+
+        seen = set()
+        for offset in range(0, votes, batch_size):
+            batch, batch_created = [], []
+            for _ in range(min(batch_size, votes - offset)):
+                voting_user, voted_user = rng.sample(ids, 2)
+                team_up, deliver, disrupt = rng.choice(points)
+                created = start + timedelta(days=rng.randrange(days + 1), seconds=rng.randrange(86400))
+                period = created.date().replace(day=1)
+                if (voting_user, voted_user, period) in seen:  # User votes once a month for each user.
+                    continue
+                seen.add((voting_user, voted_user, period))
+                batch_created.append(created)
+                batch.append(Vote(
+                    voting_user_id=voting_user,
+                    voted_user_id=voted_user,
+                    period=period,
+                    points_team_up_to_win=team_up,
+                    points_act_to_deliver=deliver,
+                    points_disrupt_to_grow=disrupt,
+                ))
+            created = Vote.objects.bulk_create(batch)
+
+            # 'created' is set automatically on insert, spread the votes over the whole half-year.
+            for vote, vote_created in zip(created, batch_created):
+                vote.created = vote_created
+            Vote.objects.bulk_update(created, fields=["created"])
+        rebuild_daily_points()
+
+        self.stdout.write(f"Generated {users} users and {votes} votes in {time.perf_counter() - start_time:.1f}s.")
+
+    def _benchmark(self, top: int, repeat: int) -> None:
+        start, end = get_start_end_half_year()
+        results = {}
+        for backend in ("database", "numpy"):
+            with override_settings(RANKING_BACKEND=backend):
+                timings = []
+                for _ in range(repeat):
+                    start_time = time.perf_counter()
+                    # Skip reports cache, so ranking is computed every time.
+                    results[backend] = get_ranking.__wrapped__(start=start, end=end, top=top)
+                    timings.append(time.perf_counter() - start_time)
+            self.stdout.write(
+                f"{backend:>8}: best {min(timings) * 1000:.1f}ms, mean {sum(timings) / len(timings) * 1000:.1f}ms"
+            )
+
+        if results["database"] != results["numpy"]:
+            raise CommandError("Backends returned different rankings.")
+        self.stdout.write(self.style.SUCCESS("Both backends returned the same ranking."))
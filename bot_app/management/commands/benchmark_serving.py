@@ -0,0 +1,158 @@
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from bot_app.hmac import sign
+
+_SIGNING_SECRET = "benchmark_signing_secret"
+
+# Server: gunicorn's params running it.
+_SERVERS = {
+    "WSGI": ["bot_project.wsgi:application"],
+    "ASGI": ["bot_project.asgi:application", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+class _SlackStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.call()
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Don't print every call.
+
+
+class SlackStub(ThreadingHTTPServer):
+    """ Slack API answering each call after given latency, in a thread for each connection. """
+    daemon_threads = True
+
+    def __init__(self, latency: float) -> None:
+        super().__init__(("127.0.0.1", 0), _SlackStubHandler)
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/api/"
+
+    def call(self) -> None:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput of '/vote' requests, which wait for Slack API, served by gunicorn with sync WSGI workers, "
+        "as in 'production' image, and with ASGI workers, as in 'production-asgi' image. Slack API is stubbed, and "
+        "both servers get the same number of requests at once."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.2, help="Seconds Slack API takes to respond.")
+        parser.add_argument("--workers", type=int, default=2, help="Workers of each server, as run by gunicorn.")
+        parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once.")
+
+    def handle(self, *args, **options) -> None:
+        missing = [package for package in ("aiohttp", "uvicorn") if importlib.util.find_spec(package) is None]
+        if missing:
+            raise CommandError(f"ASGI server needs {', '.join(missing)}: pip install -r requirements/asgi.txt")
+
+        with override_settings(SIGNING_SECRET=_SIGNING_SECRET):
+            for server in _SERVERS:
+                self._benchmark(server=server, **options)
+
+        workers, latency = options["workers"], options["latency"]
+        self.stdout.write(
+            f"Both servers ran {workers} workers and got {options['concurrency']} requests at once, each waiting "
+            f"{latency}s for Slack API. A sync worker serves one request at a time, so WSGI can't exceed "
+            f"{workers / latency:.1f} requests/s here - the difference shows how many requests waiting for Slack "
+            f"a worker holds at once, not how fast the app's code is."
+        )
+
+    @staticmethod
+    def _get_request(server: str, i: int) -> tuple[str, dict]:
+        """ @return: body of request, and its signature headers. Each request is unique, so it isn't a replay. """
+        data = f"trigger_id=benchmark_{server}_{i}_{time.time_ns()}&user_id=benchmark_user"
+        timestamp = str(int(time.time()))
+        headers = {
+            "X-Slack-Request-Timestamp": timestamp,
+            "X-Slack-Signature": sign(timestamp=timestamp.encode(), body=data.encode()),
+        }
+        return data, headers
+
+    def _benchmark(self, server: str, requests: int, latency: float, workers: int, concurrency: int,
+                   **options) -> None:
+        stub = SlackStub(latency=latency)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, SLACK_API_URL=stub.url, SIGNING_SECRET=_SIGNING_SECRET, ENABLE_SCHEDULER="0")
+        command = [sys.executable, "-m", "gunicorn", *_SERVERS[server], "-b", f"127.0.0.1:{port}",
+                   "--workers", str(workers)]
+
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=log)
+            try:
+                self._wait_for_server(process=process, port=port, log=log)
+
+                def post(i: int) -> None:
+                    data, headers = self._get_request(server, i)
+                    request = urllib.request.Request(
+                        f"http://127.0.0.1:{port}/vote", data=data.encode(),
+                        headers={"Content-Type": "application/x-www-form-urlencoded", **headers},
+                    )
+                    try:
+                        urllib.request.urlopen(request, timeout=60).close()
+                    except urllib.error.HTTPError as e:
+                        raise CommandError(f"{server} request failed with {e.code}.")
+
+                start_time = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(post, range(requests)))
+                seconds = time.perf_counter() - start_time
+            finally:
+                process.terminate()
+                process.wait()
+                stub.shutdown()
+                stub.server_close()
+
+        if stub.calls != requests:
+            raise CommandError(f"{server}: Slack API was called {stub.calls} times instead of {requests}.")
+        self.stdout.write(f"{server}: {requests} requests in {seconds:.2f}s, {requests / seconds:.1f} requests/s")
+
+    @staticmethod
+    def _wait_for_server(process: subprocess.Popen, port: int, log, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited with {process.returncode}:\n{log.read().decode()}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f"Server didn't start in {timeout}s.")
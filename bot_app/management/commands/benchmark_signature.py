@@ -0,0 +1,62 @@
+import hashlib
+import hmac
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from bot_app.hmac import sign
+
+
+def _legacy_sign(secret: str, timestamp: str, body: bytes) -> str:
+    """ Signing used before the key was precomputed, for comparison. """
+    base_string = f'v0:{timestamp}:{body.decode("utf-8")}'
+    return 'v0=' + hmac.new(
+        key=bytes(secret, 'utf-8'),
+        msg=bytes(base_string, 'utf-8'),
+        digestmod=hashlib.sha256).hexdigest()
+
+
+class Command(BaseCommand):
+    help = "Compares cost of verifying signature of Slack's requests of different sizes."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--sizes", type=int, nargs="+", default=[256, 4 * 1024, 64 * 1024, 1024 * 1024])
+        parser.add_argument("--number", type=int, default=1000, help="Signatures computed per measurement.")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        secret = "benchmark_signing_secret"
+        timestamp = str(int(time.time()))
+        with override_settings(SIGNING_SECRET=secret):
+            for size in options["sizes"]:
+                body = (b'{"text": "' + b"x" * size)[:size - 2] + b'"}'
+                legacy_signature = _legacy_sign(secret=secret, timestamp=timestamp, body=body)
+                signature = sign(timestamp=timestamp.encode(), body=body)
+                if not hmac.compare_digest(signature, legacy_signature):
+                    raise CommandError("Signatures differ.")
+
+                legacy = self._measure(
+                    lambda: _legacy_sign(secret=secret, timestamp=timestamp, body=body) != legacy_signature,
+                    number=options["number"],
+                    repeat=options["repeat"],
+                )
+                current = self._measure(
+                    lambda: hmac.compare_digest(sign(timestamp=timestamp.encode(), body=body), signature),
+                    number=options["number"],
+                    repeat=options["repeat"],
+                )
+                self.stdout.write(
+                    f"{size:>8} bytes: legacy {legacy:.2f}µs, precomputed {current:.2f}µs per request"
+                )
+
+    @staticmethod
+    def _measure(func, number: int, repeat: int) -> float:
+        """ @return: best time of single call in microseconds. """
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append(time.perf_counter() - start_time)
+        return min(timings) / number * 1_000_000
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from bot_app.models import ScheduledMessage
+from bot_app.scheduler.broadcasts import cancel_scheduled_messages
+
+
+class Command(BaseCommand):
+    help = "Deletes month-end messages scheduled in Slack for the current month."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--kind", choices=[kind for kind, _ in ScheduledMessage.KINDS])
+
+    def handle(self, *args, **options) -> None:
+        count = cancel_scheduled_messages(period=datetime.now().date(), kind=options["kind"])
+        self.stdout.write(self.style.SUCCESS(f"Cancelled {count} scheduled messages."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bot_app.rollup import check_daily_points
+
+
+class Command(BaseCommand):
+    help = "Checks if daily points rollup is consistent with raw votes."
+
+    def handle(self, *args, **options) -> None:
+        differences = check_daily_points()
+        for diff in differences:
+            self.stderr.write(
+                f"User {diff['user_id']} on {diff['day']}: expected {diff['expected']}, found {diff['actual']}."
+            )
+
+        if differences:
+            raise CommandError(
+                f"Found {len(differences)} inconsistent daily points buckets. Run 'rebuild_daily_points' to fix them."
+            )
+        self.stdout.write(self.style.SUCCESS("Daily points are consistent with votes."))
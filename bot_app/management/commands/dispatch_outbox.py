@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bot_app.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends messages waiting in the outbox to Slack API."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--loop", action="store_true", help="Keep checking the outbox, instead of exiting.")
+        parser.add_argument("--interval", type=int, default=5, help="Seconds between checks with '--loop'.")
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            result = dispatch_outbox()
+            self.stdout.write(
+                f"Sent {result.sent}, retried {result.retried}, failed {result.failed} "
+                f"in {result.seconds:.1f}s ({result.throughput:.1f} messages/s)."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bot_app.rollup import rebuild_daily_points
+
+
+class Command(BaseCommand):
+    help = "Rebuilds daily points rollup from raw votes."
+
+    def handle(self, *args, **options) -> None:
+        count = rebuild_daily_points()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily points buckets."))
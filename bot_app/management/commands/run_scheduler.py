@@ -0,0 +1,28 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from bot_app.scheduler.scheduler import start_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs scheduler's jobs in this process, instead of in web server's processes (keep ENABLE_SCHEDULER=0 there). "
+        "Multiple instances can be run, only the elected one runs jobs, others take over if it fails."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--check-rate", type=int, default=60, help="Seconds between checks for due jobs.")
+
+    def handle(self, *args, **options) -> None:
+        stop_event = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+
+        scheduler = start_scheduler(check_rate=options["check_rate"])
+        self.stdout.write(f"Scheduler started as {scheduler.lease.holder}, leader: {scheduler.is_leader}.")
+
+        stop_event.wait()
+        self.stdout.write("Stopping scheduler, waiting for running jobs.")
+        scheduler.stop()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bot_app.users import create_users_from_slack
+
+
+class Command(BaseCommand):
+    help = "Syncs users from Slack, like the scheduler does on its startup and daily."
+
+    def handle(self, *args, **options) -> None:
+        result = create_users_from_slack()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, unchanged {result.unchanged} users "
+            f"in {result.seconds:.1f}s."
+        ))
@@ -0,0 +1,79 @@
+""" NumPy backend for reports. Instead of ranking users in the database, it pulls daily points once and builds
+users x categories score matrix in memory. Selected with RANKING_BACKEND=numpy setting. """
+from datetime import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+
+from bot_app.models import DailyPoints, SlackUser, CATEGORIES
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImproperlyConfigured("RANKING_BACKEND 'numpy' requires numpy package to be installed.") from e
+
+
+def build_score_matrix(start: datetime, end: datetime) -> tuple[list[tuple[int, str, str]], "np.ndarray"]:
+    """Sum points received by each user in each category within given time range.
+    @param start: datetime
+    @param end: datetime
+    @return:
+        users : list of (id, slack_id, real_name) tuples of non-bot users, ordered by id.
+        matrix : users x categories array of points, rows in the same order as users.
+    """
+    users = list(SlackUser.objects.filter(is_bot=False).order_by("pk").values_list("id", "slack_id", "real_name"))
+    matrix = np.zeros((len(users), len(CATEGORIES)), dtype=np.int64)
+
+    rows = DailyPoints.objects.filter(
+        day__range=(start.date(), end.date()), user__is_bot=False,
+    ).values_list("user_id", *CATEGORIES.keys())
+    data = np.array(list(rows), dtype=np.int64).reshape(-1, len(CATEGORIES) + 1)
+    if not len(data):
+        return users, matrix
+
+    # Users are ordered by id, so user's row can be found with binary search.
+    ids = np.fromiter((user[0] for user in users), dtype=np.int64, count=len(users))
+    np.add.at(matrix, np.searchsorted(ids, data[:, 0]), data[:, 1:])
+    return users, matrix
+
+
+def _rank_column(column: "np.ndarray", top: int) -> tuple["np.ndarray", "np.ndarray"]:
+    """Find winners and top users in single category.
+    @return:
+        selected : indexes of users ordered by points descending, ties ordered by index. Contains all users with
+            the most points and at least 'top' users, if there are enough.
+        ranks : rank of each selected user, ties share the same rank.
+    """
+    count = len(column)
+    winners = np.flatnonzero(column == column[np.argmax(column)])
+    size = min(max(top, len(winners)), count)
+
+    if size < count:
+        # Everybody with at least as many points as the last user that fits is a candidate, sort only them.
+        threshold = column[np.argpartition(-column, size - 1)[size - 1]]
+        candidates = np.flatnonzero(column >= threshold)
+    else:
+        candidates = np.arange(count)
+    selected = candidates[np.lexsort((candidates, -column[candidates]))][:size]
+
+    ordered = np.sort(column)
+    ranks = count - np.searchsorted(ordered, column[selected], side="right") + 1
+    return selected, ranks
+
+
+def get_matrix_ranking(start: datetime, end: datetime, top: int) -> dict:
+    """Rank users by points received in each category. Returns the same structure as 'utils.get_ranking'. """
+    users, matrix = build_score_matrix(start=start, end=end)
+
+    ranking = {category: [] for category in CATEGORIES.keys()}
+    if not users:
+        return ranking
+
+    for column, category in enumerate(CATEGORIES.keys()):
+        points = matrix[:, column]
+        selected, ranks = _rank_column(column=points, top=top)
+        for position, (index, rank) in enumerate(zip(selected.tolist(), ranks.tolist()), start=1):
+            _, slack_id, real_name = users[index]
+            ranking[category].append(
+                dict(slack_id=slack_id, real_name=real_name, points=int(points[index]), rank=rank, position=position)
+            )
+    return ranking
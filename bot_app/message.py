@@ -1,12 +1,81 @@
+from typing import Iterator
+
+from bot_app.texts import StaticText
+
+# Slack's limits: characters of a section block's text, and blocks in a single message.
+MAX_SECTION_LENGTH = 3000
+MAX_BLOCKS = 50
+
+
+def _split_text(text: str, limit: int = MAX_SECTION_LENGTH) -> Iterator[str]:
+    """ Split text into parts of at most 'limit' characters, on line breaks where possible, so that lines of
+    a list aren't cut in half. Lines longer than the limit on their own are cut. """
+    if len(text) <= limit:
+        yield text
+        return
+
+    part, length = [], -1  # Length of the lines joined with '\n', so the first line adds no separator.
+    for line in text.split('\n'):
+        if part and length + 1 + len(line) > limit:
+            yield '\n'.join(part)
+            part, length = [], -1
+        while len(line) > limit:
+            yield line[:limit]
+            line = line[limit:]
+        part.append(line)
+        length += 1 + len(line)
+    if part:
+        yield '\n'.join(part)
+
+
 def _build_blocks(content: list[str]) -> list[dict]:
-    return [{"type": "section", "text": {"type": "mrkdwn", "text": text}} for text in content if text]
+    """ Sections of static texts are built once, and shared between messages. Texts longer than a section can hold
+    are split into several sections. """
+    blocks = []
+    for text in content:
+        if not text:
+            continue
+        if isinstance(text, StaticText) and len(text) <= MAX_SECTION_LENGTH:
+            blocks.append(text.section)
+            continue
+        blocks.extend({"type": "section", "text": {"type": "mrkdwn", "text": part}} for part in _split_text(text))
+    return blocks
+
+
+def build_text_messages(channel: str, content: list[str], ts: str = None, footer: list[dict] = None) -> list[dict]:
+    """ Messages with the content, split into as many messages as needed to fit within Slack's limits.
+    Messages should be posted in order.
+    @param footer: blocks added after the content, e.g. buttons. """
+    blocks = _build_blocks(content) + (footer or [])
+    return [
+        {
+            "ts": ts or "",
+            "channel": channel,
+            "username": "Program Wyróżnień",
+            "icon_emoji": ":robot_face:",
+            "blocks": blocks[start:start + MAX_BLOCKS],
+        }
+        for start in range(0, max(len(blocks), 1), MAX_BLOCKS)
+    ]
 
 
 def build_text_message(channel: str, content: list[str], ts: str = None) -> dict:
+    """ Single message with the content. Content that may not fit in one message should be sent with
+    'build_text_messages'. """
+    messages = build_text_messages(channel=channel, content=content, ts=ts)
+    if len(messages) > 1:
+        raise ValueError(f"Content doesn't fit in a single message, it takes {len(messages)} messages.")
+    return messages[0]
+
+
+def build_ephemeral_message(content: list[str], text: str) -> dict:
+    """ Message that can be returned directly in response to slash command, visible only to the user.
+    There can be only one response, so content that doesn't fit in a single message raises ValueError. """
+    blocks = _build_blocks(content)
+    if len(blocks) > MAX_BLOCKS:
+        raise ValueError(f"Content doesn't fit in a single message, it takes {len(blocks)} blocks.")
     return {
-        "ts": ts or "",
-        "channel": channel,
-        "username": "Program Wyróżnień",
-        "icon_emoji": ":robot_face:",
-        "blocks": _build_blocks(content),
+        "response_type": "ephemeral",
+        "text": text,
+        "blocks": blocks,
     }
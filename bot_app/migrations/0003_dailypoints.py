@@ -0,0 +1,49 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+CATEGORIES = ["points_team_up_to_win", "points_act_to_deliver", "points_disrupt_to_grow"]
+
+
+def fill_daily_points(apps, schema_editor):
+    Vote = apps.get_model('bot_app', 'Vote')
+    DailyPoints = apps.get_model('bot_app', 'DailyPoints')
+
+    rows = (
+        Vote.objects.annotate(day=TruncDate('created'))
+        .values('voted_user_id', 'day')
+        .annotate(**{field: Sum(field) for field in CATEGORIES})
+    )
+    DailyPoints.objects.bulk_create(
+        [DailyPoints(user_id=row.pop('voted_user_id'), **row) for row in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0002_vote_comment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPoints',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('points_team_up_to_win', models.IntegerField(default=0)),
+                ('points_act_to_deliver', models.IntegerField(default=0)),
+                ('points_disrupt_to_grow', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='daily_points', to='bot_app.slackuser')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailypoints',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_user_daily_points'),
+        ),
+        migrations.RunPython(fill_daily_points, migrations.RunPython.noop),
+    ]
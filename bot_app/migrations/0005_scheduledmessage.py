@@ -0,0 +1,32 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0004_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reminder', 'Reminder about program'), ('winners', 'Winners announcement')], max_length=16)),
+                ('period', models.DateField(help_text='First day of month the message is sent for.')),
+                ('post_at', models.DateTimeField()),
+                ('text', models.TextField()),
+                ('channel', models.CharField(help_text='Channel returned by Slack, needed to delete the message.', max_length=64)),
+                ('scheduled_message_id', models.CharField(max_length=64)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_messages', to='bot_app.slackuser')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scheduledmessage',
+            constraint=models.UniqueConstraint(fields=('kind', 'user', 'period'), name='unique_scheduled_message'),
+        ),
+    ]
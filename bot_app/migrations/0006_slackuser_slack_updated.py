@@ -0,0 +1,18 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0005_scheduledmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slackuser',
+            name='slack_updated',
+            field=models.BigIntegerField(default=0, help_text="Timestamp of last change of user's data in Slack."),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0006_slackuser_slack_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('holder', models.CharField(help_text='Process holding the lease.', max_length=128)),
+                ('expires', models.DateTimeField(help_text="Lease can be taken over by other process, if it's not renewed before.")),
+                ('acquired', models.DateTimeField(help_text='When the lease was taken by its current holder.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0008_watermark'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slackuser',
+            index=models.Index(condition=models.Q(('deleted', False), ('is_bot', False)), fields=['id'], name='slackuser_active'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['voted_user', 'created'], name='vote_voted_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['voting_user', 'created'], name='vote_voting_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['voting_user', 'voted_user', 'created'], name='vote_voting_voted_created'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['modified'], name='vote_modified'),
+        ),
+        # Foreign keys' own indexes are dropped after composite indexes that replace them are built.
+        migrations.AlterField(
+            model_name='vote',
+            name='voted_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.RESTRICT, related_name='voted_user', to='bot_app.slackuser'),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='voting_user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.RESTRICT, related_name='voting_user', to='bot_app.slackuser'),
+        ),
+    ]
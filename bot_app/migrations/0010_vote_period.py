@@ -0,0 +1,72 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:48
+
+import bot_app.models
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+CATEGORIES = ["points_team_up_to_win", "points_act_to_deliver", "points_disrupt_to_grow"]
+COMMENT_SEPARATOR = f"\n\n{'=' * 30}\n\n"
+
+
+def set_period(apps, schema_editor):
+    """ Set period from vote's creation, and merge votes for the same user in the same month (saved concurrently),
+    like 'save_vote' would do: the first vote is kept, with points of the latest one and all comments. """
+    Vote = apps.get_model("bot_app", "Vote")
+    DailyPoints = apps.get_model("bot_app", "DailyPoints")
+    Vote.objects.update(period=TruncMonth("created", output_field=models.DateField()))
+
+    duplicated = list(
+        Vote.objects.values("voting_user_id", "voted_user_id", "period")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for key in duplicated:
+        votes = list(Vote.objects.filter(
+            voting_user_id=key["voting_user_id"], voted_user_id=key["voted_user_id"], period=key["period"]
+        ).order_by("pk"))
+        first, latest = votes[0], votes[-1]
+        for field in CATEGORIES:
+            setattr(first, field, getattr(latest, field))
+        first.comment = COMMENT_SEPARATOR.join(vote.comment for vote in votes if vote.comment)
+        first.save(update_fields=[*CATEGORIES, "comment"])
+        Vote.objects.filter(pk__in=[vote.pk for vote in votes[1:]]).delete()
+
+    if duplicated:
+        # Rebuild points rollup, without merged votes.
+        DailyPoints.objects.all().delete()
+        rows = (
+            Vote.objects.annotate(day=TruncDate("created"))
+            .values("voted_user_id", "day")
+            .annotate(**{field: Sum(field) for field in CATEGORIES})
+            .order_by()
+        )
+        DailyPoints.objects.bulk_create(
+            [DailyPoints(user_id=row.pop("voted_user_id"), **row) for row in rows], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0009_vote_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='period',
+            field=models.DateField(default=bot_app.models.get_current_period, help_text='First day of month the vote was given in.'),
+        ),
+        migrations.RunPython(set_period, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('voting_user', 'voted_user', 'period'), name='unique_vote_per_period'),
+        ),
+        # Votes are saved by the period now, the unique constraint's index is used instead.
+        migrations.RemoveIndex(
+            model_name='vote',
+            name='vote_voting_voted_created',
+        ),
+    ]
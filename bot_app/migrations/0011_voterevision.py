@@ -0,0 +1,36 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot_app', '0010_vote_period'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='comment',
+            field=models.TextField(help_text='Comment of the latest submission.', max_length=512, null=True),
+        ),
+        migrations.CreateModel(
+            name='VoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points_team_up_to_win', models.IntegerField(null=True)),
+                ('points_act_to_deliver', models.IntegerField(null=True)),
+                ('points_disrupt_to_grow', models.IntegerField(null=True)),
+                ('comment', models.TextField(max_length=512, null=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vote', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='bot_app.vote')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='voterevision',
+            index=models.Index(fields=['vote', '-id'], name='voterevision_vote_id'),
+        ),
+    ]
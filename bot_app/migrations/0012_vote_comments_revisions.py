@@ -0,0 +1,77 @@
+# Generated by Django 4.0.5 on 2026-10-18 19:51
+
+from django.db import migrations, transaction
+
+CATEGORIES = ["points_team_up_to_win", "points_act_to_deliver", "points_disrupt_to_grow"]
+COMMENT_SEPARATOR = f"\n\n{'=' * 30}\n\n"
+BATCH_SIZE = 500
+
+
+def _in_batches(apps, schema_editor, migrate_batch):
+    """ Migrate votes in batches, each in its own transaction, so big table isn't locked for the whole migration. """
+    Vote = apps.get_model("bot_app", "Vote")
+    alias = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=alias):
+            votes = list(Vote.objects.using(alias).filter(pk__gt=last_pk).order_by("pk")[:BATCH_SIZE])
+            if not votes:
+                return
+            migrate_batch(apps, alias, votes)
+        last_pk = votes[-1].pk
+
+
+def _split_comments(apps, alias, votes):
+    """ Split concatenated comments of each vote into revisions. Only points of the latest one are known.
+    Votes which already have revisions - split by an earlier, interrupted run, or saved since - are skipped. """
+    Vote = apps.get_model("bot_app", "Vote")
+    VoteRevision = apps.get_model("bot_app", "VoteRevision")
+    migrated = set(VoteRevision.objects.using(alias).filter(vote__in=votes).values_list("vote_id", flat=True))
+    votes = [vote for vote in votes if vote.pk not in migrated]
+    revisions = []
+    for vote in votes:
+        comments = vote.comment.split(COMMENT_SEPARATOR) if vote.comment is not None else [None]
+        for i, comment in enumerate(comments):
+            is_latest = i == len(comments) - 1
+            revisions.append(VoteRevision(
+                vote=vote,
+                comment=comment,
+                created=vote.created if i == 0 else vote.modified,
+                **{field: getattr(vote, field) if is_latest else None for field in CATEGORIES},
+            ))
+        vote.comment = comments[-1]
+    VoteRevision.objects.using(alias).bulk_create(revisions)
+    Vote.objects.using(alias).bulk_update(votes, fields=["comment"])
+
+
+def _join_comments(apps, alias, votes):
+    Vote = apps.get_model("bot_app", "Vote")
+    VoteRevision = apps.get_model("bot_app", "VoteRevision")
+    revisions = VoteRevision.objects.using(alias).filter(vote__in=votes).order_by("pk")
+    comments = {}
+    for vote_id, comment in revisions.values_list("vote_id", "comment"):
+        if comment is not None:
+            comments.setdefault(vote_id, []).append(comment)
+    for vote in votes:
+        vote.comment = COMMENT_SEPARATOR.join(comments[vote.pk]) if vote.pk in comments else None
+    Vote.objects.using(alias).bulk_update(votes, fields=["comment"])
+
+
+def split_comments(apps, schema_editor):
+    _in_batches(apps, schema_editor, _split_comments)
+
+
+def join_comments(apps, schema_editor):
+    _in_batches(apps, schema_editor, _join_comments)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Votes are migrated in batches, so the migration can be re-run after a failed batch.
+
+    dependencies = [
+        ('bot_app', '0011_voterevision'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_comments, join_comments),
+    ]
@@ -1,3 +1,5 @@
+import json
+
 check_comments_header = {
                 "type": "header",
                 "block_id": "check_comments_header",
@@ -8,9 +10,32 @@ check_comments_header = {
                 }
             }
 
+earlier_comments_action_id = "earlier_comments-action"
 
-def build_comments_modal() -> dict:
-    modal = x = {
+
+def build_earlier_comments_button(voted_user: str, before: int = None) -> dict:
+    """ Actions block with a button showing comments of earlier submissions of votes given to the user.
+    @param before: value returned by 'get_earlier_comments' with the previous page, None for the first page.
+    """
+    return {
+        "type": "actions",
+        "elements": [
+            {
+                "type": "button",
+                "text": {
+                    "type": "plain_text",
+                    "text": "Show earlier comments",
+                    "emoji": True
+                },
+                "action_id": earlier_comments_action_id,
+                "value": json.dumps({"user": voted_user, "before": before}),
+            }
+        ]
+    }
+
+
+def _get_comments_modal() -> dict:
+    return {
         "title": {
             "type": "plain_text",
             "text": "Voting",
@@ -53,4 +78,11 @@ def build_comments_modal() -> dict:
         ]
     }
 
-    return modal
+
+# Modal is the same for every user, so it's built once, on startup. slack_sdk encodes it with the rest of the request.
+_comments_modal = _get_comments_modal()
+
+
+def build_comments_modal() -> dict:
+    """ @return: user selection modal, shared between requests, so it mustn't be modified. """
+    return _comments_modal
@@ -1,7 +1,4 @@
-import logging
-import json
-
-from bot_app.models import CATEGORIES
+from bot_app.models import CATEGORIES, Vote
 
 
 def _get_points_field(block_id: str, text: str, values: list) -> dict:
@@ -82,6 +79,7 @@ _comment = {
     "element": {
         "type": "plain_text_input",
         "min_length": 30,
+        "max_length": Vote._meta.get_field("comment").max_length,
         "action_id": "comment-action"
     },
     "label": {
@@ -102,8 +100,8 @@ _comment_context = {
 }
 
 
-def build_voting_modal() -> dict:
-    result = {
+def _get_voting_modal() -> dict:
+    return {
         "type": "modal",
         "title": {"type": "plain_text", "text": "Voting", "emoji": True},
         "submit": {"type": "plain_text", "text": "Submit", "emoji": True},
@@ -119,6 +117,12 @@ def build_voting_modal() -> dict:
         ],
     }
 
-    logging.warning(json.dumps(result, indent=4))
-    return result
+
+# Modal is the same for every user, so it's built once, on startup. slack_sdk encodes it with the rest of the request.
+_voting_modal = _get_voting_modal()
+
+
+def build_voting_modal() -> dict:
+    """ @return: voting modal, shared between requests, so it mustn't be modified. """
+    return _voting_modal
 
@@ -1,4 +1,7 @@
+from datetime import date
+
 from django.db import models
+from django.utils import timezone
 
 CATEGORIES = {
     'points_team_up_to_win': "Team up to win",
@@ -14,21 +17,160 @@ class SlackUser(models.Model):
     is_hr = models.BooleanField(default=False, help_text="Can see winners of each month.")
     is_bot = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
+    slack_updated = models.BigIntegerField(default=0, help_text="Timestamp of last change of user's data in Slack.")
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Active people - users that reports and messages are about - are usually a part of all workspace's users.
+            models.Index(fields=["id"], condition=models.Q(is_bot=False, deleted=False), name="slackuser_active"),
+        ]
+
     def __str__(self):
         return f"{self.slack_id} {self.name}"
 
 
+def get_current_period() -> date:
+    """ @return: first day of current month, votes are given once per month. """
+    return timezone.localdate().replace(day=1)
+
+
 class Vote(models.Model):
-    voting_user = models.ForeignKey(SlackUser, on_delete=models.RESTRICT, related_name="voting_user")
-    voted_user = models.ForeignKey(SlackUser, on_delete=models.RESTRICT, related_name="voted_user")
+    # Foreign keys are indexed by composite indexes below, which start with them.
+    voting_user = models.ForeignKey(SlackUser, on_delete=models.RESTRICT, related_name="voting_user", db_index=False)
+    voted_user = models.ForeignKey(SlackUser, on_delete=models.RESTRICT, related_name="voted_user", db_index=False)
     points_team_up_to_win = models.IntegerField(default=0)
     points_act_to_deliver = models.IntegerField(default=0)
     points_disrupt_to_grow = models.IntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
-    comment = models.TextField(null=True, max_length=512)
+    comment = models.TextField(null=True, max_length=512, help_text="Comment of the latest submission.")
+    period = models.DateField(default=get_current_period, help_text="First day of month the vote was given in.")
+
+    class Meta:
+        constraints = [
+            # User can vote once a month for each user, later votes update it.
+            models.UniqueConstraint(fields=["voting_user", "voted_user", "period"], name="unique_vote_per_period"),
+        ]
+        indexes = [
+            models.Index(fields=["voted_user", "created"], name="vote_voted_user_created"),  # Comments.
+            models.Index(fields=["voting_user", "created"], name="vote_voting_user_created"),  # User's votes.
+            models.Index(fields=["modified"], name="vote_modified"),  # New points notifications.
+        ]
 
     def __str__(self):
         return f"Class: {self.__class__.__name__}, user: {self.voting_user}."
+
+
+class VoteRevision(models.Model):
+    """ Points and comment of each submission of a vote. Revisions are only inserted, never changed. Vote itself holds
+    the latest of them, so usually there's no need to read revisions. """
+    # Foreign key is indexed by the composite index below, which starts with it.
+    vote = models.ForeignKey(Vote, on_delete=models.CASCADE, related_name="revisions", db_index=False)
+    # Points are unknown (null) for submissions saved before revisions were kept, only their comments are.
+    points_team_up_to_win = models.IntegerField(null=True)
+    points_act_to_deliver = models.IntegerField(null=True)
+    points_disrupt_to_grow = models.IntegerField(null=True)
+    comment = models.TextField(null=True, max_length=512)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["vote", "-id"], name="voterevision_vote_id"),  # Latest revisions first.
+        ]
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, vote: {self.vote_id}, created: {self.created}."
+
+
+class DailyPoints(models.Model):
+    """ Rollup of points received by user in each category, bucketed per day of vote's creation.
+    It's kept up to date by 'save_vote', and can be rebuilt from raw votes with 'rebuild_daily_points' command. """
+    user = models.ForeignKey(SlackUser, on_delete=models.RESTRICT, related_name="daily_points")
+    day = models.DateField()
+    points_team_up_to_win = models.IntegerField(default=0)
+    points_act_to_deliver = models.IntegerField(default=0)
+    points_disrupt_to_grow = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="unique_user_daily_points"),
+        ]
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, user: {self.user}, day: {self.day}."
+
+
+class OutboxMessage(models.Model):
+    """ Message waiting to be sent to Slack API. Messages are sent by 'bot_app.outbox.dispatch_outbox',
+    which respects Slack's rate limits and retries failed messages. """
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUSES = [(PENDING, "Pending"), (SENDING, "Sending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    method = models.CharField(max_length=64, default="chat.postMessage", help_text="Slack API method.")
+    payload = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt"], name="outbox_status_next_attempt"),
+        ]
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, method: {self.method}, status: {self.status}."
+
+
+class ScheduledMessage(models.Model):
+    """ Message registered in Slack ahead of time with 'chat.scheduleMessage'. Kept, so it can be revised or cancelled
+    with 'chat.deleteScheduledMessage' before it's posted. """
+    REMINDER = "reminder"
+    WINNERS = "winners"
+    KINDS = [(REMINDER, "Reminder about program"), (WINNERS, "Winners announcement")]
+
+    kind = models.CharField(max_length=16, choices=KINDS)
+    user = models.ForeignKey(SlackUser, on_delete=models.CASCADE, related_name="scheduled_messages")
+    period = models.DateField(help_text="First day of month the message is sent for.")
+    post_at = models.DateTimeField()
+    text = models.TextField()
+    channel = models.CharField(max_length=64, help_text="Channel returned by Slack, needed to delete the message.")
+    scheduled_message_id = models.CharField(max_length=64)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "user", "period"], name="unique_scheduled_message"),
+        ]
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, kind: {self.kind}, user: {self.user}, post at: {self.post_at}."
+
+
+class SchedulerLease(models.Model):
+    """ Lease held by the process elected to run scheduler's jobs, so they are run once, however many processes
+    the app runs in. It's renewed by its holder, and taken over by other process once it expires.
+    See 'bot_app.scheduler.leader.LeaderLease'. """
+    name = models.CharField(unique=True, max_length=64)
+    holder = models.CharField(max_length=128, help_text="Process holding the lease.")
+    expires = models.DateTimeField(help_text="Lease can be taken over by other process, if it's not renewed before.")
+    acquired = models.DateTimeField(help_text="When the lease was taken by its current holder.")
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, name: {self.name}, holder: {self.holder}."
+
+
+class Watermark(models.Model):
+    """ Point in time up to which a periodic job has processed data, so its next run continues from there,
+    and catches up runs that were missed. """
+    name = models.CharField(unique=True, max_length=64)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"Class: {self.__class__.__name__}, name: {self.name}, value: {self.value}."
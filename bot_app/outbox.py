@@ -0,0 +1,222 @@
+""" Durable outbox for messages sent to Slack API.
+
+Callers only enqueue messages, which are stored in the database and sent later by 'dispatch_outbox'. It sends them
+concurrently, but no faster than Slack's rate limits allow, respects 'Retry-After' of rate limited responses, and
+retries failed messages until they run out of attempts. """
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError
+
+from bot_app.models import OutboxMessage
+from bot_app.stats import Counter
+
+logger = logging.getLogger(__name__)
+
+sent_counter = Counter('outbox.sent')
+retried_counter = Counter('outbox.retried')
+failed_counter = Counter('outbox.failed')
+rate_limited_counter = Counter('outbox.rate_limited')
+
+
+def enqueue_message(message: dict, text: str) -> OutboxMessage:
+    """ Store message to be sent with 'chat.postMessage'. Takes the same params as 'SlackClient.post_chat_message'. """
+    return OutboxMessage.objects.create(method="chat.postMessage", payload={**message, "text": text})
+
+
+def enqueue_messages(messages: list[dict], text: str) -> list[OutboxMessage]:
+    """ Store many messages with the same text at once. """
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(method="chat.postMessage", payload={**message, "text": text}) for message in messages],
+        batch_size=1000,
+    )
+
+
+class TokenBucket:
+    """ Allows 'rate' calls per second on average, with bursts of up to 'burst' calls.
+    Used from event loops with 'acquire', or from threads with 'acquire_blocking'. It doesn't hold any loop's objects,
+    so it can outlive the loop. """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """ Stop handing out tokens for given time, e.g. after Slack responded with 'Retry-After'. """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    def _take(self) -> float:
+        """ Take a token, if there is one.
+        @return: 0 if token was taken, otherwise seconds to wait before trying again. """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while wait := self._take():
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self) -> None:
+        while wait := self._take():
+            time.sleep(wait)
+
+
+_buckets: dict[str, TokenBucket] = {}
+
+
+def get_bucket(method: str) -> TokenBucket:
+    """ Bucket shared by all calls of Slack API method made by this process. """
+    if method not in _buckets:
+        rate, burst = settings.OUTBOX_RATE_LIMITS.get(method, settings.OUTBOX_RATE_LIMITS["default"])
+        _buckets[method] = TokenBucket(rate=rate, burst=burst)
+    return _buckets[method]
+
+
+@dataclass
+class _Result:
+    message: OutboxMessage
+    error: str = ""
+    retry_after: float = None
+
+
+@dataclass
+class DispatchResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """ Messages handled per second. """
+        handled = self.sent + self.retried + self.failed
+        return handled / self.seconds if self.seconds else 0.0
+
+
+def _claim(batch_size: int, ids: list[int] = None) -> list[OutboxMessage]:
+    """ Mark due messages as being sent, so other dispatchers won't send them too.
+    Messages stuck in sending (e.g. dispatcher died) are claimed again after 'OUTBOX_CLAIM_TIMEOUT' seconds.
+    @param ids: claim only these messages, if given. """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+    due = OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+        Q(status=OutboxMessage.PENDING, next_attempt__lte=now)
+        | Q(status=OutboxMessage.SENDING, next_attempt__lte=stale)
+    )
+    if ids is not None:
+        due = due.filter(pk__in=ids)
+    with transaction.atomic():
+        messages = list(due.order_by("next_attempt", "pk")[:batch_size])
+        OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+            status=OutboxMessage.SENDING, next_attempt=now
+        )
+    return messages
+
+
+async def _send(message: OutboxMessage, semaphore: asyncio.Semaphore) -> _Result:
+    from bot_app.utils import get_slack_client
+
+    bucket = get_bucket(message.method)
+    async with semaphore:
+        await bucket.acquire()
+        try:
+            # Slack client is blocking, so calls are made in threads. No database queries are made there.
+            await asyncio.to_thread(get_slack_client().call, message.method, message.payload)
+        except SlackApiError as e:
+            if e.response.status_code == 429:
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                bucket.pause(retry_after)
+                rate_limited_counter.increment()
+                return _Result(message=message, error=str(e), retry_after=retry_after)
+            return _Result(message=message, error=str(e))
+        except Exception as e:
+            return _Result(message=message, error=repr(e))
+    return _Result(message=message)
+
+
+async def _send_all(messages: list[OutboxMessage], concurrency: int) -> list[_Result]:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(_send(message, semaphore) for message in messages))
+
+
+def _save(results: list[_Result], dispatch: DispatchResult) -> None:
+    now = timezone.now()
+    sent, retried, failed = [], [], []
+    for result in results:
+        message = result.message
+        if not result.error:
+            message.status = OutboxMessage.SENT
+            message.sent = now
+            sent.append(message)
+            continue
+
+        message.attempts += 1
+        message.last_error = result.error
+        is_rate_limited = result.retry_after is not None
+        max_attempts = settings.OUTBOX_MAX_RATE_LIMITED_ATTEMPTS if is_rate_limited else settings.OUTBOX_MAX_ATTEMPTS
+        if message.attempts >= max_attempts:
+            message.status = OutboxMessage.FAILED
+            failed.append(message)
+            logger.warning(f"Giving up on outbox message {message.pk}: {result.error}")
+            continue
+
+        # Rate limited messages are retried after 'Retry-After', others with exponential backoff.
+        delay = result.retry_after if is_rate_limited else 2 ** message.attempts
+        message.status = OutboxMessage.PENDING
+        message.next_attempt = now + timedelta(seconds=delay)
+        retried.append(message)
+
+    OutboxMessage.objects.bulk_update(
+        sent + retried + failed, fields=["status", "sent", "attempts", "last_error", "next_attempt"]
+    )
+    dispatch.sent += len(sent)
+    dispatch.retried += len(retried)
+    dispatch.failed += len(failed)
+    for counter, messages in ((sent_counter, sent), (retried_counter, retried), (failed_counter, failed)):
+        if messages:
+            counter.increment(len(messages))
+
+
+def dispatch_outbox(batch_size: int = None, concurrency: int = None, ids: list[int] = None) -> DispatchResult:
+    """ Send all messages that are due, batch by batch, until there are none left.
+    Messages that have to be retried later are left in the outbox for the next run.
+    @param ids: send only these messages, e.g. just enqueued by the caller, and leave the rest to the scheduler.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    concurrency = concurrency or settings.OUTBOX_CONCURRENCY
+
+    dispatch = DispatchResult()
+    start = time.perf_counter()
+    while messages := _claim(batch_size=batch_size, ids=ids):
+        results = asyncio.run(_send_all(messages, concurrency=concurrency))
+        _save(results, dispatch=dispatch)
+    dispatch.seconds = time.perf_counter() - start
+
+    if dispatch.sent or dispatch.retried or dispatch.failed:
+        logger.info(
+            f"Outbox: sent {dispatch.sent}, retried {dispatch.retried}, failed {dispatch.failed} "
+            f"in {dispatch.seconds:.1f}s ({dispatch.throughput:.1f} messages/s)."
+        )
+    return dispatch
@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import QuerySet, Sum
+from django.db.models.functions import TruncDate
+
+from bot_app.cache import invalidate_reports
+from bot_app.models import DailyPoints, Vote, CATEGORIES
+
+
+def update_daily_points(user_id: int, day: date, delta: dict) -> None:
+    """ Add points to user's bucket for given day, creating the bucket if needed, in a single statement.
+    Must be called in the same transaction that writes the vote.
+    @param user_id: primary key of the voted SlackUser.
+    @param day: day of vote's creation.
+    @param delta: dict with categories as keys and change of points as value, negative to take points back.
+    """
+    table = DailyPoints._meta.db_table
+    fields = list(CATEGORIES.keys())
+    updates = ", ".join(f"{field} = {table}.{field} + EXCLUDED.{field}" for field in fields)
+    sql = f"""
+        INSERT INTO {table} (user_id, day, {", ".join(fields)})
+        VALUES (%s, %s, {", ".join(["%s"] * len(fields))})
+        ON CONFLICT (user_id, day) DO UPDATE SET {updates}
+    """
+    with connection.cursor() as cursor:
+        day = connection.ops.adapt_datefield_value(day)
+        cursor.execute(sql, [user_id, day, *(delta.get(field, 0) for field in fields)])
+
+
+def _votes_per_day() -> QuerySet:
+    """ Sums of points received by each user per day, calculated from raw votes. """
+    return (
+        Vote.objects.annotate(day=TruncDate("created"))
+        .values("voted_user_id", "day")
+        .annotate(**{field: Sum(field) for field in CATEGORIES.keys()})
+        .order_by()
+    )
+
+
+@transaction.atomic
+def rebuild_daily_points(batch_size: int = 1000) -> int:
+    """ Drop the rollup and build it again from raw votes.
+    @return: number of created daily buckets.
+    """
+    DailyPoints.objects.all().delete()
+    buckets = [DailyPoints(user_id=row.pop("voted_user_id"), **row) for row in _votes_per_day().iterator()]
+    DailyPoints.objects.bulk_create(buckets, batch_size=batch_size)
+    transaction.on_commit(invalidate_reports)
+    return len(buckets)
+
+
+def check_daily_points() -> list[dict]:
+    """ Compare the rollup with sums calculated from raw votes.
+    @return: list of {'user_id': int, 'day': date, 'expected': dict, 'actual': dict} dicts for each bucket that
+        differs. Empty list means the rollup is consistent.
+    """
+    expected = {(row.pop("voted_user_id"), row.pop("day")): row for row in _votes_per_day().iterator()}
+    actual = {
+        (row.pop("user_id"), row.pop("day")): row
+        for row in DailyPoints.objects.values("user_id", "day", *CATEGORIES.keys()).iterator()
+    }
+
+    empty = dict.fromkeys(CATEGORIES.keys(), 0)
+    differences = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_points = expected.get(key, empty)
+        actual_points = actual.get(key, empty)
+        if expected_points != actual_points:
+            user_id, day = key
+            differences.append(dict(user_id=user_id, day=day, expected=expected_points, actual=actual_points))
+    return differences
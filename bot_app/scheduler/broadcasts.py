@@ -0,0 +1,172 @@
+""" Month-end broadcasts registered in Slack ahead of time with 'chat.scheduleMessage', so there is no burst of
+messages sent by our workers on the day itself. Enabled with SCHEDULE_BROADCASTS=1.
+
+Reminders are registered days ahead, and spread over 'BROADCAST_WINDOW' on the second-to-last day of the month.
+Each run registers at most 'BROADCAST_BATCH_SIZE' of them, paced by Slack's rate limit, and the next runs carry on
+with users that don't have one yet.
+Winners announcement is registered too, but revised every day until it's posted, so it reflects the latest votes.
+Users that don't have a scheduled message (e.g. joined later, or scheduling failed) get it the regular way from
+'send_periodic_messages'. """
+import calendar
+import logging
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError
+
+from bot_app.models import ScheduledMessage, SlackUser
+from bot_app.outbox import get_bucket, rate_limited_counter
+from bot_app.texts import texts
+from bot_app.utils import get_slack_client, get_start_end_half_year, get_winners_message
+
+logger = logging.getLogger(__name__)
+
+
+def get_month_end_days(today: date) -> tuple[date, date]:
+    """ @return: days of reminder (second-to-last day of the month) and winners announcement (last day). """
+    last_day = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    return last_day - timedelta(days=1), last_day
+
+
+def _get_post_times(day: date, count: int) -> list[datetime]:
+    """ Spread 'count' messages evenly over 'BROADCAST_WINDOW' hours of given day. """
+    start_hour, end_hour = settings.BROADCAST_WINDOW
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=start_hour))
+    step = timedelta(hours=end_hour - start_hour) / max(count, 1)
+    return [start + step * i for i in range(count)]
+
+
+def _call_slack(method, api_method: str, **kwargs):
+    """ Call Slack API no faster than outbox's rate limit for the method. If we are rate limited, the call isn't
+    retried, calls are paused for 'Retry-After' seconds instead. """
+    bucket = get_bucket(api_method)
+    bucket.acquire_blocking()
+    try:
+        return method(**kwargs)
+    except SlackApiError as e:
+        if e.response.status_code == 429:
+            bucket.pause(float(e.response.headers.get("Retry-After", 1)))
+            rate_limited_counter.increment()
+        raise
+
+
+def _schedule(kind: str, user: SlackUser, period: date, post_at: datetime, text: str) -> None:
+    client = get_slack_client()
+    try:
+        response = _call_slack(
+            client.schedule_message, "chat.scheduleMessage",
+            channel=user.slack_id, text=text, post_at=int(post_at.timestamp()),
+        )
+    except SlackApiError as e:
+        logger.warning(f"Couldn't schedule {kind} for {user}: {e}")
+        return
+
+    ScheduledMessage.objects.create(
+        kind=kind,
+        user=user,
+        period=period,
+        post_at=post_at,
+        text=text,
+        channel=response["channel"],
+        scheduled_message_id=response["scheduled_message_id"],
+    )
+
+
+def _cancel(message: ScheduledMessage) -> None:
+    client = get_slack_client()
+    try:
+        _call_slack(
+            client.delete_scheduled_message,
+            "chat.deleteScheduledMessage",
+            channel=message.channel,
+            scheduled_message_id=message.scheduled_message_id,
+        )
+    except SlackApiError as e:
+        # Message was already posted or deleted in Slack, only the record is left.
+        logger.warning(f"Couldn't delete scheduled message {message.scheduled_message_id}: {e}")
+    message.delete()
+
+
+def _is_due(today: date) -> bool:
+    _, winners_day = get_month_end_days(today)
+    return winners_day - timedelta(days=settings.BROADCAST_LEAD_DAYS) <= today <= winners_day
+
+
+def schedule_reminders(today: date = None) -> None:
+    """ Register reminders for users that don't have one yet, at most 'BROADCAST_BATCH_SIZE' of them, and cancel
+    reminders of users that shouldn't get it. """
+    today = today or datetime.now().date()
+    if not settings.SCHEDULE_BROADCASTS or not _is_due(today):
+        return
+
+    period = today.replace(day=1)
+    reminder_day, _ = get_month_end_days(today)
+    scheduled = ScheduledMessage.objects.filter(kind=ScheduledMessage.REMINDER, period=period)
+
+    for message in scheduled.filter(Q(user__is_bot=True) | Q(user__deleted=True)):
+        _cancel(message)
+
+    # Each user keeps their place in the window, however many runs it takes to register all reminders.
+    users = list(SlackUser.objects.filter(is_bot=False, deleted=False).order_by("pk"))
+    scheduled_users = set(scheduled.values_list("user_id", flat=True))
+    text = texts.remind_about_program()
+    earliest = timezone.now() + timedelta(minutes=1)
+    pending = [
+        (user, post_at)
+        for user, post_at in zip(users, _get_post_times(day=reminder_day, count=len(users)))
+        if user.pk not in scheduled_users and post_at > earliest
+    ]
+    for user, post_at in pending[:settings.BROADCAST_BATCH_SIZE]:
+        _schedule(kind=ScheduledMessage.REMINDER, user=user, period=period, post_at=post_at, text=text)
+    if len(pending) > settings.BROADCAST_BATCH_SIZE:
+        logger.info(f"{len(pending) - settings.BROADCAST_BATCH_SIZE} reminders left to schedule in the next runs.")
+
+
+def schedule_winners_announcement(today: date = None) -> None:
+    """ Register winners announcement for HR users, or revise it if winners have changed since it was registered. """
+    today = today or datetime.now().date()
+    if not settings.SCHEDULE_BROADCASTS or not _is_due(today):
+        return
+
+    period = today.replace(day=1)
+    _, winners_day = get_month_end_days(today)
+    post_at = _get_post_times(day=winners_day, count=1)[0]
+    if post_at <= timezone.now() + timedelta(minutes=1):
+        return
+
+    start, end = get_start_end_half_year()
+    text = get_winners_message(start=start, end=end)
+    scheduled = {
+        message.user_id: message
+        for message in ScheduledMessage.objects.filter(kind=ScheduledMessage.WINNERS, period=period)
+    }
+
+    for user in SlackUser.objects.filter(is_hr=True):
+        message = scheduled.pop(user.pk, None)
+        if message and message.text == text:
+            continue
+        if message:
+            _cancel(message)
+        _schedule(kind=ScheduledMessage.WINNERS, user=user, period=period, post_at=post_at, text=text)
+
+    # Users that are no longer HR.
+    for message in scheduled.values():
+        _cancel(message)
+
+
+def cancel_scheduled_messages(period: date, kind: str = None) -> int:
+    """ Delete scheduled messages of given month from Slack.
+    @param period: any day of the month.
+    @param kind: ScheduledMessage.REMINDER or ScheduledMessage.WINNERS, all kinds by default.
+    @return: number of cancelled messages.
+    """
+    messages = ScheduledMessage.objects.filter(period=period.replace(day=1))
+    if kind:
+        messages = messages.filter(kind=kind)
+
+    messages = list(messages)
+    for message in messages:
+        _cancel(message)
+    return len(messages)
@@ -1,10 +1,14 @@
 import calendar
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from bot_app.models import SlackUser, Vote, CATEGORIES
+from django.db import transaction
+from django.db.models import Count, QuerySet, Sum
+from django.utils import timezone
+
+from bot_app.models import ScheduledMessage, SlackUser, Vote, Watermark, CATEGORIES
+from bot_app.outbox import dispatch_outbox, enqueue_message, enqueue_messages
 from bot_app.texts import texts
 from bot_app.utils import (
-    get_slack_client,
     get_start_end_month,
     get_start_end_half_year,
     get_winners_message,
@@ -21,86 +25,75 @@ def send_periodic_messages() -> None:
         announce_winners()
 
 
+def _without_scheduled(users: QuerySet, kind: str) -> QuerySet:
+    """ Exclude users that already have this month's message scheduled in Slack. """
+    period = datetime.now().date().replace(day=1)
+    return users.exclude(scheduled_messages__kind=kind, scheduled_messages__period=period)
+
+
 def remind_about_program() -> None:
     text = texts.remind_about_program()
 
-    users = list(SlackUser.objects.filter(is_bot=False))
-    client = get_slack_client()
-    for user in users:
-        params = {"channel": user.slack_id}
-        client.post_chat_message(params, text=text)
+    # Deactivated users can't get messages.
+    users = SlackUser.objects.filter(is_bot=False, deleted=False)
+    users = _without_scheduled(users, kind=ScheduledMessage.REMINDER)
+    users = users.values_list("slack_id", flat=True)
+    enqueue_messages([{"channel": slack_id} for slack_id in users], text=text)
+    dispatch_outbox()
 
 
 def announce_winners() -> None:
     start, end = get_start_end_half_year()
     text = get_winners_message(start=start, end=end)
-    users = list(SlackUser.objects.filter(is_hr=True))
-
-    client = get_slack_client()
-    for user in users:
-        params = {"channel": user.slack_id}
-        client.post_chat_message(params, text=text)
-
-
-def notify_about_new_points() -> None:
-    today = datetime.now().date()
-    today_votes = Vote.objects.filter(modified__gt=today)
-
-    # Count votes per person.
-    today_scores = {
-        vote.voted_user.slack_id: {
-            "points": dict.fromkeys(CATEGORIES.keys(), 0),
-            "people": 0,
-        }
-        for vote in today_votes
-    }
-
-    for vote in today_votes:
-        score = today_scores[vote.voted_user.slack_id]
-        score["people"] += 1
-
-        for field in CATEGORIES.keys():
-            score["points"][field] += getattr(vote, field)
-
-    # Send messages.
-    client = get_slack_client()
-    for user, data in today_scores.items():
-        params = {"channel": user}
-        text = texts.got_voted(
-            {
-                "people": data["people"],
-                "points": [
-                    {"category": CATEGORIES[field], "points": points}
-                    for field, points in data["points"].items()
-                ],
-            }
+
+    users = _without_scheduled(SlackUser.objects.filter(is_hr=True), kind=ScheduledMessage.WINNERS)
+    users = users.values_list("slack_id", flat=True)
+    enqueue_messages([{"channel": slack_id} for slack_id in users], text=text)
+    dispatch_outbox()
+
+
+NEW_POINTS_WATERMARK = "notify_about_new_points"
+# Votes are saved in short transactions, so votes modified earlier than that are surely committed and visible.
+_COMMIT_LAG = timedelta(minutes=1)
+
+
+def _get_new_points(since: datetime, until: datetime) -> QuerySet:
+    """ Number of votes and sums of points in each category received by each user, from votes modified in
+    (since, until] time range. """
+    return (
+        Vote.objects.filter(modified__gt=since, modified__lte=until)
+        .values("voted_user__slack_id")
+        .annotate(people=Count("pk"), **{field: Sum(field) for field in CATEGORIES.keys()})
+        .order_by()
+    )
+
+
+def notify_about_new_points(now: datetime = None) -> None:
+    """ Notify users about votes they got since the last notification, which is kept as a watermark. Runs that were
+    missed are caught up by the next one. Messages are enqueued in the same transaction that moves the watermark,
+    so each vote (or its change) is notified once, even if the job fails or is run by two processes at once. """
+    until = (now or timezone.now()) - _COMMIT_LAG
+
+    with transaction.atomic():
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(
+            name=NEW_POINTS_WATERMARK,
+            # Before the first run, notify about today's votes.
+            defaults={"value": timezone.localtime(until).replace(hour=0, minute=0, second=0, microsecond=0)},
         )
-        client.post_chat_message(params, text=text)
-
-
-def create_users_from_slack() -> None:
-    client = get_slack_client()
-    result = client.users_list()
-
-    for data in result.data.get("members", []):
-        slack_id = data["id"]
-        name = data["name"]
-        real_name = data.get("real_name") or name
-        deleted = data.get("deleted") or False
-        is_bot = data.get('is_bot') or False
-
-        if user := SlackUser.objects.filter(slack_id=data["id"]).first():
-            user.slack_id = slack_id
-            user.name = name
-            user.real_name = real_name
-            user.deleted = deleted
-            user.is_bot = is_bot
-        else:
-            user = SlackUser.objects.create(
-                slack_id=slack_id,
-                name=name,
-                real_name=real_name,
-                deleted=deleted,
-                is_bot=is_bot,
+        if until <= watermark.value:
+            return
+
+        for row in _get_new_points(since=watermark.value, until=until):
+            text = texts.got_voted(
+                {
+                    "people": row["people"],
+                    "points": [
+                        {"category": category, "points": row[field]} for field, category in CATEGORIES.items()
+                    ],
+                }
             )
-        user.save()
+            enqueue_message({"channel": row["voted_user__slack_id"]}, text=text)
+
+        watermark.value = until
+        watermark.save(update_fields=["value"])
+    dispatch_outbox()
@@ -0,0 +1,117 @@
+""" Electing a single process, among all app's processes and nodes, to run scheduler's jobs.
+
+Leader holds a lease - a row in 'SchedulerLease' table, valid for 'SCHEDULER_LEASE_TTL' seconds - and renews it from
+a heartbeat thread. If the leader dies, or can't reach the database, its lease expires, and one of the other processes
+takes it over. Expiration is compared with the database's clock, so clocks of nodes don't have to be in sync.
+Leader considers itself leader only until the lease it last renewed would expire, measured from before the renewal,
+so it steps down before anyone else can take the lease over. """
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DateTimeField, ExpressionWrapper
+from django.db.models.functions import Now
+
+from bot_app.models import SchedulerLease
+from bot_app.stats import Counter
+
+logger = logging.getLogger(__name__)
+
+elected_counter = Counter("scheduler.elected")
+
+
+class LeaderLease:
+    def __init__(self, name: str = "scheduler", ttl: int = None) -> None:
+        """ @param name: name of the lease, processes competing for the same name elect one leader.
+        @param ttl: seconds the lease is valid for after each renewal, 'SCHEDULER_LEASE_TTL' by default. """
+        self.name = name
+        self.ttl = ttl or settings.SCHEDULER_LEASE_TTL
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._valid_until = 0.0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{name}", daemon=True)
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """ Lease is renewed a few times per its TTL, so a single failed renewal doesn't lose it. """
+        return self.ttl / 3
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def acquire(self) -> bool:
+        """ Renew the lease if it's held by this process, or take it over if it has expired.
+        @return: True if this process holds the lease now. """
+        was_leader = self.is_leader
+        started = time.monotonic()
+        expires = ExpressionWrapper(Now() + timedelta(seconds=self.ttl), output_field=DateTimeField())
+        leases = SchedulerLease.objects.filter(name=self.name)
+
+        acquired = (
+            leases.filter(holder=self.holder).update(expires=expires)
+            or leases.filter(expires__lte=Now()).update(holder=self.holder, expires=expires, acquired=Now())
+            or self._create(expires=expires)
+        )
+        if acquired:
+            self._valid_until = started + self.ttl
+        else:
+            self._valid_until = 0.0
+
+        if acquired and not was_leader:
+            elected_counter.increment()
+            logger.info(f"Scheduler lease '{self.name}' acquired by {self.holder}.")
+        elif was_leader and not acquired:
+            logger.warning(f"Scheduler lease '{self.name}' lost by {self.holder}.")
+        return bool(acquired)
+
+    def _create(self, expires: ExpressionWrapper) -> bool:
+        """ Create the lease, if no process has ever held it. """
+        try:
+            with transaction.atomic():
+                _, created = SchedulerLease.objects.get_or_create(
+                    name=self.name, defaults={"holder": self.holder, "expires": expires, "acquired": Now()}
+                )
+        except IntegrityError:  # Other process created it at the same time.
+            return False
+        return created
+
+    def release(self) -> None:
+        """ Give the lease up, so other process can take it over right away, instead of waiting for it to expire. """
+        was_leader = self.is_leader
+        self._valid_until = 0.0
+        SchedulerLease.objects.filter(name=self.name, holder=self.holder).update(expires=Now())
+        if was_leader:
+            logger.info(f"Scheduler lease '{self.name}' released by {self.holder}.")
+
+    def start(self) -> None:
+        """ Try to acquire the lease right away, and keep renewing it, or waiting to take it over, in the background. """
+        self._try_acquire()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.release()
+
+    def _try_acquire(self) -> None:
+        try:
+            self.acquire()
+        except Exception:
+            # Leadership expires on its own, if database can't be reached.
+            logger.exception(f"Couldn't acquire scheduler lease '{self.name}'.")
+
+    def _heartbeat(self) -> None:
+        try:
+            while not self._stop_event.wait(self.heartbeat_interval):
+                self._try_acquire()
+        finally:
+            connection.close()  # Connection of this thread.
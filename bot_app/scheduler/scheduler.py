@@ -1,34 +1,92 @@
+import functools
+import logging
+import queue
 import threading
 import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
 
 import schedule
+from django.conf import settings
+from django.db import close_old_connections, connection
 
-from bot_app.scheduler.jobs import send_periodic_messages, notify_about_new_points, create_users_from_slack
+from bot_app.outbox import dispatch_outbox
+from bot_app.scheduler.broadcasts import schedule_reminders, schedule_winners_announcement
+from bot_app.scheduler.jobs import send_periodic_messages, notify_about_new_points
+from bot_app.scheduler.leader import LeaderLease
+from bot_app.stats import Counter
+from bot_app.users import create_users_from_slack
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobRun:
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+    SKIPPED = "skipped"  # Previous run of the job hasn't finished yet.
+
+    job: str
+    started: datetime
+    outcome: str = RUNNING
+    seconds: float = 0.0
+    _start: float = 0.0  # Monotonic time, to measure duration and timeout.
 
 
 class Scheduler:
     """ This class handles scheduling events, like sending periodic texts. It runs scheduler in the background
-    as a separate thread, not blocking the main app. It will run scheduled jobs, but only if main app is running.
-    Will not rerun any missed jobs if app was down.
+    as a separate thread, not blocking the main app - either in web server's processes, or in a dedicated one
+    ('run_scheduler' command). Will not rerun any missed jobs if app was down.
 
-    If app was to run in multiple containers there might be a need to move Scheduler elsewhere,
-    to run completely independently form the main app, so jobs aren't run multiple times. """
+    Scheduler's thread sleeps until the next job is due, and hands due jobs over to a pool of 'SCHEDULER_WORKERS'
+    threads, so a slow job doesn't delay others. A job isn't run again while its previous run hasn't finished.
+    Job running longer than its timeout is reported as timed out - threads can't be killed, so it keeps running,
+    but it doesn't block other jobs. Duration and outcome of recent runs are kept in 'history', and counted.
+    With 'SCHEDULER_WORKERS' set to 0 jobs are run one after another in the scheduler's thread.
+
+    If app runs in multiple processes or containers, they elect a leader with 'LeaderLease', and only the leader
+    runs jobs. Others skip jobs that are due, so a process that takes the leadership over doesn't run again jobs
+    that were already run by the previous leader. Without a lease every process runs all jobs.
+
+    When a job is due, schedule runs it as usual, and keeps track of its runs, but job's function only submits it
+    here (see '_Job'), where the leader check, the worker pool and the timeouts are handled. """
     _thread: threading.Thread
     _stop_thread_event: threading.Event
 
-    def __init__(self, check_rate: int = 60) -> None:
-        """ @param check_rate: interval in seconds, how often scheduler checks if any job should be run. """
+    def __init__(self, check_rate: int = 60, lease: LeaderLease = None) -> None:
+        """ @param check_rate: longest interval in seconds between checks if any job should be run, e.g. after
+            this process has become the leader.
+        @param lease: lease elected leader holds, None to run jobs in this process regardless of others. """
         self._scheduler = schedule.Scheduler()
+        self.lease = lease
+        self.history: deque[JobRun] = deque(maxlen=100)
+
+        self._running: dict[_Job, JobRun] = {}
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+            for i in range(settings.SCHEDULER_WORKERS)
+        ]
 
         self._stop_thread_event = threading.Event()
         self._thread = self.SchedulerThread(
-            scheduler=self._scheduler, check_rate=check_rate, stop_event=self._stop_thread_event
+            scheduler=self, check_rate=check_rate, stop_event=self._stop_thread_event
         )
         self._thread.daemon = True  # Die if main app exits.
 
+        self.succeeded = Counter("scheduler.succeeded")
+        self.failed = Counter("scheduler.failed")
+        self.timed_out = Counter("scheduler.timed_out")
+        self.skipped = Counter("scheduler.skipped")
+
     class SchedulerThread(threading.Thread):
         def __init__(
-                self, scheduler: schedule.Scheduler, check_rate: int, stop_event: threading.Event, *args, **kwargs
+                self, scheduler: "Scheduler", check_rate: int, stop_event: threading.Event, *args, **kwargs
         ):
             super().__init__(*args, **kwargs)
 
@@ -37,19 +95,154 @@ class Scheduler:
             self._stop_event = stop_event
 
         def run(self):
-            while not self._stop_event.is_set():
-                self._scheduler.run_pending()
-                time.sleep(self._check_rate)
+            try:
+                while not self._stop_event.is_set():
+                    self._scheduler.run_pending()
+                    self._scheduler.check_timeouts()
+                    self._stop_event.wait(self._scheduler.get_idle_seconds(limit=self._check_rate))
+            finally:
+                connection.close()  # Connection of this thread, used by jobs if there are no workers.
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lease is None or self.lease.is_leader
+
+    def run_pending(self) -> None:
+        self._scheduler.run_pending()
+
+    def _submit(self, job: "_Job") -> None:
+        """ Called by schedule, when the job is due. Job is run by a worker, if this process is the leader. """
+        if not self.is_leader:
+            return
+        name = job.name
+        with self._lock:
+            previous = self._running.get(job)
+            if previous is None:
+                run = self._running[job] = JobRun(job=name, started=datetime.now(), _start=time.monotonic())
+
+        if previous is not None:
+            self.skipped.increment()
+            self.history.append(JobRun(job=name, started=datetime.now(), outcome=JobRun.SKIPPED))
+            logger.warning(f"Job {name} skipped, its run started at {previous.started} hasn't finished yet.")
+            return
+
+        if self._workers:
+            self._queue.put((job, run))
+        else:
+            self._execute(job, run)
+
+    def _work(self) -> None:
+        try:
+            while (task := self._queue.get()) is not None:
+                self._execute(*task)
+        finally:
+            connection.close()  # Connection of this thread.
+
+    def _execute(self, job: "_Job", run: JobRun) -> None:
+        try:
+            job.func()
+            outcome = JobRun.SUCCEEDED
+        except Exception:
+            logger.exception(f"Job {run.job} failed.")
+            outcome = JobRun.FAILED
+        finally:
+            # Connection in a transaction is caller's, when jobs are run inline inside it (e.g. by tests).
+            if not connection.in_atomic_block:
+                close_old_connections()
+
+        with self._lock:
+            del self._running[job]
+            run.seconds = time.monotonic() - run._start
+            timed_out = run.outcome == JobRun.TIMED_OUT
+            if not timed_out:
+                run.outcome = outcome
+        if not timed_out:
+            self.history.append(run)
+            (self.succeeded if outcome == JobRun.SUCCEEDED else self.failed).increment()
+        logger.info(f"Job {run.job} {outcome} in {run.seconds:.1f}s.")
+
+    def check_timeouts(self) -> None:
+        """ Report jobs running longer than their timeouts. They are reported once, and not run again until they
+        finish. """
+        now = time.monotonic()
+        with self._lock:
+            timed_out = [
+                run for job, run in self._running.items()
+                if run.outcome == JobRun.RUNNING and now - run._start > job.get_timeout()
+            ]
+            for run in timed_out:
+                run.outcome = JobRun.TIMED_OUT
+                run.seconds = now - run._start
+
+        for run in timed_out:
+            self.timed_out.increment()
+            self.history.append(run)
+            logger.error(f"Job {run.job} timed out, it's been running for {run.seconds:.1f}s.")
+
+    def get_idle_seconds(self, limit: float) -> float:
+        """ @return: seconds until the next job is due or running job times out, but no more than 'limit'. """
+        deadlines = [limit]
+        if self._scheduler.idle_seconds is not None:
+            deadlines.append(self._scheduler.idle_seconds)
+
+        now = time.monotonic()
+        with self._lock:
+            deadlines += [
+                run._start + job.get_timeout() - now
+                for job, run in self._running.items() if run.outcome == JobRun.RUNNING
+            ]
+        return max(min(deadlines), 0.0)
 
     def run(self) -> None:
+        if self.lease:
+            self.lease.start()
+        for worker in self._workers:
+            worker.start()
         self._thread.start()
 
     def stop(self) -> None:
+        """ Stop scheduling jobs. With a lease (e.g. in 'run_scheduler' command) wait for running jobs to finish,
+        before giving the leadership up. """
         self._stop_thread_event.set()
+        for _ in self._workers:
+            self._queue.put(None)
+        if self.lease:
+            self._thread.join()
+            for worker in self._workers:
+                worker.join()
+            self.lease.stop()
+
+    def every(self, interval: int = 1, timeout: int = None) -> "_Job":
+        """ This method exists to ensure original schedule's interface for settings jobs.
+        @param timeout: seconds after which the job is reported as timed out, 'SCHEDULER_JOB_TIMEOUT' by default. """
+        return _Job(interval=interval, scheduler=self, timeout=timeout)
+
+
+class _Job(schedule.Job):
+    """ schedule's job, which submits its function to 'Scheduler' when it's due, instead of running it. """
+
+    def __init__(self, interval: int, scheduler: Scheduler, timeout: Optional[int]) -> None:
+        super().__init__(interval, scheduler._scheduler)
+        self.timeout = timeout
+        self.func: Optional[Callable] = None
+        self._owner = scheduler
 
-    def every(self, interval: int = 1) -> schedule.Job:
-        """ This method exists to ensure original schedule's interface for settings jobs. """
-        return self._scheduler.every(interval=interval)
+    @property
+    def name(self) -> str:
+        return getattr(self.func, "__name__", repr(self.func))
+
+    def get_timeout(self) -> float:
+        return self.timeout or settings.SCHEDULER_JOB_TIMEOUT
+
+    def do(self, job_func: Callable, *args, **kwargs) -> "_Job":
+        self.func = functools.partial(job_func, *args, **kwargs)
+        functools.update_wrapper(self.func, job_func)
+
+        def submit() -> None:
+            self._owner._submit(self)
+
+        functools.update_wrapper(submit, job_func)  # Named after the function in schedule's logs.
+        return super().do(submit)
 
 
 def schedule_jobs(scheduler: Scheduler) -> None:
@@ -57,4 +250,22 @@ def schedule_jobs(scheduler: Scheduler) -> None:
     How to schedule a new job: https://schedule.readthedocs.io/en/stable/examples.html"""
     scheduler.every().day.at("10:00").do(create_users_from_slack)
     scheduler.every().day.at("10:00").do(send_periodic_messages)
+    # Register month-end messages in Slack ahead of time, if SCHEDULE_BROADCASTS is enabled.
+    # Reminders are registered in batches, so the job is run often, until all are registered.
+    scheduler.every(10, timeout=10 * 60).minutes.do(schedule_reminders)
+    scheduler.every().day.at("09:30").do(schedule_winners_announcement)
     scheduler.every().day.at("16:00").do(notify_about_new_points)
+    # Retry messages that couldn't be sent right away.
+    scheduler.every(timeout=5 * 60).minute.do(dispatch_outbox)
+
+
+def start_scheduler(check_rate: int = 60) -> Scheduler:
+    """ Start scheduler competing for the leadership with other app's processes.
+    Users are synced from Slack on the startup, but only by the leader, so they aren't crawled by every process. """
+    scheduler = Scheduler(check_rate=check_rate, lease=LeaderLease(name="scheduler"))
+    schedule_jobs(scheduler=scheduler)
+    scheduler.run()
+
+    if scheduler.is_leader:
+        create_users_from_slack()
+    return scheduler
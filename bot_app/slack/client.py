@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from slack_sdk import WebClient
@@ -7,9 +8,9 @@ from slack_sdk.web import SlackResponse
 class SlackClient:
     _bot_id: str = None
 
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, base_url: str = WebClient.BASE_URL) -> None:
         self._token = token
-        self._client = WebClient(token=self._token)
+        self._client = WebClient(token=self._token, base_url=base_url)
         self._client._logger.setLevel(level=logging.INFO)  # It's DEBUG by default for some reason.
 
     @property
@@ -24,5 +25,46 @@ class SlackClient:
     def post_chat_message(self, message: dict, text: str) -> SlackResponse:
         return self._client.chat_postMessage(**message, text=text)
 
-    def users_list(self) -> SlackResponse:
-        return self._client.users_list()
+    def schedule_message(self, channel: str, text: str, post_at: int) -> SlackResponse:
+        """ @param post_at: unix timestamp of when the message should be posted. """
+        return self._client.chat_scheduleMessage(channel=channel, text=text, post_at=post_at)
+
+    def delete_scheduled_message(self, channel: str, scheduled_message_id: str) -> SlackResponse:
+        return self._client.chat_deleteScheduledMessage(channel=channel, scheduled_message_id=scheduled_message_id)
+
+    def call(self, method: str, payload: dict) -> SlackResponse:
+        """ Call any Slack API method, e.g. 'chat.postMessage', with given params. """
+        return getattr(self._client, method.replace('.', '_'))(**payload)
+
+    def users_list(self, cursor: str = None, limit: int = 200) -> SlackResponse:
+        return self._client.users_list(cursor=cursor, limit=limit)
+
+    def users_info(self, user: str) -> SlackResponse:
+        return self._client.users_info(user=user)
+
+
+class AsyncSlackClient:
+    """ Async counterpart of SlackClient, used by views, so waiting for Slack API doesn't block the worker.
+    It's built on AsyncWebClient, which needs 'aiohttp' package. Without it, calls of given SlackClient are run
+    in threads, so views work the same, just without the benefit. """
+
+    def __init__(self, token: str, sync_client: SlackClient, base_url: str = WebClient.BASE_URL) -> None:
+        self._sync_client = sync_client
+        try:
+            from slack_sdk.web.async_client import AsyncWebClient
+        except ImportError:
+            self._client = None
+        else:
+            self._client = AsyncWebClient(token=token, base_url=base_url)
+            self._client._logger.setLevel(level=logging.INFO)
+
+    async def _call(self, method: str, **kwargs) -> SlackResponse:
+        if self._client is None:
+            return await asyncio.to_thread(getattr(self._sync_client._client, method), **kwargs)
+        return await getattr(self._client, method)(**kwargs)
+
+    async def open_view(self, trigger_id: str, view: dict) -> SlackResponse:
+        return await self._call("views_open", trigger_id=trigger_id, view=view)
+
+    async def post_chat_message(self, message: dict, text: str) -> SlackResponse:
+        return await self._call("chat_postMessage", **message, text=text)
@@ -1,18 +1,15 @@
-import string
-
+from django.conf import settings
+from django.core.cache import cache
 from pyee import EventEmitter
 
-from bot_app.utils import get_slack_client, get_user, send_about_message
-
-KEYWORDS = ["wyróżnień", "wyroznien"]
+from bot_app.slack.keywords import KEYWORDS, contains_keywords
+from bot_app.stats import Counter
+from bot_app.users import get_or_fetch_user, save_user_from_slack
+from bot_app.utils import get_slack_client, send_about_message
 
 slack_events_adapter = EventEmitter()
 
-
-def contains_keywords(message: str) -> bool:
-    msg = message.lower()
-    msg = msg.translate(str.maketrans("", "", string.punctuation))
-    return any(word in msg for word in KEYWORDS)
+cooldown_counter = Counter('events.cooldown')
 
 
 @slack_events_adapter.on("message")
@@ -23,17 +20,37 @@ def on_message(payload: dict) -> None:
     ts = payload.get("ts")
     text = payload.get("text")
 
+    if not contains_keywords(message=text or ""):
+        return
+
     client = get_slack_client()
-    user = get_user(slack_id=user_id)
-    if user.is_bot or user_id == client.bot_id:
+    if user_id == client.bot_id:
+        return
+    user = get_or_fetch_user(slack_id=user_id)
+    if user.is_bot:
         return
 
-    if not contains_keywords(message=text.lower()):
+    # Answer each user on each channel at most once per 'KEYWORDS_COOLDOWN'. Cooldown is taken before answering, so
+    # concurrent messages get a single answer, and given back if answering fails, so the next message is answered.
+    cooldown_key = f'events:cooldown:{channel_id}:{user_id}'
+    if not cache.add(cooldown_key, True, timeout=settings.KEYWORDS_COOLDOWN):
+        cooldown_counter.increment()
         return
 
-    msg = dict(channel=channel_id, thread_ts=ts)
-    text = "Informacje o pragramie wyróżnień przesłałem Ci na pw."
-    client.post_chat_message(msg, text=text)
+    try:
+        msg = dict(channel=channel_id, thread_ts=ts)
+        text = "Informacje o pragramie wyróżnień przesłałem Ci na pw."
+        client.post_chat_message(msg, text=text)
 
-    send_about_message(user=user)  # TODO send only once for hour on each channel?
+        send_about_message(user=user)
+    except Exception:
+        cache.delete(cooldown_key)
+        raise
     return
+
+
+@slack_events_adapter.on("team_join")
+@slack_events_adapter.on("user_change")
+def on_user_change(payload: dict) -> None:
+    """ Keep users up to date between daily syncs - save user that joined the workspace or changed their data. """
+    save_user_from_slack(data=payload["user"])
@@ -0,0 +1,72 @@
+""" Matching messages that mention the awards program. Patterns are compiled once, on import.
+
+Keywords are matched case-insensitively, with or without Polish diacritics (e.g. "wyróżnień", "wyroznien", "WYRÓŻNIEŃ"),
+and ignoring punctuation between letters. 'may_contain_keywords' does the same on raw body of event request, where
+letters can also be escaped by JSON encoder (e.g. "wyr\\u00f3\\u017cnie\\u0144"), so messages without keywords can be
+rejected without parsing the body. """
+import re
+import string
+
+KEYWORDS = ["wyróżnień", "wyroznien"]
+
+_DIACRITICS = {
+    "a": "ą", "c": "ć", "e": "ę", "l": "ł", "n": "ń", "o": "ó", "s": "ś", "z": "żź",
+}
+_BASE_LETTERS = {diacritic: letter for letter, diacritics in _DIACRITICS.items() for diacritic in diacritics}
+
+
+def _get_letter_variants(letter: str) -> list[str]:
+    """ @return: the letter, its diacritic variants and upper case of all of them. """
+    base = _BASE_LETTERS.get(letter, letter)
+    variants = [base, *_DIACRITICS.get(base, "")]
+    return variants + [variant.upper() for variant in variants]
+
+
+def _get_keywords() -> set[str]:
+    """ @return: keywords without diacritics, so each of them is matched once. """
+    return {"".join(_BASE_LETTERS.get(letter, letter) for letter in keyword.lower()) for keyword in KEYWORDS}
+
+
+def _compile_text_pattern() -> re.Pattern:
+    punctuation = f"[{re.escape(string.punctuation)}]*"
+    keywords = [
+        punctuation.join(f"[{''.join(_get_letter_variants(letter))}]" for letter in keyword)
+        for keyword in sorted(_get_keywords())
+    ]
+    return re.compile("|".join(keywords))
+
+
+def _compile_body_pattern() -> re.Pattern:
+    """ Pattern matching lower-cased body. 'bytes.lower' changes only ASCII letters, so also hex digits of escapes,
+    but not UTF-8 encoded letters with diacritics - both their cases are kept in the pattern. """
+    # JSON escapes quotes and backslashes, so punctuation may be preceded by a backslash.
+    punctuation = b"[" + re.escape(string.punctuation.encode()) + b"]*"
+    keywords = []
+    for keyword in sorted(_get_keywords()):
+        letters = []
+        for letter in keyword:
+            variants = [letter.encode()]
+            for variant in _get_letter_variants(letter):
+                if not variant.isascii():
+                    variants += [variant.encode(), f"\\u{ord(variant):04x}".encode()]
+            letters.append(b"(?:" + b"|".join(map(re.escape, variants)) + b")" if len(variants) > 1 else variants[0])
+        keywords.append(punctuation.join(letters))
+    return re.compile(b"|".join(keywords))
+
+
+_TEXT_PATTERN = _compile_text_pattern()
+_BODY_PATTERN = _compile_body_pattern()
+_MESSAGE_EVENT_PATTERN = re.compile(rb'"type"\s*:\s*"message"')
+
+
+def contains_keywords(message: str) -> bool:
+    return _TEXT_PATTERN.search(message) is not None
+
+
+def may_contain_keywords(body: bytes) -> bool:
+    """ Check raw body of event request, before it's parsed.
+    @return: False if it's a message event, and its text surely doesn't contain keywords. True otherwise.
+    """
+    if _MESSAGE_EVENT_PATTERN.search(body) is None:
+        return True
+    return _BODY_PATTERN.search(body.lower()) is not None
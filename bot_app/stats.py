@@ -0,0 +1,31 @@
+from django.core.cache import cache
+
+
+class Counter:
+    """ Named counter, used to check in production how app's caches, queues etc. are doing.
+    Values are kept in Django's cache, so they are shared between workers if cache backend is shared. """
+    _prefix = 'stats:'
+    registry: dict[str, 'Counter'] = {}
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._key = self._prefix + name
+        self.registry[name] = self
+
+    def increment(self, delta: int = 1) -> None:
+        if cache.add(self._key, delta, timeout=None):
+            return
+        try:
+            cache.incr(self._key, delta)
+        except ValueError:  # Key expired or was evicted in the meantime.
+            cache.set(self._key, delta, timeout=None)
+
+    @property
+    def value(self) -> int:
+        return cache.get(self._key, 0)
+
+
+def get_stats() -> dict[str, int]:
+    """ @return: dict with names of all counters as keys and their values as value. """
+    values = cache.get_many([counter._key for counter in Counter.registry.values()])
+    return {name: values.get(counter._key, 0) for name, counter in sorted(Counter.registry.items())}
@@ -1,18 +1,45 @@
-from os import listdir
+import functools
+from pathlib import Path
+from string import Formatter
+from typing import Callable
+
+
+class StaticText(str):
+    """ Text that is the same in every message, so its Block Kit section is built only once. """
+
+    @functools.cached_property
+    def section(self) -> dict:
+        """ Shared between messages, so it must not be modified. """
+        return {"type": "section", "text": {"type": "mrkdwn", "text": str(self)}}
+
+
+class Template:
+    """ Template in 'str.format' syntax, with its render function bound once. Templates without fields are rendered
+    once, into a StaticText shared between messages. """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.fields = {field for _, field, _, _ in Formatter().parse(text) if field is not None}
+        self.render = self._get_render()
+
+    def _get_render(self) -> Callable[..., str]:
+        if not self.fields:
+            static = StaticText(self.text.replace('{{', '{').replace('}}', '}'))
+            return lambda: static
+        return self.text.format
 
 
 class TextsSources:
     """ On app's startup loads all predefined texts that can be later sent to users in messages. """
-    _source = './bot_app/texts/'
+    _source = Path(__file__).resolve().parent / 'texts'
 
     def __init__(self):
         self._texts = {}
 
-        for file in listdir(self._source):
-            with open(self._source + file, encoding="utf-8") as f:
-                self._texts[file] = f.read()
+        for file in self._source.iterdir():
+            self._texts[file.name] = Template(file.read_text(encoding="utf-8"))
 
-    def __getitem__(self, item: str) -> str:
+    def __getitem__(self, item: str) -> Template:
         return self._texts[item]
 
 
@@ -23,80 +50,74 @@ class TextsBuilder:
         self._sources = sources
 
     @staticmethod
-    def _fill_lines(line: str, values: list[dict]) -> str:
-        result = []
-        for line_values in values:
-            result.append(line.format(**line_values))
-        return '\n'.join(result)
+    def _join(header: str, lines: list[str]) -> str:
+        return '\n'.join([header, *lines])
 
     def greeting(self, name: str) -> str:
-        return self._sources['greeting'].format(user=name)
+        return self._sources['greeting'].render(user=name)
 
     def about(self) -> str:
-        return self._sources['about']
+        return self._sources['about'].render()
 
     def remind_about_program(self) -> str:
-        return self._sources['remind_about_program']
+        return self._sources['remind_about_program'].render()
 
     def your_points(self, values: list[dict]) -> str:
         """ @param values: list of {'points': int, 'category': str} dicts. """
-        source = self._sources['your_points']
-        return self._fill_lines(line=source, values=values)
+        render = self._sources['your_points'].render
+        return '\n'.join([render(**line_values) for line_values in values])
 
     def your_vote(self, values: dict) -> str:
         """ @param values: {'user": str, "points": [{'category': str, 'points': int, 'user': str}]} dict. """
-        header = self._sources['your_votes_header']
-        line = self._sources['points_in_category']
-
-        header = header.format(user=values['user'])
-        lines = self._fill_lines(line=line, values=values['points'])
-        return f'{header}\n{lines}'
+        header = self._sources['your_votes_header'].render(user=values['user'])
+        render = self._sources['points_in_category'].render
+        return self._join(header, [render(**line_values) for line_values in values['points']])
 
     def got_voted(self, values: dict) -> str:
         """ @param values: {'people": int, "points": [{'category': str, 'points': int}]} dict. """
-        header = self._sources['got_voted']
-        line = self._sources['points_in_category']
-
-        header = header.format(people=values['people'])
-        lines = self._fill_lines(line=line, values=values['points'])
-        return f'{header}\n{lines}'
+        header = self._sources['got_voted'].render(people=values['people'])
+        render = self._sources['points_in_category'].render
+        return self._join(header, [render(**line_values) for line_values in values['points']])
 
     def announce_winners(self, values: list[dict]) -> str:
-        """ @param values: list of {'category': str, 'points': int, 'users': list[str]} dicts. """
-        header = self._sources['winners_header']
-        line = self._sources['winners_line']
-        draw = self._sources['winners_draw']
+        """ @param values: list of {'category': str, 'points': int, 'user': list[str]} dicts. """
+        render_line = self._sources['winners_line'].render
+        render_draw = self._sources['winners_draw'].render
 
-        result = []
+        lines = []
         for line_values in values:
-            is_draw = True if len(line_values['user']) > 1 else False
-            line_values['user'] = ', '.join(line_values['user'])
-
-            if is_draw:
-                result.append(draw.format(**line_values))
-            else:
-                result.append(line.format(**line_values))
-
-        lines = '\n'.join(result)
-        return f'{header}\n{lines}'
+            render = render_draw if len(line_values['user']) > 1 else render_line
+            lines.append(render(category=line_values['category'], points=line_values['points'],
+                                user=', '.join(line_values['user'])))
+        return self._join(self._sources['winners_header'].render(), lines)
 
     def you_have_not_voted(self) -> str:
-        return self._sources['you_have_not_voted']
+        return self._sources['you_have_not_voted'].render()
 
     def no_permissions(self) -> str:
-        return self._sources['no_permissions']
+        return self._sources['no_permissions'].render()
+
+    def busy(self) -> str:
+        return self._sources['busy'].render()
+
+    def top5_usage(self) -> str:
+        return self._sources['top5_usage'].render()
 
     def user_comments(self, user: str, comments: dict) -> str:
-        header = self._sources['user_comments'].format(user=user)
-        lines = [f'• {user}: {comment}' for user, comment in comments.items()]
-        lines = '\n'.join(lines)
-        return f'{header}\n{lines}'
-
-    def top5(self, category: str, users_points: list[tuple[str, int]]) -> str:
-        header = self._sources['top5_header'].format(category=category)
-        lines = [self._sources['top5_line'].format(user=user, points=points) for user, points in users_points]
-        lines = '\n'.join(lines)
-        return f'{header}\n{lines}'
+        header = self._sources['user_comments'].render(user=user)
+        return self._join(header, [f'• {user}: {comment}' for user, comment in comments.items()])
+
+    def earlier_comments(self, user: str, comments: list[tuple[str, str]]) -> str:
+        """ @param comments: list of (voting user, comment) tuples. """
+        if not comments:
+            return self._sources['no_earlier_comments'].render(user=user)
+        header = self._sources['earlier_comments'].render(user=user)
+        return self._join(header, [f'• {user}: {comment}' for user, comment in comments])
+
+    def top5(self, category: str, users_points: list[tuple[str, int]], top: int = 5) -> str:
+        header = self._sources['top5_header'].render(category=category, top=top)
+        render = self._sources['top5_line'].render
+        return self._join(header, [render(user=user, points=points) for user, points in users_points])
 
 
 texts = TextsBuilder(sources=TextsSources())
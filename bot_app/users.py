@@ -0,0 +1,116 @@
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from bot_app.identity import identity_cache
+from bot_app.models import SlackUser
+from bot_app.utils import get_slack_client, get_user
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UsersSyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    seconds: float = 0.0
+
+
+_USER_FIELDS = ["name", "real_name", "deleted", "is_bot", "slack_updated"]
+
+
+def _get_user_values(data: dict) -> dict:
+    """ Translate member data from Slack API to SlackUser's fields. """
+    return {
+        "slack_id": data["id"],
+        "name": data["name"],
+        "real_name": data.get("real_name") or data["name"],
+        "deleted": data.get("deleted") or False,
+        "is_bot": data.get("is_bot") or False,
+        "slack_updated": data.get("updated") or 0,
+    }
+
+
+def _get_slack_members() -> list[dict]:
+    """ Get all workspace's members, following 'users.list' pagination. """
+    client = get_slack_client()
+    members = []
+    cursor = None
+    while True:
+        result = client.users_list(cursor=cursor, limit=settings.USERS_SYNC_PAGE_SIZE)
+        members.extend(result.data.get("members", []))
+
+        cursor = result.data.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            return members
+
+
+def save_user_from_slack(data: dict) -> None:
+    """ Create or update single SlackUser from member data, e.g. received with 'team_join' or 'user_change' event.
+    Data older than already saved (events can come out of order) is ignored. """
+    values = _get_user_values(data)
+    slack_id = values.pop("slack_id")
+
+    updated = SlackUser.objects.filter(slack_id=slack_id, slack_updated__lte=values["slack_updated"]).update(**values)
+    if not updated:
+        SlackUser.objects.get_or_create(slack_id=slack_id, defaults=values)
+    identity_cache.invalidate([slack_id])
+
+
+def get_or_fetch_user(slack_id: str) -> SlackUser:
+    """ Get user, fetching and saving them from Slack if they aren't synced yet, e.g. the 'team_join' event was missed.
+    @raise SlackApiError: if there is no such member in Slack.
+    """
+    try:
+        return get_user(slack_id=slack_id)
+    except ValueError:
+        result = get_slack_client().users_info(user=slack_id)
+        save_user_from_slack(data=result.data["user"])
+        return get_user(slack_id=slack_id)
+
+
+def create_users_from_slack() -> UsersSyncResult:
+    """ Create and update SlackUsers from workspace's members. Users are kept up to date by Slack's events,
+    so this is only a reconciliation - only members whose Slack 'updated' timestamp has changed are fetched from
+    the database and written, in batches. """
+    start = time.perf_counter()
+    members = {data["id"]: _get_user_values(data) for data in _get_slack_members()}
+    known = dict(SlackUser.objects.values_list("slack_id", "slack_updated"))
+
+    result = UsersSyncResult()
+    to_create, changed = [], []
+    for slack_id, values in members.items():
+        if slack_id not in known:
+            to_create.append(SlackUser(**values))
+        elif known[slack_id] != values["slack_updated"]:
+            changed.append(slack_id)
+        else:
+            result.unchanged += 1
+
+    to_update = []
+    for user in SlackUser.objects.filter(slack_id__in=changed) if changed else []:
+        values = members[user.slack_id]
+        if all(getattr(user, field) == values[field] for field in _USER_FIELDS):
+            result.unchanged += 1
+            continue
+        for field in _USER_FIELDS:
+            setattr(user, field, values[field])
+        to_update.append(user)
+
+    with transaction.atomic():
+        SlackUser.objects.bulk_create(to_create, batch_size=settings.USERS_SYNC_BATCH_SIZE)
+        SlackUser.objects.bulk_update(to_update, fields=_USER_FIELDS, batch_size=settings.USERS_SYNC_BATCH_SIZE)
+    identity_cache.invalidate([user.slack_id for user in to_update])
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        f"Users synced from Slack in {result.seconds:.2f}s: "
+        f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged."
+    )
+    return result
@@ -1,15 +1,26 @@
 import calendar
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 
 import pytz
 from django.apps import apps
-from django.db.models import Sum
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from bot_app.apps import BotAppConfig
+from bot_app.cache import cached_report, invalidate_reports
+from bot_app.executor import executor
+from bot_app.identity import identity_cache
 from bot_app.message import build_text_message
-from bot_app.models import Vote, SlackUser, CATEGORIES
-from bot_app.slack.client import SlackClient
+from bot_app.models import Vote, SlackUser, VoteRevision, CATEGORIES, get_current_period
+from bot_app.outbox import dispatch_outbox, enqueue_message
+from bot_app.rollup import update_daily_points
+from bot_app.slack.client import AsyncSlackClient, SlackClient
 from bot_app.texts import texts
 
 logger = logging.getLogger()
@@ -21,13 +32,42 @@ def get_slack_client() -> SlackClient:
     return apps.get_app_config(BotAppConfig.name).slack_client
 
 
+def get_async_slack_client() -> AsyncSlackClient:
+    return apps.get_app_config(BotAppConfig.name).async_slack_client
+
+
 def get_user(slack_id: str) -> SlackUser:
-    try:
-        return SlackUser.objects.get(slack_id=slack_id)
-    except SlackUser.DoesNotExist as e:
-        raise ValueError(e)
+    """ Get user through the identity cache. Only 'slack_id', 'real_name', 'is_bot' and 'is_hr' fields are loaded,
+    other fields are fetched from the database on access.
+    @raise ValueError: if there is no user with given slack id.
+    """
+    identity = identity_cache.get(slack_id)
+    if identity is None:
+        raise ValueError(f"SlackUser {slack_id} does not exist.")
+    return identity.to_user()
+
+
+async def aget_user(slack_id: str) -> SlackUser:
+    """ Async version of 'get_user'. """
+    identity = await identity_cache.aget(slack_id)
+    if identity is None:
+        raise ValueError(f"SlackUser {slack_id} does not exist.")
+    return identity.to_user()
+
+
+def _annotate_points(users: QuerySet, start: datetime, end: datetime) -> QuerySet:
+    """Annotate users with sum of points received in each category within given time range.
+    Points are summed from daily rollup, so the range is rounded to whole days.
+    Users without any votes get 0 points. Whole calculation is done by the database in a single GROUP BY query.
+    """
+    in_range = Q(daily_points__day__range=(start.date(), end.date()))
+    return users.annotate(**{
+        field: Coalesce(Sum(f"daily_points__{field}", filter=in_range), 0)
+        for field in CATEGORIES.keys()
+    })
 
 
+@cached_report('points')
 def calculate_points(voted_user, start: datetime, end: datetime) -> dict:
     """Calculate points for single user in each category.
     Enter input params start and end to calculate points in selected time range.
@@ -38,21 +78,10 @@ def calculate_points(voted_user, start: datetime, end: datetime) -> dict:
     @rtype: dict
     @return: dict with categories as keys and sum of point as value.
     """
-    points = {
-        "points_team_up_to_win": Vote.objects.filter(
-            voted_user=get_user(voted_user), created__range=(start, end)
-        ).aggregate(Sum("points_team_up_to_win"))["points_team_up_to_win__sum"],
-        "points_act_to_deliver": Vote.objects.filter(
-            voted_user=get_user(voted_user), created__range=(start, end)
-        ).aggregate(Sum("points_act_to_deliver"))["points_act_to_deliver__sum"],
-        "points_disrupt_to_grow": Vote.objects.filter(
-            voted_user=get_user(voted_user), created__range=(start, end)
-        ).aggregate(Sum("points_disrupt_to_grow"))["points_disrupt_to_grow__sum"],
-    }
-
-    for k, v in points.items():
-        if v is None:
-            points[k] = 0
+    users = SlackUser.objects.filter(slack_id=voted_user)
+    points = _annotate_points(users=users, start=start, end=end).values(*CATEGORIES.keys()).first()
+    if points is None:
+        raise ValueError(f"SlackUser {voted_user} does not exist.")
     return points
 
 
@@ -65,23 +94,79 @@ def total_points(start: datetime, end: datetime) -> dict:
     @rtype: dict
     @return : dict contain sum of point for all slack users.
     """
-    users = SlackUser.objects.filter(is_bot=False)
-    points = {
-        user.slack_id: calculate_points(voted_user=user.slack_id, start=start, end=end)
-        for user in users
-    }
-    return points
+    users = SlackUser.objects.filter(is_bot=False).order_by("pk")
+    rows = _annotate_points(users=users, start=start, end=end).values("slack_id", *CATEGORIES.keys())
+    return {row.pop("slack_id"): row for row in rows}
 
 
-def send_about_message(user: SlackUser) -> None:
+def get_about_content(user: SlackUser) -> list[str]:
     greeting = texts.greeting(name=user.real_name)
     content = texts.about()
-    message = build_text_message(channel=user.slack_id, content=[greeting, content])
+    return [greeting, content]
+
+
+def send_about_message(user: SlackUser) -> None:
+    message = build_text_message(channel=user.slack_id, content=get_about_content(user=user))
 
     client = get_slack_client()
     client.post_chat_message(message, text="Information about awards program.")
 
 
+@cached_report('ranking')
+def get_ranking(start: datetime, end: datetime, top: int) -> dict:
+    """Rank users by points received in each category. Ties share the same rank, while position is unique within
+    category (ties are ordered by user's primary key). Ranking is done by backend chosen in 'RANKING_BACKEND' setting.
+    Enter input params start and end for ranking in time range.
+    @param start: datetime
+    @param end: datetime
+    @param top: int - how many best users to return in each category, winners are always returned.
+    @rtype: dict
+    @return: dict with categories as keys and list of {'slack_id': str, 'real_name': str, 'points': int, 'rank': int,
+        'position': int} dicts, ordered by position, as value.
+    """
+    if settings.RANKING_BACKEND == "database":
+        return _get_database_ranking(start=start, end=end, top=top)
+    if settings.RANKING_BACKEND == "numpy":
+        from bot_app.matrix import get_matrix_ranking
+        return get_matrix_ranking(start=start, end=end, top=top)
+    raise ImproperlyConfigured(f"Unknown RANKING_BACKEND: {settings.RANKING_BACKEND}.")
+
+
+def _get_database_ranking(start: datetime, end: datetime, top: int) -> dict:
+    """Rank users in a single query, with window functions partitioned by category. """
+    users = SlackUser.objects.filter(is_bot=False).order_by()
+    users = _annotate_points(users=users, start=start, end=end).values("id", "slack_id", "real_name", *CATEGORIES.keys())
+    users_sql, users_params = users.query.sql_with_params()
+
+    # Unpivot categories into rows, so a window can be partitioned by category.
+    points_sql = " UNION ALL ".join(
+        f"SELECT id, slack_id, real_name, %s AS category, {field} AS points FROM users" for field in CATEGORIES.keys()
+    )
+    sql = f"""
+        WITH users AS ({users_sql}), points AS ({points_sql}), ranked AS (
+            SELECT
+                category, slack_id, real_name, points,
+                RANK() OVER (PARTITION BY category ORDER BY points DESC) AS user_rank,
+                ROW_NUMBER() OVER (PARTITION BY category ORDER BY points DESC, id) AS user_position
+            FROM points
+        )
+        SELECT category, slack_id, real_name, points, user_rank, user_position
+        FROM ranked
+        WHERE user_rank = 1 OR user_position <= %s
+        ORDER BY category, user_position
+    """
+    params = (*users_params, *CATEGORIES.keys(), top)
+
+    ranking = {category: [] for category in CATEGORIES.keys()}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for category, slack_id, real_name, points, rank, position in cursor.fetchall():
+            ranking[category].append(
+                dict(slack_id=slack_id, real_name=real_name, points=points, rank=rank, position=position)
+            )
+    return ranking
+
+
 def get_winners_message(start: datetime, end: datetime) -> str:
     """Find the winners in each category for current month or all time.
     Enter input params ts_start and ts_end for searching in time range.
@@ -91,63 +176,34 @@ def get_winners_message(start: datetime, end: datetime) -> str:
     @rtype: str
     @return: message contain information about winners
     """
-    users_points = total_points(start=start, end=end)
-
-    # Find winners and their points for each category.
-    categories_winners = {}.fromkeys(CATEGORIES.keys())
-    categories_points = {}.fromkeys(CATEGORIES.keys())
-    for category in CATEGORIES.keys():
-        winners = []
-        winners_points = 0
+    ranking = get_ranking(start=start, end=end, top=0)
 
-        for user, values in users_points.items():
-            user_points = values[category]
-
-            if user_points > winners_points:
-                winners_points = user_points
-                winners = [user]
-            elif user_points == winners_points:
-                winners.append(user)
-
-        categories_winners[category] = winners
-        categories_points[category] = winners_points
-
-    # Generate winners message.
     winners_data = []
     for attr, category in CATEGORIES.items():
-        points = categories_points[attr]
-        users = [user.real_name
-                 for user in SlackUser.objects.filter(slack_id__in=categories_winners[attr], is_bot=False)]
+        winners = ranking[attr]
+        points = winners[0]["points"] if winners else 0
+        users = [winner["real_name"] for winner in winners]
         winners_data.append(dict(category=category, points=points, user=users))
     return texts.announce_winners(values=winners_data)
 
 
-def get_top5_message(start: datetime, end: datetime) -> str:
-    """Find the top 5 performers in each category for current month or any time period.
+def get_top5_message(start: datetime, end: datetime, top: int = None) -> str:
+    """Find the top performers in each category for current month or any time period.
     Enter input params ts_start and ts_end for searching in time range.
     You can use 'get_start_end_month' method to create ts_start and ts_end parameters for searching in current month.
     @param start: datetime
     @param end: datetime
+    @param top: int - how many performers to show in each category, 'TOP_USERS_COUNT' setting by default.
     @rtype: str
-    @return: message contain information about the top 5 performers in each category
+    @return: message contain information about the top performers in each category
     """
-    users_points = total_points(start=start, end=end)
-    for user, data in users_points.items():
-        data['user'] = user
-
-    # Get top5 for each category
-    each_categories_top5 = {}.fromkeys(CATEGORIES.keys())
-    for category in CATEGORIES.keys():
-        sorted_points = sorted(users_points.values(), key=lambda points: points[category], reverse=True)
-        top5 = sorted_points[:5]
-        each_categories_top5[category] = [(data['user'], data[category]) for data in top5]
-
-    # Translate slack user ID's into verbose slack usernames
+    top = top or settings.TOP_USERS_COUNT
+    ranking = get_ranking(start=start, end=end, top=top)
+
     messages = []
-    for category, top5 in each_categories_top5.items():
-        users_points = [(SlackUser.objects.get(slack_id=user).real_name, points) for user, points in top5]
-        category_top5_text = texts.top5(category=category, users_points=users_points)
-        messages.append(category_top5_text)
+    for category, users in ranking.items():
+        users_points = [(user["real_name"], user["points"]) for user in users if user["position"] <= top]
+        messages.append(texts.top5(category=category, users_points=users_points, top=top))
 
     message = '\n'.join(messages)
     return message
@@ -196,45 +252,127 @@ def get_start_end_half_year():
     return start, end
 
 
+def _upsert_vote(voting_user: SlackUser, voted_user: SlackUser, period: date, points: dict, comment: str,
+                 now: datetime, vote_id: Optional[int]) -> Optional[int]:
+    """ Insert the vote in a single statement, or update it if it conflicts with the vote 'vote_id' (locked by the
+    caller).
+    @return: id of saved vote, None if other vote for the same period has been inserted in the meantime, and nothing
+        was saved.
+    """
+    table = Vote._meta.db_table
+    fields = list(CATEGORIES.keys())
+    updates = ", ".join(f"{field} = EXCLUDED.{field}" for field in [*fields, "comment", "modified"])
+    sql = f"""
+        INSERT INTO {table} (voting_user_id, voted_user_id, period, {", ".join(fields)}, comment, created, modified)
+        VALUES (%s, %s, %s, {", ".join(["%s"] * len(fields))}, %s, %s, %s)
+        ON CONFLICT (voting_user_id, voted_user_id, period) DO UPDATE SET {updates}
+        WHERE {table}.id = %s
+        RETURNING id
+    """
+    now = connection.ops.adapt_datetimefield_value(now)
+    period = connection.ops.adapt_datefield_value(period)
+    params = [voting_user.pk, voted_user.pk, period, *(points[field] for field in fields), comment, now, now, vote_id]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
 def save_vote(vote: dict, user_id: str) -> None:
-    current_month = get_start_end_month()
-    res = Vote.objects.filter(
-        voting_user=get_user(user_id),
-        voted_user=get_user(vote["selected_user"]),
-        created__range=current_month,
-    )
+    """ Save user's vote for this month, or update it, if user has already voted for the same person.
+    Concurrent submissions of the same vote are saved one after another, thanks to the unique constraint. """
+    points = {field: vote[field] for field in CATEGORIES.keys()}
+    voting_user = get_user(user_id)
+    voted_user = get_user(vote["selected_user"])
+    period = get_current_period()
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Vote that's already saved is locked, so points it had are known, until it's updated.
+        for _ in range(2):
+            current = (
+                Vote.objects.select_for_update()
+                .filter(voting_user=voting_user, voted_user=voted_user, period=period)
+                .values("id", "created", *CATEGORIES.keys())
+                .first()
+            )
+            vote_id = _upsert_vote(voting_user=voting_user, voted_user=voted_user, period=period, points=points,
+                                   comment=vote["comment"], now=now, vote_id=current["id"] if current else None)
+            if vote_id:
+                break
+            # Concurrent submission has just inserted the vote, it can be read and locked now.
+        else:
+            raise RuntimeError(f"Couldn't save vote of {user_id} for {vote['selected_user']}.")
+        VoteRevision.objects.create(vote_id=vote_id, comment=vote["comment"], created=now, **points)
+
+        is_update = current is not None
+        if not is_update:
+            delta, day = points, now.date()
+        else:
+            delta = {field: value - current[field] for field, value in points.items()}
+            day = current["created"].date()
+        update_daily_points(user_id=voted_user.pk, day=day, delta=delta)
+
+        if is_update:
+            # Notify the user that he has updated his vote
+            content = f"Właśnie zaktualizowałeś swój głos na {voted_user.real_name}"
+            message = build_text_message(channel=user_id, content=[content])
+            update_message = enqueue_message(message, text="Vote update")
+    invalidate_reports()
+
+    if is_update:
+        # Only this message is sent right away, the rest of the outbox is left to the scheduler.
+        executor.submit(dispatch_outbox, ids=[update_message.pk])
+
+
+@cached_report('comments')
+def get_user_comments(voted_user: str, start: datetime, end: datetime) -> dict:
+    """Get comments given to user in selected time range.
+    @param voted_user: str - slack id
+    @param start: datetime
+    @param end: datetime
+    @rtype: dict
+    @return: dict with voting users' real names as keys and their comments as value.
+    """
+    votes = Vote.objects.filter(voted_user__slack_id=voted_user, created__range=(start, end))
+    return dict(votes.values_list('voting_user__real_name', 'comment'))
 
-    if not res.exists():
-        Vote.objects.create(
-            voting_user=get_user(user_id),
-            voted_user=get_user(vote["selected_user"]),
-            points_team_up_to_win=vote["points_team_up_to_win"],
-            points_act_to_deliver=vote["points_act_to_deliver"],
-            points_disrupt_to_grow=vote["points_disrupt_to_grow"],
-            comment=vote["comment"]
-        )
-    else:
-        res = res.first()
-        res.points_team_up_to_win = vote["points_team_up_to_win"]
-        res.points_act_to_deliver = vote["points_act_to_deliver"]
-        res.points_disrupt_to_grow = vote["points_disrupt_to_grow"]
-        res.modified = datetime.now()
-        res.comment = res.comment + f"\n\n{'=' * 30}\n\n" + vote["comment"]
-        res.save(
-            update_fields=[
-                "points_team_up_to_win",
-                "points_act_to_deliver",
-                "points_disrupt_to_grow",
-                "comment",
-                "modified"
-            ]
-        )
 
-        # Notify the user that he has updated his vote
-        client = get_slack_client()
-        content = f"Właśnie zaktualizowałeś swój głos na {res.voted_user.real_name}"
-        message = build_text_message(channel=user_id, content=[content])
-        client.post_chat_message(message, text="Vote update")
+def get_earlier_comments(voted_user: str, start: datetime, end: datetime, before: int = None,
+                         limit: int = 10) -> tuple[list[tuple[str, str]], Optional[int]]:
+    """Get comments of earlier submissions of votes given to user in selected time range, page by page. Comment of
+    the latest submission of each vote is kept in the vote itself, and returned by 'get_user_comments'.
+    @param voted_user: str - slack id
+    @param start: datetime
+    @param end: datetime
+    @param before: int - value returned with the previous page, None for the first page.
+    @param limit: int - size of the page.
+    @rtype: tuple
+    @return: list of (voting user's real name, comment) tuples, latest first, and value of 'before' for the next
+        page, None if there are no more comments.
+    """
+    revisions = _get_earlier_revisions(voted_user=voted_user, start=start, end=end)
+    if before is not None:
+        revisions = revisions.filter(id__lt=before)
+    rows = list(revisions.order_by('-id').values_list('id', 'vote__voting_user__real_name', 'comment')[:limit + 1])
+    page = rows[:limit]
+    next_before = page[-1][0] if len(rows) > limit else None
+    return [(name, comment) for _, name, comment in page], next_before
+
+
+def has_earlier_comments(voted_user: str, start: datetime, end: datetime) -> bool:
+    return _get_earlier_revisions(voted_user=voted_user, start=start, end=end).exists()
+
+
+def _get_earlier_revisions(voted_user: str, start: datetime, end: datetime) -> QuerySet:
+    """ Revisions with comments, other than the latest revision of each vote. """
+    latest = VoteRevision.objects.filter(vote=OuterRef('vote')).order_by('-id').values('id')[:1]
+    return VoteRevision.objects.filter(
+        vote__voted_user__slack_id=voted_user,
+        vote__created__range=(start, end),
+        id__lt=Subquery(latest),
+        comment__gt='',
+    )
 
 
 def get_your_votes_message(user: SlackUser, start: datetime = None, end: datetime = None) -> str:
@@ -242,19 +380,17 @@ def get_your_votes_message(user: SlackUser, start: datetime = None, end: datetim
         daterange = get_start_end_half_year()
     else:
         daterange = (start, end)
-    votes = list(Vote.objects.filter(
-        voting_user=user,
-        created__range=daterange,
-    ))
+    votes = list(
+        Vote.objects.filter(voting_user=user, created__range=daterange)
+        .order_by('created')
+        .values('voted_user__real_name', *CATEGORIES.keys())
+    )
 
     if not votes:
         return texts.you_have_not_voted()
 
     users_votes = []
     for vote in votes:
-        points = []
-        for field, category in CATEGORIES.items():
-            points.append({'category': category, 'points': getattr(vote, field)})
-        user_real_name = SlackUser.objects.get(name=vote.voted_user.name).real_name
-        users_votes.append(texts.your_vote(values={'user': user_real_name, 'points': points}))
+        points = [{'category': category, 'points': vote[field]} for field, category in CATEGORIES.items()]
+        users_votes.append(texts.your_vote(values={'user': vote['voted_user__real_name'], 'points': points}))
     return '\n\n'.join(users_votes)
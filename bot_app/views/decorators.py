@@ -0,0 +1,28 @@
+""" Counterparts of Django's 'csrf_exempt' and 'require_http_methods' decorators for async views, which Django 4.0
+supports only for sync views - their wrappers hide that the view is a coroutine function. """
+import functools
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed
+from django.utils.log import log_response
+
+
+def csrf_exempt(view: Callable) -> Callable:
+    """ Mark view as exempt from CSRF protection, without wrapping it. """
+    view.csrf_exempt = True
+    return view
+
+
+def require_post(view: Callable) -> Callable:
+    """ Allow only POST requests to async view. """
+    @functools.wraps(view)
+    async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if request.method != 'POST':
+            response = HttpResponseNotAllowed(['POST'])
+            log_response(
+                'Method Not Allowed (%s): %s', request.method, request.path, response=response, request=request
+            )
+            return response
+        return await view(request, *args, **kwargs)
+
+    return wrapper
@@ -1,17 +1,30 @@
 import json
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponseBadRequest, JsonResponse, HttpResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
 
 from bot_app.hmac import verify_request
 from bot_app.slack.events import slack_events_adapter
+from bot_app.slack.keywords import may_contain_keywords
+from bot_app.stats import Counter
+from bot_app.views.decorators import csrf_exempt, require_post
+
+duplicates_counter = Counter('events.duplicates')
+prefiltered_counter = Counter('events.prefiltered')
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def slack_event(request, *args, **kwargs):
+async def slack_event(request, *args, **kwargs):
+    # Bot gets every message from its channels, but only answers ones that mention the awards program. Rest of them
+    # are dropped here, before parsing. Keep it in mind when adding another handler of 'message' events.
+    if not may_contain_keywords(request.body):
+        prefiltered_counter.increment()
+        return HttpResponse()
+
     try:
         data = json.loads(request.body.decode("utf-8"))
     except (ValueError, json.JSONDecodeError) as e:
@@ -22,10 +35,17 @@ def slack_event(request, *args, **kwargs):
     if challenge := data.get('challenge'):
         return JsonResponse({'challenge': challenge})
 
+    # Slack retries events that weren't acknowledged in time, so the same event can come more than once.
+    if event_id := data.get('event_id'):
+        if not await cache.aadd(f'events:seen:{event_id}', True, timeout=settings.EVENTS_DEDUP_TIMEOUT):
+            duplicates_counter.increment()
+            return HttpResponse()
+
     # Parse the event payload and emit the event to the listener
     if event := data.get("event", {}):
         event_type = event.get("type")
-        slack_events_adapter.emit(event_type, event)
+        # Handlers are sync, they query the database and call Slack API.
+        await sync_to_async(slack_events_adapter.emit)(event_type, event)
         return HttpResponse()
 
     return HttpResponseBadRequest("Not a valid event.")
@@ -3,6 +3,9 @@ from datetime import datetime
 from django.conf import settings
 from django.http import HttpResponse, HttpRequest, JsonResponse
 
+from bot_app.identity import identity_cache
+from bot_app.stats import get_stats
+
 
 def index(_: HttpRequest) -> HttpResponse:
     return JsonResponse({
@@ -10,4 +13,6 @@ def index(_: HttpRequest) -> HttpResponse:
         'version': settings.VERSION,
         'timestamp': datetime.now(),
         'status': 'OK',
+        'stats': get_stats(),
+        'identity_cache': identity_cache.info(),
     })
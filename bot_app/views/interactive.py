@@ -1,31 +1,34 @@
 import json
 
+from asgiref.sync import sync_to_async
 from django.http import HttpResponse, JsonResponse
 from django.http import HttpResponseBadRequest
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
 
 from bot_app.hmac import verify_request
-from bot_app.message import build_text_message
-from bot_app.modals.get_comments import check_comments_header
-from bot_app.models import SlackUser, CATEGORIES, Vote
+from bot_app.message import build_text_message, build_text_messages
+from bot_app.modals.get_comments import build_earlier_comments_button, check_comments_header, \
+    earlier_comments_action_id
+from bot_app.models import CATEGORIES
 from bot_app.texts import texts
-from bot_app.utils import get_slack_client, get_start_end_half_year
-from bot_app.utils import save_vote
+from bot_app.utils import aget_user, get_async_slack_client, get_start_end_half_year
+from bot_app.utils import get_earlier_comments, get_user_comments, has_earlier_comments, save_vote
+from bot_app.views.decorators import csrf_exempt, require_post
 from bot_app.views.slash import logger
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def interactive(request):
-    """ Endpoint for receiving interactivity requests from Slack. Currently, handles submitted voting form and user
-    selection form for viewing a user's comments. """
+async def interactive(request):
+    """ Endpoint for receiving interactivity requests from Slack. Currently, handles submitted voting form, user
+    selection form for viewing a user's comments, and button showing earlier comments. """
     try:
         data = json.loads(request.POST.get('payload', ''))
     except json.JSONDecodeError as e:
         return HttpResponseBadRequest(e)
     # logger.warning(f"<DEBUG>data:\n{json.dumps(data, indent=4)}")
+    if data.get('type') == 'block_actions':
+        return await _handle_actions(data)
     if data.get('type') != 'view_submission':
         return HttpResponseBadRequest('Not a view submission.')
 
@@ -33,18 +36,18 @@ def interactive(request):
     # the vote modal
     if check_comments_header in data['view']['blocks']:
         selected_user_slack_id = data['view']['state']['values']['select_user']['select_user-action']['selected_user']
-        selected_user = SlackUser.objects.get(slack_id=selected_user_slack_id)
+        selected_user = await aget_user(slack_id=selected_user_slack_id)
 
         start, end = get_start_end_half_year()
-        comments = {
-            vote.voting_user.real_name: vote.comment
-            for vote in Vote.objects.filter(voted_user=selected_user, created__range=(start, end))
-        }
+        comments = await sync_to_async(get_user_comments)(voted_user=selected_user.slack_id, start=start, end=end)
         user_comments = texts.user_comments(user=selected_user.real_name, comments=comments)
+        footer = []
+        if await sync_to_async(has_earlier_comments)(voted_user=selected_user.slack_id, start=start, end=end):
+            footer.append(build_earlier_comments_button(voted_user=selected_user.slack_id))
 
-        message = build_text_message(channel=data["user"]["id"], content=[user_comments])
-        client = get_slack_client()
-        client.post_chat_message(message, text="Information about awards program.")
+        client = get_async_slack_client()
+        for message in build_text_messages(channel=data["user"]["id"], content=[user_comments], footer=footer):
+            await client.post_chat_message(message, text="Information about awards program.")
     else:
         # Get vote data.
         total_points = 0
@@ -69,8 +72,8 @@ def interactive(request):
             return HttpResponseBadRequest(msg)
 
         try:
-            user = SlackUser.objects.get(slack_id=data["user"]["id"])
-        except (SlackUser.DoesNotExist, ValueError):
+            user = await aget_user(slack_id=data["user"]["id"])
+        except ValueError:
             msg = 'Voting user does not exist.'
             logger.warning(msg)
 
@@ -84,8 +87,8 @@ def interactive(request):
             return HttpResponseBadRequest(f'Invalid view data: {e}')
 
         try:
-            voted_user = SlackUser.objects.get(slack_id=selected_user_slack_id)
-        except SlackUser.DoesNotExist:
+            voted_user = await aget_user(slack_id=selected_user_slack_id)
+        except ValueError:
             msg = 'Voted user does not exist.'
             logger.warning(msg)
 
@@ -110,5 +113,39 @@ def interactive(request):
             }
             return JsonResponse(response)
 
-        save_vote(vote=values, user_id=user.slack_id)
+        await sync_to_async(save_vote)(vote=values, user_id=user.slack_id)
+    return HttpResponse()
+
+
+async def _handle_actions(data: dict) -> HttpResponse:
+    """ Handles buttons clicked in bot's messages. """
+    try:
+        action = data['actions'][0]
+        user_id = data['user']['id']
+    except (KeyError, IndexError) as e:
+        return HttpResponseBadRequest(f'Invalid actions data: {e}')
+    if action.get('action_id') != earlier_comments_action_id:
+        return HttpResponseBadRequest('Unknown action.')
+
+    try:
+        user = await aget_user(slack_id=user_id)
+        value = json.loads(action['value'])
+        voted_user = await aget_user(slack_id=value['user'])
+    except (ValueError, KeyError, TypeError) as e:
+        return HttpResponseBadRequest(f'Invalid action value: {e}')
+
+    client = get_async_slack_client()
+    if not user.is_hr:
+        message = build_text_message(channel=user.slack_id, content=[texts.no_permissions()])
+        await client.post_chat_message(message, text="Information about awards program.")
+        return HttpResponse()
+
+    start, end = get_start_end_half_year()
+    comments, before = await sync_to_async(get_earlier_comments)(
+        voted_user=voted_user.slack_id, start=start, end=end, before=value.get('before')
+    )
+    content = [texts.earlier_comments(user=voted_user.real_name, comments=comments)]
+    footer = [build_earlier_comments_button(voted_user=voted_user.slack_id, before=before)] if before else []
+    for message in build_text_messages(channel=user.slack_id, content=content, footer=footer):
+        await client.post_chat_message(message, text="Information about awards program.")
     return HttpResponse()
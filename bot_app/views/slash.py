@@ -1,24 +1,62 @@
 import json
+from typing import Callable
 
-from django.http import HttpResponse, HttpRequest, HttpResponseBadRequest
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpRequest, HttpResponseBadRequest, JsonResponse
 
-from bot_app.forms import UserForm, TriggerForm
+from bot_app.executor import executor
+from bot_app.forms import UserForm, TriggerForm, TopForm
 from bot_app.hmac import verify_request
-from bot_app.message import build_text_message
+from bot_app.message import build_ephemeral_message, build_text_message, build_text_messages
 from bot_app.modals.vote import build_voting_modal
 from bot_app.modals.get_comments import build_comments_modal
 from bot_app.models import SlackUser, CATEGORIES
 from bot_app.texts import texts
-from bot_app.utils import calculate_points, get_start_end_month, get_start_end_half_year, get_winners_message, get_slack_client, get_your_votes_message, \
-    send_about_message, get_top5_message, logger
+from bot_app.utils import calculate_points, get_start_end_half_year, get_winners_message, get_slack_client, \
+    get_your_votes_message, get_about_content, get_top5_message, aget_user, get_async_slack_client, logger
+from bot_app.views.decorators import csrf_exempt, require_post
+
+
+async def _respond(command: str, user: SlackUser, build_content: Callable, text: str, **kwargs) -> HttpResponse:
+    """ Respond to slash command with message built by 'build_content' function.
+    For commands listed in 'INLINE_SLASH_COMMANDS' setting, message is returned in the response as an ephemeral
+    message, unless it's too long for a single message. Otherwise, the command is acknowledged right away, and message
+    is built and sent to the user as DMs in the background. If the bot is too busy to accept the work, user is told
+    about it with an ephemeral message. Content is built in a thread, as it queries the database.
+    @param command: name of the command, e.g. '/about'.
+    @param build_content: function building message's content, called with 'user' and 'kwargs'.
+    @param text: message's fallback text, shown in notifications.
+    """
+    task, task_kwargs = _send_message, {"build_content": build_content, **kwargs}
+    if command in settings.INLINE_SLASH_COMMANDS:
+        content = await sync_to_async(build_content)(user=user, **kwargs)
+        try:
+            return JsonResponse(build_ephemeral_message(content=content, text=text))
+        except ValueError:
+            # Content is already built, it's only sent in the background.
+            task, task_kwargs = _post_content, {"content": content}
+
+    submit = sync_to_async(executor.submit)  # Task is run right away, if there are no background workers.
+    if not await submit(task, user=user, text=text, **task_kwargs):
+        return JsonResponse(build_ephemeral_message(content=[texts.busy()], text=texts.busy()))
+    return HttpResponse()
+
+
+def _send_message(user: SlackUser, build_content: Callable, text: str, **kwargs) -> None:
+    _post_content(user=user, content=build_content(user=user, **kwargs), text=text)
+
+
+def _post_content(user: SlackUser, content: list[str], text: str) -> None:
+    client = get_slack_client()
+    for message in build_text_messages(channel=user.slack_id, content=content):
+        client.post_chat_message(message, text=text)
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def vote(request):
+async def vote(request):
     """ Handles '/vote' slash command. Shows user the voting form. """
     form = TriggerForm(request.POST)
     if not form.is_valid():
@@ -26,15 +64,15 @@ def vote(request):
         logger.warning(errors)
         return HttpResponseBadRequest(errors)
 
-    client = get_slack_client()
-    client.open_view(trigger_id=form.cleaned_data['trigger_id'], view=build_voting_modal())
+    client = get_async_slack_client()
+    await client.open_view(trigger_id=form.cleaned_data['trigger_id'], view=build_voting_modal())
     return HttpResponse()
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def check_comments(request):
+async def check_comments(request):
     """ Handles '/check-comments' slash command. Shows user the user select form. """
     form = TriggerForm(request.POST)
 
@@ -48,27 +86,27 @@ def check_comments(request):
                          .replace("=", "\": \"").replace("&", "\", \"") + "\"}")['user_id']
 
     try:
-        user = SlackUser.objects.get(slack_id=user_id)
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=user_id)
+    except ValueError:
         return HttpResponseBadRequest('User does not exist.')
 
-    client = get_slack_client()
+    client = get_async_slack_client()
 
     if not user.is_hr:
         content = texts.no_permissions()
         greeting = texts.greeting(name=user.real_name)
         message = build_text_message(channel=user.slack_id, content=[greeting, content])
-        client.post_chat_message(message, text="Check this month's top 5's!")
+        await client.post_chat_message(message, text="Check this month's top 5's!")
         return HttpResponse()
     else:
-        client.open_view(trigger_id=form.cleaned_data['trigger_id'], view=build_comments_modal())
+        await client.open_view(trigger_id=form.cleaned_data['trigger_id'], view=build_comments_modal())
     return HttpResponse()
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def check_votes(request):
+async def check_votes(request):
     """ Handles /check-votes slash command. Check points you've given in the current month. """
     form = UserForm(request.POST)
     if not form.is_valid():
@@ -77,23 +115,25 @@ def check_votes(request):
         return HttpResponseBadRequest(errors)
 
     try:
-        user = SlackUser.objects.get(slack_id=form.cleaned_data['user_id'])
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=form.cleaned_data['user_id'])
+    except ValueError:
         return HttpResponseBadRequest('User does not exist.')
 
+    return await _respond(
+        '/check-votes', user=user, build_content=_votes_content, text="Check points you've given in the current month."
+    )
+
+
+def _votes_content(user: SlackUser) -> list[str]:
     greeting = texts.greeting(name=user.real_name)
     votes_text = get_your_votes_message(user=user)
-    message = build_text_message(channel=user.slack_id, content=[greeting, votes_text])
-
-    client = get_slack_client()
-    client.post_chat_message(message, text="Check points you've given in the current month.")
-    return HttpResponse()
+    return [greeting, votes_text]
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def check_points(request: HttpRequest) -> HttpResponse:
+async def check_points(request: HttpRequest) -> HttpResponse:
     """ Handles /check-points slash command. Check your points in the current month. """
     form = UserForm(request.POST)
     logger.warning(form)
@@ -103,10 +143,16 @@ def check_points(request: HttpRequest) -> HttpResponse:
         return HttpResponseBadRequest(errors)
 
     try:
-        user = SlackUser.objects.get(slack_id=form.cleaned_data['user_id'])
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=form.cleaned_data['user_id'])
+    except ValueError:
         return HttpResponseBadRequest('User does not exist.')
 
+    return await _respond(
+        '/check-points', user=user, build_content=_points_content, text="Check your points in the current half-year."
+    )
+
+
+def _points_content(user: SlackUser) -> list[str]:
     start, end = get_start_end_half_year()
     points = calculate_points(voted_user=user.slack_id, start=start, end=end)
 
@@ -116,17 +162,13 @@ def check_points(request: HttpRequest) -> HttpResponse:
     content = texts.your_points(values=categories_points)
 
     greeting = texts.greeting(name=user.real_name)
-    message = build_text_message(channel=user.slack_id, content=[greeting, content])
-
-    client = get_slack_client()
-    client.post_chat_message(message, text="Check your points in the current half-year.")
-    return HttpResponse()
+    return [greeting, content]
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def check_winners(request):
+async def check_winners(request):
     """ Handles /check-winners slash command. Check winners in the current month. """
     form = UserForm(request.POST)
     if not form.is_valid():
@@ -135,10 +177,14 @@ def check_winners(request):
         return HttpResponseBadRequest(errors)
 
     try:
-        user = SlackUser.objects.get(slack_id=form.cleaned_data['user_id'])
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=form.cleaned_data['user_id'])
+    except ValueError:
         return HttpResponseBadRequest('User does not exist.')
 
+    return await _respond('/check-winners', user=user, build_content=_winners_content, text="Check this month's winners!")
+
+
+def _winners_content(user: SlackUser) -> list[str]:
     if not user.is_hr:
         content = texts.no_permissions()
     else:
@@ -146,46 +192,51 @@ def check_winners(request):
         content = get_winners_message(start=start, end=end)
 
     greeting = texts.greeting(name=user.real_name)
-    message = build_text_message(channel=user.slack_id, content=[greeting, content])
+    return [greeting, content]
 
-    client = get_slack_client()
-    client.post_chat_message(message, text="Check this month's winners!")
-    return HttpResponse()
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def check_top5(request):
-    """ Handles /check-top5 slash command. Check top 5 nominees of each category in the current month. """
-    form = UserForm(request.POST)
+async def check_top5(request):
+    """ Handles /check-top5 slash command. Check top nominees of each category in the current month.
+    Number of nominees can be passed as command's text, e.g. '/check-top5 10'. """
+    form = TopForm(request.POST)
     if not form.is_valid():
+        if list(form.errors) == ['text']:
+            # User mistyped the number, tell them how to use the command instead of failing it.
+            usage = texts.top5_usage()
+            return JsonResponse(build_ephemeral_message(content=[usage], text=usage))
         errors = form.errors.as_json()
         logger.warning(errors)
         return HttpResponseBadRequest(errors)
 
     try:
-        user = SlackUser.objects.get(slack_id=form.cleaned_data['user_id'])
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=form.cleaned_data['user_id'])
+    except ValueError:
         return HttpResponseBadRequest('User does not exist.')
 
+    return await _respond(
+        '/check-top5', user=user, build_content=_top5_content, text="Check this month's top 5's!",
+        top=form.cleaned_data['text'],
+    )
+
+
+def _top5_content(user: SlackUser, top: int = None) -> list[str]:
     if not user.is_hr:
         content = texts.no_permissions()
     else:
         start, end = get_start_end_half_year()
-        content = get_top5_message(start=start, end=end)
+        content = get_top5_message(start=start, end=end, top=top)
 
     greeting = texts.greeting(name=user.real_name)
-    message = build_text_message(channel=user.slack_id, content=[greeting, content])
-
-    client = get_slack_client()
-    client.post_chat_message(message, text="Check this month's top 5's!")
-    return HttpResponse()
+    return [greeting, content]
 
 
 @csrf_exempt
-@require_http_methods('POST')
+@require_post
 @verify_request
-def about(request: HttpRequest) -> HttpResponse:
+async def about(request: HttpRequest) -> HttpResponse:
     """ Handles /about slash command. Sends message with info on awards program. """
     form = UserForm(request.POST)
     if not form.is_valid():
@@ -195,11 +246,10 @@ def about(request: HttpRequest) -> HttpResponse:
 
     user_id = form.cleaned_data['user_id']
     try:
-        user = SlackUser.objects.get(slack_id=user_id)
-    except SlackUser.DoesNotExist:
+        user = await aget_user(slack_id=user_id)
+    except ValueError:
         msg = f'User {user_id} does not exist.'
         logger.warning(msg)
         return HttpResponseBadRequest(msg)
 
-    send_about_message(user=user)
-    return HttpResponse()
+    return await _respond('/about', user=user, build_content=get_about_content, text="Information about awards program.")
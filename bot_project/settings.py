@@ -14,10 +14,55 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "postgresql://")
 
 SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
 SIGNING_SECRET = os.environ.get("SIGNING_SECRET")
+SLACK_API_URL = os.environ.get("SLACK_API_URL", "https://www.slack.com/api/")  # 'benchmark_serving' points it to a stub.
 
 ENABLE_SCHEDULER = os.environ.get("ENABLE_SCHEDULER") == '1' or False
+# Seconds after which scheduler's leader is replaced by other process, if it stops renewing its lease.
+SCHEDULER_LEASE_TTL = int(os.environ.get("SCHEDULER_LEASE_TTL", 60))
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", 4))  # 0 runs jobs one after another.
+SCHEDULER_JOB_TIMEOUT = int(os.environ.get("SCHEDULER_JOB_TIMEOUT", 30 * 60))  # Seconds, unless set for the job.
 DEBUG = os.environ.get("DEBUG") == "1" or False
 
+TOP_USERS_COUNT = int(os.environ.get("TOP_USERS_COUNT", 5))  # How many users '/check-top5' shows in each category.
+# 'database' or 'numpy', which needs optional 'numpy' dependency: 'pip install -r requirements/numpy.txt'.
+RANKING_BACKEND = os.environ.get("RANKING_BACKEND", "database")
+# Slash commands answered directly in the response, instead of a DM.
+INLINE_SLASH_COMMANDS = os.environ.get("INLINE_SLASH_COMMANDS", "/about,/check-votes,/check-points").split(",")
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", 4))  # 0 runs background work in the request.
+BACKGROUND_QUEUE_SIZE = int(os.environ.get("BACKGROUND_QUEUE_SIZE", 32))
+REPORTS_CACHE_TIMEOUT = int(os.environ.get("REPORTS_CACHE_TIMEOUT", 60 * 60))  # Seconds.
+
+USERS_SYNC_PAGE_SIZE = 200  # Members fetched from Slack per 'users.list' call.
+USERS_SYNC_BATCH_SIZE = 500  # Users written to database per query.
+USERS_CACHE_TTL = int(os.environ.get("USERS_CACHE_TTL", 5 * 60))  # Seconds users' identities are cached in process.
+USERS_CACHE_SIZE = int(os.environ.get("USERS_CACHE_SIZE", 10_000))
+
+# Slack retries events it didn't get a response for in 3 seconds, up to 3 times within a few minutes.
+EVENTS_DEDUP_TIMEOUT = int(os.environ.get("EVENTS_DEDUP_TIMEOUT", 10 * 60))  # Seconds.
+# Seconds before the bot answers messages with keywords of the same user on the same channel again.
+KEYWORDS_COOLDOWN = int(os.environ.get("KEYWORDS_COOLDOWN", 60 * 60))
+
+# Outbox of messages sent to Slack API.
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_CONCURRENCY = int(os.environ.get("OUTBOX_CONCURRENCY", 8))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+# Rate limited messages are retried after 'Retry-After', more times than failed ones, but not forever.
+OUTBOX_MAX_RATE_LIMITED_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_RATE_LIMITED_ATTEMPTS", 20))
+OUTBOX_CLAIM_TIMEOUT = 10 * 60  # Seconds after which message stuck in sending is sent again.
+OUTBOX_RATE_LIMITS = {  # Slack API method: (calls per second, burst).
+    "default": (1, 5),
+    "chat.postMessage": (5, 10),
+    "chat.scheduleMessage": (0.8, 1),
+    "chat.deleteScheduledMessage": (0.8, 1),
+}
+
+# Month-end messages registered in Slack ahead of time with 'chat.scheduleMessage'.
+SCHEDULE_BROADCASTS = os.environ.get("SCHEDULE_BROADCASTS") == '1' or False
+BROADCAST_LEAD_DAYS = int(os.environ.get("BROADCAST_LEAD_DAYS", 5))  # How many days ahead messages are registered.
+BROADCAST_WINDOW = (10, 12)  # Hours between which scheduled messages are spread.
+# Reminders registered by a single run of the job, so it's done well before 'SCHEDULER_JOB_TIMEOUT'.
+BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", 300))
+
 VERSION = '1.0.0'
 ALLOWED_HOSTS = ['*']   # TODO not suitable for production. for some reason supplying the domain does not seem to work
 CSRF_TRUSTED_ORIGINS = ['https://slack-incubator.codilime.com', 'https://slack-incubator.codilime.com/', 'http://10.5.88.201:8080']  # TODO add testing and prod hosts
@@ -45,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bot_app.hmac.SlackSignatureMiddleware',
 ]
 
 ROOT_URLCONF = 'bot_project.urls'
@@ -75,6 +121,19 @@ DATABASES = {
     'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Backend has to be shared between workers, add and increment keys atomically and keep them until they expire
+# (redis by default, or e.g. memcached), as cached reports, stats, events deduplication and replay protection of signed
+# requests rely on it.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
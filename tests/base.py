@@ -3,18 +3,30 @@ from typing import Any
 from unittest import mock
 
 from django.apps import apps
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
 
+from bot_app import outbox
 from bot_app.apps import BotAppConfig
-from bot_app.hmac import hash_data
+from bot_app.hmac import sign
+from bot_app.identity import identity_cache
 from bot_app.models import SlackUser
 from bot_app.models import Vote
+from bot_app.rollup import rebuild_daily_points
 
 
-class BaseTestCase(TestCase):
+class BaseTestMixin:
+    def setUp(self) -> None:
+        cache.clear()  # Don't let cached reports and stats leak between tests.
+        outbox._buckets.clear()  # Nor rate limits of outbox.
+        identity_cache.clear()  # Nor users cached in process.
+
     def _mock_slack_client(self) -> None:
         self.slack_client_mock = mock.MagicMock()
-        apps.get_app_config(BotAppConfig.name).slack_client._client = self.slack_client_mock
+        config = apps.get_app_config(BotAppConfig.name)
+        config.slack_client._client = self.slack_client_mock
+        # Async client calls the mocked client in threads then.
+        config.async_slack_client._client = None
 
     def _add_simple_test_data(self, add_voting: bool = True) -> None:
         self.slack_user1 = SlackUser.objects.create(slack_id="slack_user1_id", name="test.user.1", real_name="test.user.1")
@@ -36,12 +48,22 @@ class BaseTestCase(TestCase):
                 points_act_to_deliver=1,
                 points_disrupt_to_grow=2,
             )
+            rebuild_daily_points()
+
+
+@override_settings(BACKGROUND_WORKERS=0)  # Run background work right away, so tests can check its results.
+class BaseTestCase(BaseTestMixin, TestCase):
+    pass
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class BaseTransactionTestCase(BaseTestMixin, TransactionTestCase):
+    """ For tests that need data committed, e.g. to be seen by other threads. """
 
 
-def get_signature_headers(data: Any) -> dict:
-    timestamp = int(time.time())
-    hash_string = f'v0:{timestamp}:{data}'
-    signature = f'v0={hash_data(data=hash_string)}'
+def get_signature_headers(data: Any, timestamp: int = None) -> dict:
+    timestamp = timestamp or int(time.time())
+    signature = sign(timestamp=str(timestamp).encode(), body=str(data).encode())
     return dict(
         HTTP_X_Slack_Request_Timestamp=timestamp,
         HTTP_X_Slack_Signature=signature,
@@ -1,11 +1,15 @@
 import json
+import time
+from copy import deepcopy
+from unittest import mock
 
 from django.test import override_settings
 
 from bot_app.models import SlackUser
 from bot_app.slack.events import KEYWORDS
+from bot_app.stats import get_stats
 from tests.base import BaseTestCase, get_signature_headers
-from tests.data import get_text_from_file
+from tests.data import get_text_from_file, slack_users_data
 
 
 @override_settings(SIGNING_SECRET='signing_secret')
@@ -13,6 +17,7 @@ class TestEventEndpoint(BaseTestCase):
     url = '/event/hook/'
 
     def setUp(self) -> None:
+        super().setUp()
         self._mock_slack_client()
         self.slack_user1 = SlackUser.objects.create(slack_id="slack_user1_id", name="test.user.1")
 
@@ -82,7 +87,6 @@ class TestEventEndpoint(BaseTestCase):
         assert response.status_code == 400
 
     def test_invalid_token(self) -> None:
-        # TODO test invalid signature
         event_data = {
             'event': {},
         }
@@ -109,3 +113,121 @@ class TestEventEndpoint(BaseTestCase):
             **get_signature_headers(data=data)
         )
         assert response.status_code == 400
+
+    def _post_user_event(self, event_type: str, user: dict) -> None:
+        data = json.dumps({'event': {'type': event_type, 'user': user}, 'type': 'event_callback'})
+        response = self.client.post(
+            self.url,
+            data=data,
+            content_type='application/json',
+            **get_signature_headers(data=data)
+        )
+        assert response.status_code == 200
+
+    def test_team_join_and_user_change(self) -> None:
+        user = deepcopy(slack_users_data['members'][0])
+        user.update(id='new_user_id', updated=10)
+
+        self._post_user_event(event_type='team_join', user=user)
+        assert SlackUser.objects.get(slack_id='new_user_id').real_name == user['real_name']
+
+        user.update(real_name='changed_real_name', updated=20)
+        self._post_user_event(event_type='user_change', user=user)
+        assert SlackUser.objects.get(slack_id='new_user_id').real_name == 'changed_real_name'
+
+        # Events delivered out of order don't overwrite newer data.
+        user.update(real_name='stale_real_name', updated=15)
+        self._post_user_event(event_type='user_change', user=user)
+        assert SlackUser.objects.get(slack_id='new_user_id').real_name == 'changed_real_name'
+        assert SlackUser.objects.filter(slack_id='new_user_id').count() == 1
+
+    def _post_message_event(self, channel: str, event_id: str, timestamp: int = None, **headers) -> None:
+        event_data = {
+            'event': {
+                'type': 'message',
+                'text': KEYWORDS[0],
+                'user': self.slack_user1.slack_id,
+                'ts': 'some_thread_id',
+                'channel': channel,
+            },
+            'event_id': event_id,
+            'type': 'event_callback',
+        }
+        data = json.dumps(event_data)
+        response = self.client.post(
+            self.url,
+            data=data,
+            content_type='application/json',
+            **get_signature_headers(data=data, timestamp=timestamp),
+            **headers
+        )
+        assert response.status_code == 200
+
+    def test_retried_event(self) -> None:
+        self._post_message_event(channel='some_channel_id', event_id='Ev1')
+        with self.assertNumQueries(0):
+            # Retries are signed again, with time of the retry.
+            self._post_message_event(
+                channel='some_channel_id', event_id='Ev1', timestamp=int(time.time()) + 1, HTTP_X_Slack_Retry_Num='1'
+            )
+
+        assert self.slack_client_mock.chat_postMessage.call_count == 2
+        assert get_stats()['events.duplicates'] == 1
+
+    def test_keywords_cooldown(self) -> None:
+        self._post_message_event(channel='some_channel_id', event_id='Ev1')
+        with self.assertNumQueries(0):
+            self._post_message_event(channel='some_channel_id', event_id='Ev2')
+        assert self.slack_client_mock.chat_postMessage.call_count == 2
+        assert get_stats()['events.cooldown'] == 1
+
+        # Cooldown is kept separately for each channel.
+        self._post_message_event(channel='other_channel_id', event_id='Ev3')
+        assert self.slack_client_mock.chat_postMessage.call_count == 4
+
+    def test_keywords_cooldown_after_failed_answer(self) -> None:
+        self.slack_client_mock.chat_postMessage.side_effect = [RuntimeError("Slack is down"), mock.DEFAULT]
+        with self.assertRaises(RuntimeError):
+            self._post_message_event(channel='some_channel_id', event_id='Ev1')
+
+        # User wasn't answered, so they're answered on their next message.
+        self.slack_client_mock.chat_postMessage.side_effect = None
+        self._post_message_event(channel='some_channel_id', event_id='Ev2')
+        assert self.slack_client_mock.chat_postMessage.call_count == 3
+        assert get_stats().get('events.cooldown', 0) == 0
+
+    def test_keyword_event_from_unknown_user(self) -> None:
+        user = deepcopy(slack_users_data['members'][0])
+        self.slack_user1.delete()
+        user.update(id=self.slack_user1.slack_id)
+        self.slack_client_mock.users_info.return_value.data = {'ok': True, 'user': user}
+
+        self._post_message_event(channel='some_channel_id', event_id='Ev1')
+        self.slack_client_mock.users_info.assert_called_once_with(user=self.slack_user1.slack_id)
+        assert SlackUser.objects.get(slack_id=self.slack_user1.slack_id).real_name == user['real_name']
+        assert self.slack_client_mock.chat_postMessage.call_count == 2
+
+    def test_message_without_keywords(self) -> None:
+        event_data = {
+            'event': {
+                'type': 'message',
+                'text': 'Some message',
+                'user': self.slack_user1.slack_id,
+                'ts': 'some_thread_id',
+                'channel': 'some_channel_id',
+            },
+            'type': 'event_callback',
+        }
+        data = json.dumps(event_data)
+
+        with self.assertNumQueries(0), mock.patch('bot_app.views.events.json.loads') as loads_mock:
+            response = self.client.post(
+                self.url,
+                data=data,
+                content_type='application/json',
+                **get_signature_headers(data=data)
+            )
+        assert response.status_code == 200
+        loads_mock.assert_not_called()
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+        assert get_stats()['events.prefiltered'] == 1
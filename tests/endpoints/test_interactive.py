@@ -4,7 +4,10 @@ import urllib.parse
 from django.test import override_settings
 from parameterized import parameterized
 
+from bot_app.modals.get_comments import check_comments_header, earlier_comments_action_id
 from bot_app.models import Vote, SlackUser
+from bot_app.texts import texts
+from bot_app.utils import save_vote
 from tests.base import BaseTestCase, get_signature_headers
 
 
@@ -68,6 +71,7 @@ class TestInteractiveEndpoint(BaseTestCase):
     url = "/interactive"
 
     def setUp(self) -> None:
+        super().setUp()
         self._mock_slack_client()
         self._add_simple_test_data(add_voting=False)
 
@@ -170,3 +174,55 @@ class TestInteractiveEndpoint(BaseTestCase):
         data = response.json()
         assert data['response_action'] == 'errors'
         assert error_message in str(data['errors'])
+
+    def _post_payload(self, payload: dict):
+        data = urllib.parse.urlencode({"payload": json.dumps(payload)})
+        return self.client.post(
+            self.url, data=data, content_type='application/x-www-form-urlencoded', **get_signature_headers(data=data)
+        )
+
+    def test_earlier_comments(self) -> None:
+        for i in range(3):
+            vote = {"selected_user": self.slack_user2.slack_id, "points_team_up_to_win": 3, "points_act_to_deliver": 0,
+                    "points_disrupt_to_grow": 0, "comment": f"comment {i}"}
+            save_vote(vote=vote, user_id=self.slack_user1.slack_id)
+        self.slack_client_mock.chat_postMessage.reset_mock()
+
+        # Report shows the latest comment, with a button showing earlier ones.
+        response = self._post_payload({
+            "type": "view_submission",
+            "user": {"id": self.hr_user1.slack_id},
+            "view": {
+                "blocks": [check_comments_header],
+                "state": {
+                    "values": {"select_user": {"select_user-action": {"selected_user": self.slack_user2.slack_id}}}
+                },
+            },
+        })
+        assert response.status_code == 200
+        blocks = self.slack_client_mock.chat_postMessage.call_args[1]["blocks"]
+        assert "comment 2" in blocks[0]["text"]["text"] and "comment 1" not in blocks[0]["text"]["text"]
+        button = blocks[-1]["elements"][0]
+        assert button["action_id"] == earlier_comments_action_id
+
+        response = self._post_payload({
+            "type": "block_actions",
+            "user": {"id": self.hr_user1.slack_id},
+            "actions": [{"action_id": button["action_id"], "value": button["value"]}],
+        })
+        assert response.status_code == 200
+        blocks = self.slack_client_mock.chat_postMessage.call_args[1]["blocks"]
+        assert blocks[0]["text"]["text"].endswith(f"• {self.slack_user1.real_name}: comment 1\n"
+                                                  f"• {self.slack_user1.real_name}: comment 0")
+        assert len(blocks) == 1  # No more pages.
+
+    def test_earlier_comments_forbidden(self) -> None:
+        value = json.dumps({"user": self.slack_user2.slack_id, "before": None})
+        response = self._post_payload({
+            "type": "block_actions",
+            "user": {"id": self.slack_user1.slack_id},
+            "actions": [{"action_id": earlier_comments_action_id, "value": value}],
+        })
+        assert response.status_code == 200
+        blocks = self.slack_client_mock.chat_postMessage.call_args[1]["blocks"]
+        assert blocks[0]["text"]["text"] == texts.no_permissions()
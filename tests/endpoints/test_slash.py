@@ -1,9 +1,15 @@
+import json
 import urllib.parse
+from unittest import mock
 
+from django.apps import apps
 from django.http import HttpResponse
 from django.test import override_settings
+from parameterized import parameterized
+from slack_sdk import WebClient
 
-from bot_app.models import SlackUser
+from bot_app.apps import BotAppConfig
+from bot_app.models import SlackUser, CATEGORIES
 from tests.base import BaseTestCase, get_signature_headers
 from tests.data import get_slash_command_data, get_text_from_file
 
@@ -13,6 +19,7 @@ class TestSlashCommands(BaseTestCase):
     """ Simple cases testing if app properly responds to Slack's slash commands like /about. """
 
     def setUp(self) -> None:
+        super().setUp()
         self._mock_slack_client()
         self._add_simple_test_data()
 
@@ -33,6 +40,23 @@ class TestSlashCommands(BaseTestCase):
         response = self._post_command(command=command, data=data)
         assert response.status_code == 200
 
+        # Answered inline, without calling Slack API.
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+        response_data = response.json()
+        assert response_data["response_type"] == "ephemeral"
+
+        content = [c.get('text', {}).get('text') for c in response_data["blocks"]]
+        assert text in content
+
+    @override_settings(INLINE_SLASH_COMMANDS=[])
+    def test_about_direct_message(self) -> None:
+        command = "/about"
+        data = get_slash_command_data(command=command,  user_id=self.slack_user1.slack_id)
+        text = get_text_from_file(filename='about')
+
+        response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+
         self.slack_client_mock.chat_postMessage.assert_called_once()
         call_args = self.slack_client_mock.chat_postMessage.call_args[1]
         assert call_args["channel"] == self.slack_user1.slack_id
@@ -50,7 +74,53 @@ class TestSlashCommands(BaseTestCase):
         self.slack_client_mock.views_open.assert_called_once()
         call_args = self.slack_client_mock.views_open.call_args[1]
         assert call_args["trigger_id"] == data["trigger_id"]
-        # TODO validate view?
+
+        view = call_args["view"]
+        assert view["type"] == "modal"
+        assert [block.get("block_id") for block in view["blocks"] if block["type"] == "input"] == [
+            "select_user", *CATEGORIES.keys(), "comment"
+        ]
+
+    def test_vote_request_body(self) -> None:
+        """ Slack gets the view as an object in JSON body of 'views.open' request, not as an encoded string. """
+        apps.get_app_config(BotAppConfig.name).slack_client._client = WebClient(token="token")
+        command = "/vote"
+        data = get_slash_command_data(command=command, user_id=self.slack_user1.slack_id)
+
+        slack_response = {"status": 200, "headers": {}, "body": '{"ok": true}'}
+        with mock.patch.object(WebClient, "_perform_urllib_http_request_internal", return_value=slack_response) as send:
+            response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+
+        url, request = send.call_args[0]
+        assert url.endswith("/views.open")
+        body = json.loads(request.data)
+        assert body["trigger_id"] == data["trigger_id"]
+        assert body["view"]["type"] == "modal"
+
+    async def test_vote_async_client(self) -> None:
+        """ With 'aiohttp' installed, Slack API is called with AsyncWebClient, without blocking a thread. """
+        async_client_mock = mock.AsyncMock()
+        apps.get_app_config(BotAppConfig.name).async_slack_client._client = async_client_mock
+        data = get_slash_command_data(command="/vote",  user_id=self.slack_user1.slack_id)
+        body = urllib.parse.urlencode(data)
+        headers = get_signature_headers(data=body)
+
+        # Async client takes headers by their names.
+        response = await self.async_client.post(
+            "/vote",
+            data=body,
+            content_type="application/x-www-form-urlencoded",
+            **{
+                "X-Slack-Request-Timestamp": str(headers["HTTP_X_Slack_Request_Timestamp"]),
+                "X-Slack-Signature": headers["HTTP_X_Slack_Signature"],
+            }
+        )
+        assert response.status_code == 200
+
+        async_client_mock.views_open.assert_awaited_once()
+        assert async_client_mock.views_open.call_args[1]["trigger_id"] == data["trigger_id"]
+        self.slack_client_mock.views_open.assert_not_called()
 
     def test_check_votes(self) -> None:
         your_votes_text = f"""You voted for user {self.slack_user2.name} by awarding them:
@@ -63,11 +133,24 @@ class TestSlashCommands(BaseTestCase):
         response = self._post_command(command=command, data=data)
         assert response.status_code == 200
 
-        self.slack_client_mock.chat_postMessage.assert_called_once()
-        call_args = self.slack_client_mock.chat_postMessage.call_args[1]
-        assert call_args["channel"] == self.slack_user1.slack_id
-        assert self.slack_user1.real_name.split(' ')[0] in str(call_args['blocks'][0])
-        assert call_args['blocks'][1]['text']['text'] == your_votes_text
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+        blocks = response.json()['blocks']
+        assert self.slack_user1.real_name.split(' ')[0] in str(blocks[0])
+        assert blocks[1]['text']['text'] == your_votes_text
+
+    def test_check_votes_too_long_for_response(self) -> None:
+        """ Reply that doesn't fit in a single message is sent as direct messages instead. """
+        command = "/check-votes"
+        data = get_slash_command_data(command=command,  user_id=self.slack_user1.slack_id)
+
+        with mock.patch("bot_app.message.MAX_BLOCKS", 1):
+            response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+        assert response.content == b""
+
+        calls = self.slack_client_mock.chat_postMessage.call_args_list
+        assert [call[1]["channel"] for call in calls] == [self.slack_user1.slack_id] * 2
+        assert "You voted for user" in calls[1][1]["blocks"][0]["text"]["text"]
 
     def test_check_points(self) -> None:
         your_points_text = f"""You have {self.voting_result.points_team_up_to_win} points in the Team up to win category. Congratulations!
@@ -79,12 +162,11 @@ You have {self.voting_result.points_disrupt_to_grow} points in the Disrupt to gr
         response = self._post_command(command=command, data=data)
         assert response.status_code == 200
 
-        self.slack_client_mock.chat_postMessage.assert_called_once()
-        call_args = self.slack_client_mock.chat_postMessage.call_args[1]
-        assert call_args["channel"] == self.slack_user2.slack_id
-        assert self.slack_user2.real_name in str(call_args['blocks'][0])
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+        blocks = response.json()['blocks']
+        assert self.slack_user2.real_name in str(blocks[0])
 
-        msg = call_args['blocks'][1]['text']['text']
+        msg = blocks[1]['text']['text']
         assert msg == your_points_text
 
     def test_check_winners(self) -> None:
@@ -146,3 +228,43 @@ Top 5 Limes in category points_disrupt_to_grow in a current half of year:
 
         msg = call_args['blocks'][1]['text']['text']
         assert msg == text
+
+    def test_top_n(self) -> None:
+        command = "/check-top5"
+        data = get_slash_command_data(command=command, user_id=self.hr_user1.slack_id)
+        data["text"] = "1"
+
+        response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+
+        call_args = self.slack_client_mock.chat_postMessage.call_args[1]
+        msg = call_args['blocks'][1]['text']['text']
+        assert msg.startswith("Top 1 Limes in category points_team_up_to_win")
+        assert msg.count("•") == 3
+
+    @parameterized.expand([("abc",), ("top 10",), ("0",), ("101",)])
+    def test_top_n_invalid(self, text: str) -> None:
+        command = "/check-top5"
+        data = get_slash_command_data(command=command, user_id=self.hr_user1.slack_id)
+        data["text"] = text
+
+        response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+        response_data = response.json()
+        assert response_data["response_type"] == "ephemeral"
+        assert response_data["text"] == get_text_from_file(filename='top5_usage')
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+
+    @mock.patch("bot_app.views.slash.executor.submit", return_value=False)
+    def test_busy(self, submit: mock.MagicMock) -> None:
+        command = "/check-winners"
+        data = get_slash_command_data(command=command, user_id=self.hr_user1.slack_id)
+
+        response = self._post_command(command=command, data=data)
+        assert response.status_code == 200
+        response_data = response.json()
+        assert response_data["response_type"] == "ephemeral"
+        assert response_data["text"] == get_text_from_file(filename='busy')
+
+        submit.assert_called_once()
+        self.slack_client_mock.chat_postMessage.assert_not_called()
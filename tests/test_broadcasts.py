@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from slack_sdk.errors import SlackApiError
+
+from bot_app.models import ScheduledMessage, SlackUser, Vote
+from bot_app.rollup import rebuild_daily_points
+from bot_app.scheduler.broadcasts import (
+    _get_post_times,
+    cancel_scheduled_messages,
+    get_month_end_days,
+    schedule_reminders,
+    schedule_winners_announcement,
+)
+from bot_app.scheduler.jobs import announce_winners, remind_about_program
+from tests.base import BaseTestCase
+
+
+@override_settings(
+    SCHEDULE_BROADCASTS=True,
+    BROADCAST_LEAD_DAYS=5,
+    OUTBOX_RATE_LIMITS={"default": (1000, 1)},
+)
+class TestScheduledBroadcasts(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data()
+        self.slack_client_mock.chat_scheduleMessage.side_effect = lambda **kwargs: {
+            "channel": f"D{kwargs['channel']}", "scheduled_message_id": f"Q{kwargs['post_at']}{kwargs['channel']}",
+        }
+
+        # Pretend it's early morning, a few days before the end of the month.
+        _, last_day = get_month_end_days(datetime.now().date())
+        self.today = last_day - timedelta(days=3)
+        patcher = mock.patch("bot_app.scheduler.broadcasts.timezone.now")
+        now = patcher.start()
+        now.return_value = datetime.combine(self.today, datetime.min.time()).astimezone()
+        self.addCleanup(patcher.stop)
+
+    def test_schedule_reminders(self) -> None:
+        schedule_reminders(today=self.today)
+
+        users = SlackUser.objects.filter(is_bot=False)
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == users.count()
+        messages = ScheduledMessage.objects.filter(kind=ScheduledMessage.REMINDER).order_by("post_at")
+        assert [m.user for m in messages] == list(users.order_by("pk"))
+        assert len({m.post_at for m in messages}) == users.count()  # Spread over the window.
+
+        # Running again doesn't schedule reminders twice.
+        schedule_reminders(today=self.today)
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == users.count()
+
+        # Users with scheduled reminders don't get them again on the day.
+        remind_about_program()
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+
+    def test_schedule_reminders_in_batches(self) -> None:
+        users = list(SlackUser.objects.filter(is_bot=False).order_by("pk"))
+        with override_settings(BROADCAST_BATCH_SIZE=2):
+            schedule_reminders(today=self.today)
+            assert ScheduledMessage.objects.count() == 2
+            schedule_reminders(today=self.today)  # Next run carries on.
+
+        messages = ScheduledMessage.objects.filter(kind=ScheduledMessage.REMINDER).order_by("post_at")
+        assert [m.user for m in messages] == users
+        reminder_day, _ = get_month_end_days(self.today)
+        assert [m.post_at for m in messages] == _get_post_times(day=reminder_day, count=len(users))
+
+    def test_rate_limited(self) -> None:
+        response = mock.MagicMock(status_code=429, headers={"Retry-After": "30"})
+        self.slack_client_mock.chat_scheduleMessage.side_effect = SlackApiError("ratelimited", response=response)
+
+        with mock.patch("bot_app.scheduler.broadcasts.get_bucket") as get_bucket:
+            schedule_reminders(today=self.today)
+
+        # Calls aren't retried, but following calls wait for Slack's limit to pass, and users are left for the next run.
+        users_count = SlackUser.objects.filter(is_bot=False).count()
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == users_count
+        get_bucket.assert_called_with("chat.scheduleMessage")
+        assert get_bucket.return_value.acquire_blocking.call_count == users_count
+        get_bucket.return_value.pause.assert_called_with(30.0)
+        assert ScheduledMessage.objects.count() == 0
+
+    def test_not_due(self) -> None:
+        schedule_reminders(today=self.today - timedelta(days=10))
+        schedule_winners_announcement(today=self.today - timedelta(days=10))
+        self.slack_client_mock.chat_scheduleMessage.assert_not_called()
+
+    def test_revise_winners_announcement(self) -> None:
+        schedule_winners_announcement(today=self.today)
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == 1
+        message = ScheduledMessage.objects.get(kind=ScheduledMessage.WINNERS)
+        assert message.user == self.hr_user1
+
+        # Nothing has changed, so the message stays.
+        schedule_winners_announcement(today=self.today)
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == 1
+
+        # Winners changed, so the old message is replaced.
+        Vote.objects.create(
+            voted_user=self.slack_user1,
+            voting_user=self.slack_user2,
+            points_team_up_to_win=3,
+            points_act_to_deliver=0,
+            points_disrupt_to_grow=0,
+        )
+        rebuild_daily_points()
+        cache.clear()  # Drop cached ranking.
+        schedule_winners_announcement(today=self.today)
+
+        self.slack_client_mock.chat_deleteScheduledMessage.assert_called_once_with(
+            channel=message.channel, scheduled_message_id=message.scheduled_message_id
+        )
+        assert self.slack_client_mock.chat_scheduleMessage.call_count == 2
+        assert self.slack_user1.real_name in ScheduledMessage.objects.get(kind=ScheduledMessage.WINNERS).text
+
+        announce_winners()
+        self.slack_client_mock.chat_postMessage.assert_not_called()
+
+    def test_cancel(self) -> None:
+        schedule_reminders(today=self.today)
+        count = ScheduledMessage.objects.count()
+
+        assert cancel_scheduled_messages(period=self.today) == count
+        assert self.slack_client_mock.chat_deleteScheduledMessage.call_count == count
+        assert ScheduledMessage.objects.count() == 0
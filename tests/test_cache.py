@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytz
+from django.test import override_settings
+from parameterized import parameterized
+
+from bot_app.checks import check_shared_cache
+from bot_app.stats import get_stats
+from bot_app.utils import calculate_points, get_start_end_half_year, get_start_end_month, save_vote
+from tests.base import BaseTestCase
+
+
+class TestReportsCache(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data()
+
+    def test_hit_and_miss(self) -> None:
+        start, end = get_start_end_half_year()
+
+        with self.assertNumQueries(1):
+            points = calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end)
+        with self.assertNumQueries(0):
+            assert calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end) == points
+
+        # Different params are cached separately.
+        with self.assertNumQueries(1):
+            calculate_points(voted_user=self.slack_user1.slack_id, start=start, end=end)
+
+        stats = get_stats()
+        assert stats['reports_cache.points.hits'] == 1
+        assert stats['reports_cache.points.misses'] == 2
+
+    def test_invalidated_on_vote(self) -> None:
+        for start, end in (get_start_end_month(), get_start_end_half_year()):
+            points = calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end)
+            assert points['points_team_up_to_win'] == 0
+
+        vote = {
+            "selected_user": self.slack_user2.slack_id,
+            "points_team_up_to_win": 3,
+            "points_act_to_deliver": 0,
+            "points_disrupt_to_grow": 0,
+            "comment": "a comment",
+        }
+        save_vote(vote=vote, user_id=self.hr_user1.slack_id)
+
+        for start, end in (get_start_end_month(), get_start_end_half_year()):
+            points = calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end)
+            assert points['points_team_up_to_win'] == 3
+
+    def test_other_periods_not_cached(self) -> None:
+        start = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+        end = datetime(2020, 1, 31, tzinfo=pytz.UTC)
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end)
+
+
+class TestSharedCacheCheck(BaseTestCase):
+    def test_shared_backend(self) -> None:
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=caches):
+            assert check_shared_cache() == []
+
+    @parameterized.expand([
+        ('django.core.cache.backends.locmem.LocMemCache',),
+        ('django.core.cache.backends.dummy.DummyCache',),
+        ('django.core.cache.backends.db.DatabaseCache',),
+        ('django.core.cache.backends.filebased.FileBasedCache',),
+    ])
+    def test_unsuitable_backend(self, backend: str) -> None:
+        caches = {'default': {'BACKEND': backend, 'LOCATION': 'bot_app_cache'}}
+        with override_settings(CACHES=caches):
+            assert [warning.id for warning in check_shared_cache()] == ['bot_app.W001']
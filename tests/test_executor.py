@@ -0,0 +1,46 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from bot_app.executor import BackgroundExecutor
+
+
+@override_settings(BACKGROUND_WORKERS=1, BACKGROUND_QUEUE_SIZE=1)
+class TestBackgroundExecutor(SimpleTestCase):
+    def test_queue_limit(self) -> None:
+        executor = BackgroundExecutor()
+        started = threading.Event()
+        release = threading.Event()
+        done = threading.Event()
+
+        def blocking() -> None:
+            started.set()
+            release.wait(timeout=5)
+
+        assert executor.submit(blocking) is True
+        assert started.wait(timeout=5)
+        assert executor.submit(done.set) is True  # Waits in the queue.
+        assert executor.submit(done.set) is False  # Worker is busy and queue is full.
+        assert executor.queue_depth == 2
+
+        release.set()
+        assert done.wait(timeout=5)
+
+    def test_failing_task(self) -> None:
+        executor = BackgroundExecutor()
+        done = threading.Event()
+
+        def failing() -> None:
+            raise RuntimeError()
+
+        assert executor.submit(failing) is True
+        assert executor.submit(done.set) is True
+        assert done.wait(timeout=5)
+
+    @override_settings(BACKGROUND_WORKERS=0)
+    def test_inline(self) -> None:
+        executor = BackgroundExecutor()
+        called = []
+
+        assert executor.submit(called.append, 1) is True
+        assert called == [1]
@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.conf import settings
+from django.test import override_settings
+from parameterized import parameterized
+
+from bot_app.stats import get_stats
+from tests.base import BaseTestCase, get_signature_headers
+
+
+@override_settings(SIGNING_SECRET='signing_secret')
+class TestSignature(BaseTestCase):
+    url = '/event/hook/'
+    data = json.dumps({'challenge': 'slack_challenge', 'type': 'url_verification'})
+
+    def _post(self, **headers) -> int:
+        return self.client.post(self.url, data=self.data, content_type='application/json', **headers).status_code
+
+    def test_valid(self) -> None:
+        assert self._post(**get_signature_headers(data=self.data)) == 200
+
+    def test_invalid_signature(self) -> None:
+        headers = get_signature_headers(data=self.data)
+        headers['HTTP_X_Slack_Signature'] = 'v0=' + '0' * 64
+        assert self._post(**headers) == 403
+
+        with override_settings(SIGNING_SECRET='other_secret'):
+            headers = get_signature_headers(data=self.data)
+        assert self._post(**headers) == 403
+
+    @parameterized.expand((
+            (-60 * 5 - 10, ),
+            (60 * 5 + 10, ),
+    ))
+    def test_invalid_timestamp(self, offset: int) -> None:
+        assert self._post(**get_signature_headers(data=self.data, timestamp=int(time.time()) + offset)) == 403
+
+    def test_missing_headers(self) -> None:
+        assert self._post() == 403
+
+    def test_replayed(self) -> None:
+        headers = get_signature_headers(data=self.data)
+        assert self._post(**headers) == 200
+        assert self._post(**headers) == 403
+        assert get_stats()['hmac.replayed'] == 1
+
+    def test_without_middleware(self) -> None:
+        middleware = [m for m in settings.MIDDLEWARE if m != 'bot_app.hmac.SlackSignatureMiddleware']
+        with override_settings(MIDDLEWARE=middleware):
+            assert self._post(**get_signature_headers(data=self.data)) == 403
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from bot_app.identity import identity_cache
+from bot_app.models import SlackUser
+from bot_app.users import save_user_from_slack
+from bot_app.utils import get_user
+from tests.base import BaseTestCase
+
+
+class TestIdentityCache(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._add_simple_test_data(add_voting=False)
+
+    def test_get_user(self) -> None:
+        with self.assertNumQueries(1):
+            user = get_user(self.hr_user1.slack_id)
+            assert get_user(self.hr_user1.slack_id) == user
+
+        assert (user.pk, user.real_name, user.is_hr, user.is_bot) == (self.hr_user1.pk, 'hr.user.1', True, False)
+        with self.assertNumQueries(1):  # Fields not kept in the cache are loaded on access.
+            assert user.name == self.hr_user1.name
+        assert (identity_cache.hits, identity_cache.misses, identity_cache.hit_ratio) == (1, 1, 0.5)
+
+    def test_unknown_user_is_not_cached(self) -> None:
+        with self.assertRaises(ValueError):
+            get_user('new_user_id')
+
+        SlackUser.objects.bulk_create([SlackUser(slack_id='new_user_id', name='new', real_name='new')])
+        assert get_user('new_user_id').real_name == 'new'
+
+    def test_expired(self) -> None:
+        with mock.patch('bot_app.identity.time.monotonic', return_value=1000):
+            get_user(self.slack_user1.slack_id)
+        with mock.patch('bot_app.identity.time.monotonic', return_value=1000 + 5 * 60 + 1):
+            with self.assertNumQueries(1):
+                get_user(self.slack_user1.slack_id)
+
+    @override_settings(USERS_CACHE_SIZE=2)
+    def test_least_recently_used_are_evicted(self) -> None:
+        get_user(self.slack_user1.slack_id)
+        get_user(self.slack_user2.slack_id)
+        get_user(self.slack_user1.slack_id)
+        get_user(self.hr_user1.slack_id)
+
+        assert identity_cache.info()['size'] == 2
+        assert identity_cache.evictions == 1
+        with self.assertNumQueries(0):
+            get_user(self.slack_user1.slack_id)
+        with self.assertNumQueries(1):
+            get_user(self.slack_user2.slack_id)
+
+    def test_invalidated_on_change(self) -> None:
+        get_user(self.slack_user1.slack_id)
+        self.slack_user1.is_hr = True
+        self.slack_user1.save()
+        assert get_user(self.slack_user1.slack_id).is_hr
+
+        save_user_from_slack(data={
+            'id': self.slack_user1.slack_id,
+            'name': 'test.user.1',
+            'real_name': 'changed_real_name',
+            'is_bot': False,
+            'updated': 1,
+        })
+        assert get_user(self.slack_user1.slack_id).real_name == 'changed_real_name'
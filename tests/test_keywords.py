@@ -0,0 +1,30 @@
+import json
+
+from parameterized import parameterized
+
+from bot_app.slack.keywords import contains_keywords, may_contain_keywords
+from tests.base import BaseTestCase
+
+
+class TestKeywords(BaseTestCase):
+    @parameterized.expand((
+            ("Gdzie znajdę zasady programu wyróżnień?", True),
+            ("gdzie znajde zasady programu wyroznien", True),
+            ("PROGRAM WYRÓŻNIEŃ", True),
+            ("program wyróznien", True),
+            ("program wy-róż-nień", True),
+            ("zespół wyróżnił się", False),
+            ("thanks for the review", False),
+            ("", False),
+    ))
+    def test_contains_keywords(self, text: str, expected: bool) -> None:
+        assert contains_keywords(text) == expected
+
+        event = {'event': {'type': 'message', 'text': text}, 'type': 'event_callback'}
+        for ensure_ascii in (True, False):
+            body = json.dumps(event, ensure_ascii=ensure_ascii).encode()
+            assert may_contain_keywords(body) == expected
+
+    def test_other_events_are_not_rejected(self) -> None:
+        body = json.dumps({'event': {'type': 'user_change', 'user': {}}, 'type': 'event_callback'}).encode()
+        assert may_contain_keywords(body)
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from bot_app.models import SchedulerLease
+from bot_app.scheduler.leader import LeaderLease
+from bot_app.scheduler.scheduler import Scheduler
+from tests.base import BaseTestCase
+
+
+class TestLeaderLease(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.leader = LeaderLease(name="test", ttl=60)
+        self.follower = LeaderLease(name="test", ttl=60)
+
+    def _expire(self) -> None:
+        SchedulerLease.objects.filter(name="test").update(expires=timezone.now() - timedelta(seconds=1))
+
+    def test_single_leader(self) -> None:
+        assert self.leader.acquire() is True
+        assert self.follower.acquire() is False
+        assert self.leader.acquire() is True  # Renewed.
+
+        assert (self.leader.is_leader, self.follower.is_leader) == (True, False)
+        assert SchedulerLease.objects.get(name="test").holder == self.leader.holder
+
+    def test_failover(self) -> None:
+        self.leader.acquire()
+        self._expire()  # Leader stopped renewing the lease.
+
+        assert self.follower.acquire() is True
+        assert self.leader.acquire() is False
+        assert self.leader.is_leader is False
+
+    def test_leadership_expires_without_heartbeat(self) -> None:
+        with mock.patch("bot_app.scheduler.leader.time.monotonic", return_value=1000):
+            self.leader.acquire()
+        with mock.patch("bot_app.scheduler.leader.time.monotonic", return_value=1000 + 59):
+            assert self.leader.is_leader is True
+        with mock.patch("bot_app.scheduler.leader.time.monotonic", return_value=1000 + 60):
+            assert self.leader.is_leader is False
+
+    def test_release(self) -> None:
+        self.leader.acquire()
+        self.leader.release()
+
+        assert self.leader.is_leader is False
+        assert self.follower.acquire() is True
+
+    @override_settings(SCHEDULER_WORKERS=0)
+    def test_scheduler_runs_jobs_only_if_leader(self) -> None:
+        self.leader.acquire()
+        leader_job, follower_job = mock.MagicMock(), mock.MagicMock()
+        leader_scheduler, follower_scheduler = Scheduler(lease=self.leader), Scheduler(lease=self.follower)
+        leader_scheduler.every().second.do(leader_job)
+        follower_scheduler.every().second.do(follower_job)
+
+        for scheduler in (leader_scheduler, follower_scheduler):
+            scheduler._scheduler.jobs[0].next_run = datetime.now() - timedelta(seconds=1)  # Job is due.
+            scheduler.run_pending()
+
+        assert (leader_job.call_count, follower_job.call_count) == (1, 0)
+        # Follower skipped the run, so it doesn't run it late after taking over.
+        assert follower_scheduler._scheduler.jobs[0].should_run is False
@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from bot_app.message import MAX_BLOCKS, MAX_SECTION_LENGTH, build_ephemeral_message, build_text_message, \
+    build_text_messages
+from bot_app.texts import StaticText
+
+
+def _texts(message: dict) -> list[str]:
+    return [block['text']['text'] for block in message['blocks']]
+
+
+class TestBuildTextMessages(TestCase):
+    def test_short_content(self) -> None:
+        messages = build_text_messages(channel='channel', content=['greeting', '', 'content'])
+        assert len(messages) == 1
+        assert _texts(messages[0]) == ['greeting', 'content']
+
+    def test_long_text_is_split_on_lines(self) -> None:
+        lines = [f'• line {i:04}' + '.' * 90 for i in range(100)]
+        text = '\n'.join(lines)
+
+        message = build_text_message(channel='channel', content=[text])
+
+        parts = _texts(message)
+        assert len(parts) > 1
+        assert all(len(part) <= MAX_SECTION_LENGTH for part in parts)
+        assert [line for part in parts for line in part.split('\n')] == lines
+
+    def test_long_line_is_cut(self) -> None:
+        text = 'first\n' + 'x' * (MAX_SECTION_LENGTH * 2 + 1)
+
+        parts = _texts(build_text_message(channel='channel', content=[text]))
+
+        assert parts == ['first', 'x' * MAX_SECTION_LENGTH, 'x' * MAX_SECTION_LENGTH, 'x']
+
+    def test_long_static_text_is_split(self) -> None:
+        text = StaticText('a\n' * MAX_SECTION_LENGTH)
+        parts = _texts(build_text_message(channel='channel', content=[text]))
+        assert len(parts) == 2
+        assert ''.join(parts).replace('\n', '') == 'a' * MAX_SECTION_LENGTH
+
+    def test_blocks_are_split_between_messages(self) -> None:
+        content = [f'text {i}' for i in range(MAX_BLOCKS * 2 + 1)]
+
+        messages = build_text_messages(channel='channel', content=content, ts='1')
+
+        assert [len(message['blocks']) for message in messages] == [MAX_BLOCKS, MAX_BLOCKS, 1]
+        assert [text for message in messages for text in _texts(message)] == content
+        assert {(message['channel'], message['ts']) for message in messages} == {('channel', '1')}
+        with self.assertRaises(ValueError):
+            build_text_message(channel='channel', content=content)
+
+    def test_ephemeral_message_must_fit(self) -> None:
+        content = [f'text {i}' for i in range(MAX_BLOCKS + 1)]
+        assert _texts(build_ephemeral_message(content=content[:MAX_BLOCKS], text='text')) == content[:MAX_BLOCKS]
+        with self.assertRaises(ValueError):
+            build_ephemeral_message(content=content, text='text')
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from django.test import override_settings
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+
+from bot_app.models import OutboxMessage
+from bot_app import outbox
+from bot_app.outbox import TokenBucket, dispatch_outbox, enqueue_message, enqueue_messages
+from tests.base import BaseTestCase
+
+
+def get_slack_error(status_code: int, headers: dict = None) -> SlackApiError:
+    response = SlackResponse(
+        client=None, http_verb="POST", api_url="", req_args={}, data={"ok": False, "error": "error"},
+        headers=headers or {}, status_code=status_code,
+    )
+    return SlackApiError(message="error", response=response)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2)
+class TestOutbox(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+
+    def test_dispatch(self) -> None:
+        enqueue_messages([{"channel": f"user{i}"} for i in range(20)], text="text")
+
+        result = dispatch_outbox(batch_size=7)
+        assert result.sent == 20
+        assert self.slack_client_mock.chat_postMessage.call_count == 20
+        assert OutboxMessage.objects.filter(status=OutboxMessage.SENT).count() == 20
+
+        # Sent messages aren't sent again.
+        assert dispatch_outbox().sent == 0
+        assert self.slack_client_mock.chat_postMessage.call_count == 20
+
+    def test_rate_limited(self) -> None:
+        self.slack_client_mock.chat_postMessage.side_effect = get_slack_error(429, {"Retry-After": "30"})
+        message = enqueue_message({"channel": "user"}, text="text")
+
+        result = dispatch_outbox()
+        assert result.retried == 1
+
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.PENDING
+        assert message.next_attempt.timestamp() > time.time() + 25
+
+    @override_settings(OUTBOX_MAX_RATE_LIMITED_ATTEMPTS=2)
+    def test_rate_limited_gives_up(self) -> None:
+        self.slack_client_mock.chat_postMessage.side_effect = get_slack_error(429, {"Retry-After": "30"})
+        message = enqueue_message({"channel": "user"}, text="text")
+
+        assert dispatch_outbox().retried == 1
+        OutboxMessage.objects.update(next_attempt=message.created)
+        outbox._buckets.clear()  # Don't wait for 'Retry-After'.
+        assert dispatch_outbox().failed == 1
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.FAILED
+
+    def test_dispatch_ids(self) -> None:
+        backlog = enqueue_messages([{"channel": f"user{i}"} for i in range(5)], text="text")
+        message = enqueue_message({"channel": "user"}, text="text")
+
+        assert dispatch_outbox(ids=[message.pk]).sent == 1
+        self.slack_client_mock.chat_postMessage.assert_called_once()
+        assert OutboxMessage.objects.filter(pk__in=[m.pk for m in backlog], status=OutboxMessage.PENDING).count() == 5
+
+    def test_failed(self) -> None:
+        self.slack_client_mock.chat_postMessage.side_effect = get_slack_error(500)
+        message = enqueue_message({"channel": "user"}, text="text")
+
+        assert dispatch_outbox().retried == 1
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.PENDING
+        assert message.attempts == 1
+
+        # Retry right away, instead of waiting for backoff.
+        OutboxMessage.objects.update(next_attempt=message.created)
+        assert dispatch_outbox().failed == 1
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.FAILED
+        assert message.last_error
+
+
+class TestTokenBucket(BaseTestCase):
+    def test_rate(self) -> None:
+        bucket = TokenBucket(rate=50, burst=5)
+
+        async def acquire_all() -> None:
+            for _ in range(15):
+                await bucket.acquire()
+
+        start = time.monotonic()
+        asyncio.run(acquire_all())
+        # 5 tokens are available right away, 10 more take 10 / 50 seconds.
+        assert time.monotonic() - start >= 0.18
+
+    def test_blocking(self) -> None:
+        bucket = TokenBucket(rate=50, burst=5)
+
+        start = time.monotonic()
+        for _ in range(15):
+            bucket.acquire_blocking()
+        assert time.monotonic() - start >= 0.18
+
+        bucket.pause(0.1)
+        start = time.monotonic()
+        bucket.acquire_blocking()
+        assert time.monotonic() - start >= 0.09
@@ -0,0 +1,126 @@
+import random
+import re
+from datetime import timedelta
+from typing import Callable
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bot_app.models import SlackUser, Vote
+from bot_app.scheduler.jobs import notify_about_new_points, remind_about_program
+from bot_app.utils import get_user_comments, get_your_votes_message, save_vote
+from tests.base import BaseTestCase
+
+# Full scans of a table in plans of PostgreSQL ('Seq Scan on bot_app_vote') and SQLite ('SCAN bot_app_vote', but not
+# 'SCAN bot_app_vote USING INDEX', which reads the whole index).
+_SEQUENTIAL_SCAN = {
+    "postgresql": r"Seq Scan on {table}\b",
+    "sqlite": r"\bSCAN {table}\b(?! USING (COVERING )?INDEX)",
+}
+_EXPLAIN = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+# Statements with plans worth checking. Inserts (e.g. vote's upsert) look rows up only by their unique keys.
+_READING = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+class TestQueryPlans(BaseTestCase):
+    """ Hot queries must use indexes. Queries made by app's functions are captured, and their plans are checked against
+    a dataset big enough that the planner prefers an index, where there is one that matches. """
+    users_count = 200
+    inactive_users_count = 2000
+    votes_count = 20_000
+    days = 180
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        rng = random.Random(0)
+        users = SlackUser.objects.bulk_create(
+            [SlackUser(slack_id=f"plan_{i}", name=f"plan.{i}", real_name=f"plan {i}") for i in range(cls.users_count)]
+        )
+        # Bots and deactivated accounts, which most workspaces collect over time.
+        SlackUser.objects.bulk_create([
+            SlackUser(slack_id=f"inactive_{i}", name=f"inactive.{i}", real_name=f"inactive {i}",
+                      is_bot=i % 2 == 0, deleted=i % 2 == 1)
+            for i in range(cls.inactive_users_count)
+        ])
+        now = timezone.now()
+        votes, days = {}, {}
+        for _ in range(cls.votes_count):
+            voting_user, voted_user = rng.sample(users, 2)
+            day = rng.randrange(cls.days)
+            period = (now - timedelta(days=day)).date().replace(day=1)
+            votes[voting_user, voted_user, period] = Vote(
+                voting_user=voting_user, voted_user=voted_user, period=period, points_team_up_to_win=1
+            )
+            days[voting_user, voted_user, period] = day
+        Vote.objects.bulk_create(votes.values(), batch_size=1000)
+
+        # 'created' and 'modified' are set automatically on create, so votes are spread over days afterwards.
+        pks_by_day = {}
+        for key, vote in votes.items():
+            pks_by_day.setdefault(days[key], []).append(vote.pk)
+        for day, pks in pks_by_day.items():
+            created = now - timedelta(days=day)
+            Vote.objects.filter(pk__in=pks).update(created=created, modified=created)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.user = users[0]
+        cls.other_user = users[1]
+        cls.now = now
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+
+    @staticmethod
+    def _explain(sql: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(_EXPLAIN[connection.vendor] + sql)
+            # Plan's text is the last column of SQLite's rows, and the only one of PostgreSQL's.
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def assert_uses_index(self, func: Callable, table: str = Vote._meta.db_table) -> None:
+        """ Call 'func' and check plans of all the queries it made that read from 'table'. """
+        if connection.vendor not in _SEQUENTIAL_SCAN:
+            self.skipTest(f"Query plans of {connection.vendor} aren't checked.")
+        with CaptureQueriesContext(connection) as context:
+            func()
+
+        statements = [query["sql"] for query in context.captured_queries
+                      if _READING.match(query["sql"]) and table in query["sql"]]
+        assert statements, f"No queries reading from {table} were made."
+        for sql in statements:
+            plan = self._explain(sql)
+            assert not re.search(_SEQUENTIAL_SCAN[connection.vendor].format(table=table), plan), f"{sql}\n{plan}"
+
+    def test_comments(self) -> None:
+        start = self.now - timedelta(days=30)
+        self.assert_uses_index(lambda: get_user_comments(voted_user=self.user.slack_id, start=start, end=self.now))
+
+    def test_saving_vote(self) -> None:
+        vote = {"selected_user": self.other_user.slack_id, "points_team_up_to_win": 3, "points_act_to_deliver": 0,
+                "points_disrupt_to_grow": 0, "comment": "comment"}
+        with mock.patch("bot_app.utils.executor.submit"):
+            self.assert_uses_index(lambda: save_vote(vote=vote, user_id=self.user.slack_id))
+
+    def test_your_votes(self) -> None:
+        self.assert_uses_index(lambda: get_your_votes_message(user=self.user))
+
+    def test_new_points(self) -> None:
+        with mock.patch("bot_app.scheduler.jobs.dispatch_outbox"):
+            notify_about_new_points(now=self.now - timedelta(days=1))  # Sets the watermark.
+            self.assert_uses_index(lambda: notify_about_new_points(now=self.now))
+
+    def test_reminders(self) -> None:
+        """ Active users are read with 'slackuser_active' partial index. """
+        with mock.patch("bot_app.scheduler.jobs.dispatch_outbox"):
+            self.assert_uses_index(remind_about_program, table=SlackUser._meta.db_table)
+
+    def test_sequential_scan_is_detected(self) -> None:
+        with self.assertRaises(AssertionError):
+            self.assert_uses_index(lambda: list(Vote.objects.filter(comment="comment")))
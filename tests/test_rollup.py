@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+
+from bot_app.models import DailyPoints, Vote
+from bot_app.rollup import check_daily_points, rebuild_daily_points
+from bot_app.utils import save_vote
+from tests.base import BaseTestCase
+
+
+class TestDailyPoints(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data(add_voting=False)
+
+    def _vote(self, points: tuple[int, int, int]) -> None:
+        vote = {
+            "selected_user": self.slack_user2.slack_id,
+            "points_team_up_to_win": points[0],
+            "points_act_to_deliver": points[1],
+            "points_disrupt_to_grow": points[2],
+            "comment": "a comment",
+        }
+        save_vote(vote=vote, user_id=self.slack_user1.slack_id)
+
+    def test_save_vote_updates_rollup(self) -> None:
+        self._vote(points=(0, 1, 2))
+        bucket = DailyPoints.objects.get(user=self.slack_user2)
+        assert (bucket.points_team_up_to_win, bucket.points_act_to_deliver, bucket.points_disrupt_to_grow) == (0, 1, 2)
+
+        # Updating a vote replaces its points in the bucket.
+        self._vote(points=(3, 0, 0))
+        bucket = DailyPoints.objects.get(user=self.slack_user2)
+        assert (bucket.points_team_up_to_win, bucket.points_act_to_deliver, bucket.points_disrupt_to_grow) == (3, 0, 0)
+
+        assert check_daily_points() == []
+
+    def test_rebuild(self) -> None:
+        Vote.objects.create(
+            voted_user=self.slack_user2,
+            voting_user=self.slack_user1,
+            points_team_up_to_win=1,
+            points_act_to_deliver=1,
+            points_disrupt_to_grow=1,
+        )
+        differences = check_daily_points()
+        assert len(differences) == 1
+        assert differences[0]["user_id"] == self.slack_user2.pk
+
+        assert rebuild_daily_points() == 1
+        assert check_daily_points() == []
+
+    def test_commands(self) -> None:
+        self._vote(points=(0, 1, 2))
+        out = StringIO()
+        call_command("check_daily_points", stdout=out)
+        assert "consistent" in out.getvalue()
+
+        DailyPoints.objects.update(points_act_to_deliver=5)
+        with self.assertRaises(CommandError):
+            call_command("check_daily_points", stdout=StringIO(), stderr=StringIO())
+
+        call_command("rebuild_daily_points", stdout=StringIO())
+        assert check_daily_points() == []
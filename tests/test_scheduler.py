@@ -1,22 +1,31 @@
 import calendar
+import sys
+import threading
 import time
 from copy import deepcopy
-from datetime import datetime
+from io import StringIO
+from datetime import datetime, timedelta
 from unittest import mock
 
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from slack_sdk.web import SlackResponse
 
-from bot_app.models import SlackUser, Vote
+from bot_app.models import SlackUser, Vote, Watermark
 from bot_app.scheduler.jobs import (
+    NEW_POINTS_WATERMARK,
     remind_about_program,
     announce_winners,
     send_periodic_messages,
     notify_about_new_points,
-    create_users_from_slack,
 )
-from bot_app.scheduler.scheduler import Scheduler
+from bot_app.scheduler.scheduler import JobRun, Scheduler
 from bot_app.texts import texts
+from bot_app.users import create_users_from_slack
 from tests.base import BaseTestCase
 from tests.data import slack_users_data
 
@@ -39,9 +48,91 @@ class TestScheduler(TestCase):
         assert scheduler._thread.is_alive() is False
         assert func.call_count > 0
 
+    @staticmethod
+    def _make_due(scheduler: Scheduler) -> None:
+        for job in scheduler._scheduler.jobs:
+            job.next_run = datetime.now() - timedelta(seconds=1)
+
+    def test_jobs_run_concurrently(self) -> None:
+        scheduler = Scheduler(check_rate=1)
+        release, fast_done = threading.Event(), threading.Event()
+        scheduler.every().day.do(release.wait, 5)
+        scheduler.every().day.do(fast_done.set)
+        self._make_due(scheduler)
+
+        scheduler.run()
+        assert fast_done.wait(5) is True  # Not blocked by the slow job.
+        release.set()
+        scheduler.stop()
+
+    def test_job_does_not_overlap(self) -> None:
+        scheduler = Scheduler(check_rate=60)
+        release = threading.Event()
+        func = mock.MagicMock(side_effect=lambda: release.wait(5))
+        scheduler.every().minute.do(func)
+        self._make_due(scheduler)
+        scheduler.run()
+
+        time.sleep(0.2)
+        self._make_due(scheduler)
+        scheduler.run_pending()  # Previous run hasn't finished yet.
+        release.set()
+        time.sleep(0.2)
+        scheduler.stop()
+
+        assert func.call_count == 1
+        assert [run.outcome for run in scheduler.history] == [JobRun.SKIPPED, JobRun.SUCCEEDED]
+
+    @override_settings(SCHEDULER_WORKERS=0)
+    def test_job_outcomes(self) -> None:
+        scheduler = Scheduler()
+        scheduler.every().minute.do(mock.MagicMock(__name__="succeeding"))
+        scheduler.every().minute.do(mock.MagicMock(__name__="failing", side_effect=ValueError))
+        self._make_due(scheduler)
+        scheduler.run_pending()
+
+        runs = {run.job: run for run in scheduler.history}
+        assert (runs["succeeding"].outcome, runs["failing"].outcome) == (JobRun.SUCCEEDED, JobRun.FAILED)
+        assert all(run.seconds >= 0 for run in runs.values())
+
+    @override_settings(SCHEDULER_WORKERS=0)
+    def test_job_bookkeeping(self) -> None:
+        """ Job's runs are tracked by schedule, as for its own jobs. """
+        scheduler = Scheduler()
+        func = mock.MagicMock(__name__="func")
+        job = scheduler.every().minute.do(func, 1, key="value")
+        self._make_due(scheduler)
+        scheduler.run_pending()
+
+        func.assert_called_once_with(1, key="value")
+        assert job.last_run is not None
+        assert job.should_run is False
+        assert "do func()" in repr(job)  # Named after the function in logs.
+
+    def test_timeout(self) -> None:
+        scheduler = Scheduler(check_rate=1)
+        release = threading.Event()
+        scheduler.every(timeout=0.1).minute.do(release.wait, 5)
+        self._make_due(scheduler)
+        scheduler.run()
+
+        time.sleep(0.5)  # Scheduler wakes up when the job times out.
+        assert [run.outcome for run in scheduler.history] == [JobRun.TIMED_OUT]
+        release.set()
+        time.sleep(0.2)
+        scheduler.stop()
+        assert [run.outcome for run in scheduler.history] == [JobRun.TIMED_OUT]
+
+    def test_sleeps_until_next_job(self) -> None:
+        scheduler = Scheduler()
+        assert scheduler.get_idle_seconds(limit=60) == 60
+        scheduler.every(10).seconds.do(mock.MagicMock())
+        assert 9 <= scheduler.get_idle_seconds(limit=60) <= 10
+
 
 class TestSchedulerJobs(BaseTestCase):
     def setUp(self) -> None:
+        super().setUp()
         self._mock_slack_client()
         self._add_simple_test_data()
 
@@ -55,7 +146,7 @@ class TestSchedulerJobs(BaseTestCase):
         text = texts.remind_about_program()
         calls = [c[1] for c in self.slack_client_mock.chat_postMessage.call_args_list]
         users_reminded = [c["channel"] for c in calls]
-        assert users_reminded == [u.slack_id for u in SlackUser.objects.all()]
+        assert sorted(users_reminded) == sorted(u.slack_id for u in SlackUser.objects.all())  # Sent concurrently.
         assert all([text in c["text"] for c in calls])
 
     def test_announce_winners(self) -> None:
@@ -99,19 +190,49 @@ class TestSchedulerJobs(BaseTestCase):
 • {self.voting_result.points_act_to_deliver} points in the category Act to deliver
 • {self.voting_result.points_disrupt_to_grow} points in the category Disrupt to grow"""
 
-        notify_about_new_points()
+        notify_about_new_points(now=timezone.now() + timedelta(minutes=1))  # Votes are surely committed by then.
         assert (
                 self.slack_client_mock.chat_postMessage.call_count
                 == Vote.objects.count()
         )
 
-        call = self.slack_client_mock.chat_postMessage.call_args[1]
-        assert call["channel"] == self.slack_user2.slack_id
-        assert call["text"] == got_voted_text
+        calls = {c[1]["channel"]: c[1] for c in self.slack_client_mock.chat_postMessage.call_args_list}
+        assert calls[self.slack_user2.slack_id]["text"] == got_voted_text
+
+    def test_new_points_aggregated_in_single_query(self) -> None:
+        Vote.objects.create(voted_user=self.slack_user2, voting_user=self.hr_user1, points_act_to_deliver=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            notify_about_new_points(now=timezone.now() + timedelta(minutes=1))
+        assert len([query for query in queries if '"bot_app_vote"' in query["sql"]]) == 1
+
+        calls = {c[1]["channel"]: c[1] for c in self.slack_client_mock.chat_postMessage.call_args_list}
+        assert calls[self.slack_user2.slack_id]["text"].startswith("2 people voted for you today!")
+        assert "• 4 points in the category Act to deliver" in calls[self.slack_user2.slack_id]["text"]
+
+    def test_new_points_notified_once(self) -> None:
+        now = timezone.now() + timedelta(minutes=1)
+        notify_about_new_points(now=now)
+        notify_about_new_points(now=now + timedelta(hours=1))
+        assert self.slack_client_mock.chat_postMessage.call_count == Vote.objects.count()
+
+        # Votes from days when the job didn't run are notified by the next run.
+        vote = Vote.objects.create(voted_user=self.slack_user1, voting_user=self.slack_user2, points_team_up_to_win=1)
+        Vote.objects.filter(pk=vote.pk).update(modified=now + timedelta(days=1))
+        notify_about_new_points(now=now + timedelta(days=3))
+        assert self.slack_client_mock.chat_postMessage.call_count == Vote.objects.count()
+        assert Watermark.objects.get(name=NEW_POINTS_WATERMARK).value == now + timedelta(days=3, minutes=-1)
+
+    def test_new_points_first_run(self) -> None:
+        """ Before the first run, only today's votes are notified. """
+        Vote.objects.update(modified=timezone.now() - timedelta(days=2))
+        notify_about_new_points(now=timezone.now() + timedelta(minutes=1))
+        assert self.slack_client_mock.chat_postMessage.call_count == 0
 
 
 class TestCreateUsersJobs(BaseTestCase):
     def setUp(self) -> None:
+        super().setUp()
         self._mock_slack_client()
 
     def test_create_users_from_slack(self) -> None:
@@ -131,9 +252,74 @@ class TestCreateUsersJobs(BaseTestCase):
 
         # Check if record is updated, not created again.
         data['members'][0]['real_name'] = 'new_real_name'
+        data['members'][0]['updated'] = 1
         self.slack_client_mock.users_list.return_value = response_mock
         create_users_from_slack()
 
         assert SlackUser.objects.count() == 1
         user = SlackUser.objects.latest('created')
         assert user.real_name == data['members'][0]['real_name']
+
+    def test_sync_users_command(self) -> None:
+        response_mock = mock.MagicMock(SlackResponse)
+        response_mock.data = deepcopy(slack_users_data)
+        self.slack_client_mock.users_list.return_value = response_mock
+
+        out = StringIO()
+        call_command('sync_users', stdout=out)
+        assert SlackUser.objects.count() == 1
+        assert 'Created 1' in out.getvalue()
+
+    @override_settings(ENABLE_SCHEDULER=False)
+    def test_web_process_does_not_sync_users(self) -> None:
+        config = apps.get_app_config('bot_app')
+        clients = config.slack_client, config.async_slack_client
+        try:
+            with mock.patch.object(sys, 'argv', ['gunicorn']):
+                config.ready()
+        finally:
+            config.slack_client, config.async_slack_client = clients
+        self.slack_client_mock.users_list.assert_not_called()
+        assert SlackUser.objects.count() == 0
+
+    def test_create_users_from_slack_pages(self) -> None:
+        def get_page(name: str, cursor: str) -> mock.MagicMock:
+            data = deepcopy(slack_users_data)
+            data['members'][0].update(id=f'{name}_id', name=name, real_name=name, updated=1)
+            data['response_metadata'] = {'next_cursor': cursor}
+            response_mock = mock.MagicMock(SlackResponse)
+            response_mock.data = data
+            return response_mock
+
+        SlackUser.objects.create(slack_id='first_id', name='first', real_name='first', slack_updated=1)
+        SlackUser.objects.create(slack_id='second_id', name='second', real_name='old_name')
+        self.slack_client_mock.users_list.side_effect = [
+            get_page(name='first', cursor='next_page'),
+            get_page(name='second', cursor='last_page'),
+            get_page(name='third', cursor=''),
+        ]
+
+        # Select timestamps, select changed users, and create and update in a transaction.
+        with self.assertNumQueries(6):
+            result = create_users_from_slack()
+
+        assert [c[1]['cursor'] for c in self.slack_client_mock.users_list.call_args_list] == [
+            None, 'next_page', 'last_page'
+        ]
+        assert (result.created, result.updated, result.unchanged) == (1, 1, 1)
+        assert SlackUser.objects.get(slack_id='second_id').real_name == 'second'
+        assert SlackUser.objects.filter(slack_id='third_id').exists()
+
+    def test_not_changed_users_are_skipped(self) -> None:
+        SlackUser.objects.create(slack_id='id', name='name', real_name='old_real_name', slack_updated=5)
+        data = deepcopy(slack_users_data)
+        data['members'][0]['updated'] = 5
+        response_mock = mock.MagicMock(SlackResponse)
+        response_mock.data = data
+        self.slack_client_mock.users_list.return_value = response_mock
+
+        with self.assertNumQueries(3):  # Only timestamps are selected.
+            result = create_users_from_slack()
+
+        assert (result.created, result.updated, result.unchanged) == (0, 0, 1)
+        assert SlackUser.objects.get(slack_id='id').real_name == 'old_real_name'
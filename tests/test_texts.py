@@ -1,6 +1,10 @@
+import os
+import tempfile
+
 from django.test import TestCase
 
-from bot_app.texts import TextsSources, TextsBuilder
+from bot_app.message import build_text_message
+from bot_app.texts import StaticText, Template, TextsSources, TextsBuilder
 
 
 class TestTexts(TestCase):
@@ -40,3 +44,66 @@ class TestTexts(TestCase):
 
         # Then
         assert text == expected
+
+    def test_announce_winners(self) -> None:
+        # Given
+        values = [
+            dict(category='Category 1', points=5, user=['Jan Kowalski']),
+            dict(category='Category 2', points=3, user=['Anna Nowak', 'Paweł Kowalski']),
+        ]
+
+        expected = (
+            "Results of voting in the Honors Program:\n"
+            "• in category Category 1 with 5 points, Jan Kowalski wins\n"
+            "• in category Category 2 tie - 3 points: Anna Nowak, Paweł Kowalski"
+        )
+
+        # When
+        text = self.builder.announce_winners(values=values)
+
+        # Then
+        assert text == expected
+        assert values[1]['user'] == ['Anna Nowak', 'Paweł Kowalski']
+
+    def test_sources_do_not_depend_on_working_directory(self) -> None:
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                sources = TextsSources()
+            finally:
+                os.chdir(cwd)
+
+        assert sources['greeting'].text == 'Hello {user}!'
+
+
+class TestTemplate(TestCase):
+    def test_render(self) -> None:
+        template = Template('{user} has {points:>3} points, {{not a field}}')
+
+        assert template.fields == {'user', 'points'}
+        assert template.render(user='Jan', points=7, unused=True) == 'Jan has   7 points, {not a field}'
+
+    def test_format_fields(self) -> None:
+        template = Template('{0} and {user[name]}')
+
+        assert template.render('first', user={'name': 'Jan'}) == 'first and Jan'
+
+    def test_nested_format_spec(self) -> None:
+        template = Template('{points:>{width}}')
+
+        assert template.render(points=7, width=3) == '  7'
+
+    def test_static(self) -> None:
+        template = Template("It's a {{static}} text.")
+
+        text = template.render()
+        assert text == "It's a {static} text."
+        assert isinstance(text, StaticText)
+        assert template.render() is text
+
+        # Section of static text is built once, for all messages.
+        first = build_text_message(channel='channel_1', content=[text])
+        second = build_text_message(channel='channel_2', content=[text])
+        assert first['blocks'][0] is second['blocks'][0]
+        assert first['blocks'][0]['text']['text'] == text
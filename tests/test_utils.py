@@ -0,0 +1,127 @@
+import importlib.util
+import random
+from unittest import skipUnless
+
+from django.test import override_settings
+
+from bot_app.models import SlackUser, Vote
+from bot_app.rollup import rebuild_daily_points
+from bot_app.utils import calculate_points, get_ranking, get_start_end_half_year, total_points
+from tests.base import BaseTestCase
+
+
+class TestPoints(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._add_simple_test_data()
+        SlackUser.objects.create(slack_id="bot_user_id", name="bot.user", is_bot=True)
+
+    def test_calculate_points(self) -> None:
+        start, end = get_start_end_half_year()
+
+        with self.assertNumQueries(1):
+            points = calculate_points(voted_user=self.slack_user2.slack_id, start=start, end=end)
+
+        assert points == {
+            "points_team_up_to_win": 0,
+            "points_act_to_deliver": 1,
+            "points_disrupt_to_grow": 2,
+        }
+
+    def test_calculate_points_not_existing_user(self) -> None:
+        start, end = get_start_end_half_year()
+
+        with self.assertRaises(ValueError):
+            calculate_points(voted_user="not_existing_user_id", start=start, end=end)
+
+    def test_total_points(self) -> None:
+        start, end = get_start_end_half_year()
+
+        with self.assertNumQueries(1):
+            points = total_points(start=start, end=end)
+
+        assert list(points.keys()) == [self.slack_user1.slack_id, self.slack_user2.slack_id, self.hr_user1.slack_id]
+        assert points[self.slack_user1.slack_id] == {
+            "points_team_up_to_win": 0,
+            "points_act_to_deliver": 0,
+            "points_disrupt_to_grow": 0,
+        }
+        assert points[self.hr_user1.slack_id] == {
+            "points_team_up_to_win": 2,
+            "points_act_to_deliver": 0,
+            "points_disrupt_to_grow": 1,
+        }
+
+
+class TestRanking(BaseTestCase):
+    ranking_queries = 1
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._add_simple_test_data()
+        SlackUser.objects.create(slack_id="bot_user_id", name="bot.user", is_bot=True)
+
+    def test_ranking(self) -> None:
+        start, end = get_start_end_half_year()
+
+        with self.assertNumQueries(self.ranking_queries):
+            ranking = get_ranking(start=start, end=end, top=2)
+
+        assert [(u["slack_id"], u["points"], u["rank"], u["position"]) for u in ranking["points_disrupt_to_grow"]] == [
+            (self.slack_user2.slack_id, 2, 1, 1),
+            (self.hr_user1.slack_id, 1, 2, 2),
+        ]
+        assert ranking["points_team_up_to_win"][0]["real_name"] == self.hr_user1.real_name
+
+    def test_ranking_winners_with_tie(self) -> None:
+        start, end = get_start_end_half_year()
+        Vote.objects.create(
+            voted_user=self.hr_user1,
+            voting_user=self.slack_user1,
+            points_team_up_to_win=2,
+            points_act_to_deliver=0,
+            points_disrupt_to_grow=1,
+        )
+        rebuild_daily_points()
+
+        ranking = get_ranking(start=start, end=end, top=0)
+
+        winners = ranking["points_disrupt_to_grow"]
+        assert [u["slack_id"] for u in winners] == [self.slack_user2.slack_id, self.hr_user1.slack_id]
+        assert [u["rank"] for u in winners] == [1, 1]
+        assert [u["position"] for u in winners] == [1, 2]
+        assert len(ranking["points_team_up_to_win"]) == 1
+
+
+@skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+@override_settings(RANKING_BACKEND="numpy")
+class TestMatrixRanking(TestRanking):
+    ranking_queries = 2  # Users and their daily points.
+
+    def test_same_as_database(self) -> None:
+        start, end = get_start_end_half_year()
+        users = [
+            SlackUser.objects.create(slack_id=f"user{i}_id", name=f"user.{i}", real_name=f"user.{i}")
+            for i in range(30)
+        ]
+        rng = random.Random(0)
+        seen = set()
+        for _ in range(200):
+            voting_user, voted_user = rng.sample(users, 2)
+            if (voting_user, voted_user) in seen:  # User votes once a month for each user.
+                continue
+            seen.add((voting_user, voted_user))
+            points = rng.choice([(3, 0, 0), (0, 3, 0), (0, 0, 3), (1, 1, 1), (2, 1, 0), (0, 1, 2)])
+            Vote.objects.create(
+                voting_user=voting_user,
+                voted_user=voted_user,
+                points_team_up_to_win=points[0],
+                points_act_to_deliver=points[1],
+                points_disrupt_to_grow=points[2],
+            )
+        rebuild_daily_points()
+
+        for top in (0, 1, 5, 50):
+            with self.settings(RANKING_BACKEND="database"):
+                expected = get_ranking.__wrapped__(start=start, end=end, top=top)
+            assert get_ranking.__wrapped__(start=start, end=end, top=top) == expected
@@ -0,0 +1,196 @@
+import threading
+from typing import Optional
+from unittest import mock, skipIf
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bot_app.message import MAX_SECTION_LENGTH
+from bot_app.models import DailyPoints, OutboxMessage, SlackUser, Vote, VoteRevision
+from bot_app.outbox import enqueue_message
+from bot_app.rollup import check_daily_points
+from bot_app.utils import _upsert_vote, get_earlier_comments, get_start_end_half_year, get_user, \
+    get_user_comments, get_your_votes_message, has_earlier_comments, save_vote
+from bot_app.views.slash import _send_message, _votes_content
+from tests.base import BaseTestCase, BaseTransactionTestCase
+
+
+def _get_vote(selected_user: str, points: tuple[int, int, int], comment: str = "a comment") -> dict:
+    return {
+        "selected_user": selected_user,
+        "points_team_up_to_win": points[0],
+        "points_act_to_deliver": points[1],
+        "points_disrupt_to_grow": points[2],
+        "comment": comment,
+    }
+
+
+class TestSaveVote(BaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data(add_voting=False)
+
+    def test_queries(self) -> None:
+        vote = _get_vote(selected_user=self.slack_user2.slack_id, points=(0, 1, 2), comment="first")
+        save_vote(vote=vote, user_id=self.slack_user1.slack_id)  # Users are cached from now on.
+
+        # Locking the vote, upserting it, inserting its revision, upserting points in the rollup, enqueuing message
+        # about the update, and savepoint with its release, as tests are run in a transaction.
+        vote = _get_vote(selected_user=self.slack_user2.slack_id, points=(3, 0, 0), comment="second")
+        with mock.patch("bot_app.utils.executor.submit"), self.assertNumQueries(5 + 2):
+            save_vote(vote=vote, user_id=self.slack_user1.slack_id)
+
+        saved = Vote.objects.get()
+        assert (saved.points_team_up_to_win, saved.points_act_to_deliver, saved.points_disrupt_to_grow) == (3, 0, 0)
+        assert saved.comment == "second"
+        assert saved.modified > saved.created
+        assert check_daily_points() == []
+
+    def test_update_sends_only_its_message(self) -> None:
+        backlog = enqueue_message({"channel": "other_user"}, text="Broadcast")
+        save_vote(vote=_get_vote(self.slack_user2.slack_id, (0, 1, 2)), user_id=self.slack_user1.slack_id)
+        save_vote(vote=_get_vote(self.slack_user2.slack_id, (3, 0, 0)), user_id=self.slack_user1.slack_id)
+
+        self.slack_client_mock.chat_postMessage.assert_called_once()
+        assert self.slack_client_mock.chat_postMessage.call_args[1]["text"] == "Vote update"
+        backlog.refresh_from_db()
+        assert backlog.status == OutboxMessage.PENDING
+
+    def test_new_vote_queries(self) -> None:
+        save_vote(vote=_get_vote(self.slack_user2.slack_id, (0, 1, 2)), user_id=self.slack_user1.slack_id)
+        get_user(self.hr_user1.slack_id)
+        with self.assertNumQueries(4 + 2):
+            save_vote(vote=_get_vote(self.hr_user1.slack_id, (0, 1, 2)), user_id=self.slack_user1.slack_id)
+        assert Vote.objects.count() == 2
+
+    def test_vote_inserted_concurrently(self) -> None:
+        """ Other submission of the same vote inserts it after this one has looked for it. Upsert doesn't touch the
+        vote then, which is looked for and locked again, and updated. """
+        def insert_concurrently(**kwargs) -> Optional[int]:
+            if upsert_mock.call_count == 1:
+                vote = _get_vote(self.slack_user2.slack_id, (0, 1, 2), comment="concurrent")
+                save_vote(vote=vote, user_id=self.slack_user1.slack_id)
+                return None
+            return _upsert_vote(**kwargs)
+
+        with mock.patch("bot_app.utils._upsert_vote", side_effect=insert_concurrently) as upsert_mock:
+            save_vote(vote=_get_vote(self.slack_user2.slack_id, (3, 0, 0)), user_id=self.slack_user1.slack_id)
+
+        assert upsert_mock.call_count == 3  # Concurrent insert, and update after the retry.
+        saved = Vote.objects.get()
+        assert (saved.points_team_up_to_win, saved.points_act_to_deliver, saved.points_disrupt_to_grow) == (3, 0, 0)
+        assert [r.comment for r in saved.revisions.order_by("id")] == ["concurrent", "a comment"]
+        assert check_daily_points() == []
+        # It's an update of the vote inserted concurrently.
+        self.slack_client_mock.chat_postMessage.assert_called_once()
+        assert self.slack_client_mock.chat_postMessage.call_args[1]["text"] == "Vote update"
+
+    def test_vote_not_saved(self) -> None:
+        with mock.patch("bot_app.utils._upsert_vote", return_value=None), self.assertRaises(RuntimeError):
+            save_vote(vote=_get_vote(self.slack_user2.slack_id, (3, 0, 0)), user_id=self.slack_user1.slack_id)
+
+        assert not Vote.objects.exists()
+        assert not VoteRevision.objects.exists()
+        assert not DailyPoints.objects.exists()
+
+    def test_revisions(self) -> None:
+        for i, points in enumerate([(0, 1, 2), (3, 0, 0), (1, 1, 1)]):
+            vote = _get_vote(selected_user=self.slack_user2.slack_id, points=points, comment=f"comment {i}")
+            save_vote(vote=vote, user_id=self.slack_user1.slack_id)
+        save_vote(vote=_get_vote(self.slack_user2.slack_id, (0, 1, 2), comment="other"), user_id=self.hr_user1.slack_id)
+
+        vote = Vote.objects.get(voting_user=self.slack_user1)
+        assert vote.comment == "comment 2"
+        assert [r.points_team_up_to_win for r in vote.revisions.order_by("-id")] == [1, 3, 0]
+
+        # Comments of the latest submissions are in the report, earlier ones are paged through on demand.
+        start, end = get_start_end_half_year()
+        assert get_user_comments(voted_user=self.slack_user2.slack_id, start=start, end=end) == {
+            self.slack_user1.real_name: "comment 2", self.hr_user1.real_name: "other"
+        }
+        assert has_earlier_comments(voted_user=self.slack_user2.slack_id, start=start, end=end) is True
+        first_page, before = get_earlier_comments(voted_user=self.slack_user2.slack_id, start=start, end=end, limit=1)
+        assert first_page == [(self.slack_user1.real_name, "comment 1")]
+        second_page, before = get_earlier_comments(
+            voted_user=self.slack_user2.slack_id, start=start, end=end, before=before, limit=1
+        )
+        assert (second_page, before) == ([(self.slack_user1.real_name, "comment 0")], None)
+        assert has_earlier_comments(voted_user=self.hr_user1.slack_id, start=start, end=end) is False
+
+
+class TestYourVotes(BaseTestCase):
+    votes_count = 300
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data(add_voting=False)
+        users = SlackUser.objects.bulk_create(
+            [SlackUser(slack_id=f"voted_{i}", name=f"voted.{i}", real_name=f"Voted User {i}")
+             for i in range(self.votes_count)]
+        )
+        Vote.objects.bulk_create(
+            [Vote(voting_user=self.slack_user1, voted_user=user, points_team_up_to_win=1) for user in users]
+        )
+
+    def test_queries(self) -> None:
+        with self.assertNumQueries(1):
+            text = get_your_votes_message(user=self.slack_user1)
+        assert text.count("You voted for user") == self.votes_count
+        assert "Voted User 0" in text and f"Voted User {self.votes_count - 1}" in text
+
+    def test_message_is_split(self) -> None:
+        _send_message(user=self.slack_user1, build_content=_votes_content, text="Votes")
+
+        calls = self.slack_client_mock.chat_postMessage.call_args_list
+        blocks = [block for call in calls for block in call[1]["blocks"]]
+        assert len(blocks) > 2
+        assert all(len(block["text"]["text"]) <= MAX_SECTION_LENGTH for block in blocks)
+        assert sum(block["text"]["text"].count("You voted for user") for block in blocks) == self.votes_count
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite doesn't allow concurrent writes to in-memory test database.")
+class TestSaveVoteConcurrently(BaseTransactionTestCase):
+    submissions = 8
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._mock_slack_client()
+        self._add_simple_test_data(add_voting=False)
+
+    def _submit(self, barrier: threading.Barrier, points: tuple[int, int, int], queries: list) -> None:
+        try:
+            barrier.wait()
+            with CaptureQueriesContext(connection) as captured:
+                save_vote(vote=_get_vote(self.slack_user2.slack_id, points), user_id=self.slack_user1.slack_id)
+            queries.append(len(captured))
+        finally:
+            connection.close()
+
+    def test_double_submit(self) -> None:
+        # Users are cached, and message about the update isn't sent, so only queries saving the vote are counted.
+        get_user(self.slack_user1.slack_id)
+        get_user(self.slack_user2.slack_id)
+        patcher = mock.patch("bot_app.utils.executor.submit")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        barrier = threading.Barrier(self.submissions)
+        queries = []
+        threads = [
+            threading.Thread(target=self._submit, args=(barrier, (i, 0, 0), queries)) for i in range(self.submissions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(queries) == self.submissions  # None failed.
+        assert Vote.objects.count() == 1
+        assert VoteRevision.objects.count() == self.submissions
+        assert DailyPoints.objects.get().points_team_up_to_win == Vote.objects.get().points_team_up_to_win
+        assert check_daily_points() == []
+        # Lock, upsert, revision and rollup, message about the update. Lock and upsert are repeated, if the vote
+        # was inserted concurrently, after it was looked for.
+        assert max(queries) <= 7, queries